@@ -1,18 +1,21 @@
 """
 API dependencies (authentication, database connection, etc.)
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.session import get_database
-from app.core.security import decode_access_token
-from app.db.models import find_user_by_id
-from typing import Dict, Any
+from app.core.security import decode_access_token, decode_order_stream_token
+from app.db.models import get_user_cached
+from typing import Dict, Any, Optional
 
 
 # HTTP Bearer security scheme for JWT
 security = HTTPBearer()
 
+# Same scheme without the automatic 403, for the order stream (also accepts ?token=)
+optional_security = HTTPBearer(auto_error=False)
+
 
 def get_db() -> AsyncIOMotorDatabase:
     """
@@ -41,9 +44,60 @@ async def get_current_user(
     Raises:
         HTTPException: If token is invalid or user not found
     """
+    return await _get_user_from_token(credentials.credentials, db)
+
+
+async def get_current_user_for_order_stream(
+    order_id: str,
+    token: Optional[str] = Query(None, description="Stream token from POST /orders/{order_id}/stream-token (EventSource)"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncIOMotorDatabase = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Dependency like get_current_user for an order's live stream
+    
+    Browsers' EventSource cannot set an Authorization header, so the
+    stream also accepts ?token=, but only a short-lived stream token
+    bound to this order, never the access token.
+    
+    Args:
+        order_id: Order ID (path parameter)
+        token: Stream token from the query string (used when no header is sent)
+        credentials: JWT from Authorization header (optional)
+        db: Database instance
+        
+    Returns:
+        Current user document
+        
+    Raises:
+        HTTPException: If no token is given, it is invalid or the user is not found
+    """
+    if credentials:
+        return await _get_user_from_token(credentials.credentials, db)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authenticated"
+        )
+    return await _get_user_from_payload(decode_order_stream_token(token, order_id), db)
+
+
+async def _get_user_from_token(token: str, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    """Resolve an active user from an access token (raises HTTPException otherwise)"""
     # Decode token
-    payload = decode_access_token(credentials.credentials)
+    payload = decode_access_token(token)
     
+    # Single-purpose tokens (order streams, uploads) are not access tokens
+    if payload.get("purpose"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload"
+        )
+    return await _get_user_from_payload(payload, db)
+
+
+async def _get_user_from_payload(payload: Dict[str, Any], db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    """Resolve an active user from a decoded token (raises HTTPException otherwise)"""
     # Get user_id from token
     user_id = payload.get("user_id")
     if not user_id:
@@ -52,8 +106,8 @@ async def get_current_user(
             detail="Invalid token payload"
         )
     
-    # Find user in database
-    user = await find_user_by_id(db, user_id)
+    # Find user (request memo -> per-worker cache -> database)
+    user = await get_user_cached(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
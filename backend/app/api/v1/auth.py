@@ -15,6 +15,7 @@ from app.schemas.otp import (
 )
 from app.db import models
 from app.services import otp_service
+from app.services.sms_service import SMSQueueFull
 from app.core.security import create_access_token
 from datetime import datetime
 from typing import Dict, Any
@@ -81,7 +82,8 @@ def convert_user_response(user: Dict[str, Any]) -> Dict[str, Any]:
     responses={
         200: {"description": "OTP đã được gửi thành công"},
         400: {"description": "Số điện thoại không hợp lệ hoặc đã tồn tại"},
-        404: {"description": "Tài khoản không tồn tại (khi reset password)"}
+        404: {"description": "Tài khoản không tồn tại (khi reset password)"},
+        503: {"description": "Hệ thống gửi SMS đang quá tải"}
     }
 )
 async def send_otp(
@@ -108,6 +110,7 @@ async def send_otp(
     Raises:
         HTTPException 400: Số điện thoại đã tồn tại (register)
         HTTPException 404: Tài khoản không tồn tại (reset-password)
+        HTTPException 503: Hàng đợi SMS đã đầy
         
     Example:
         Request:
@@ -143,11 +146,17 @@ async def send_otp(
         )
     
     # Create and send OTP
-    result = await otp_service.create_and_send_otp(
-        db,
-        payload.phone,
-        payload.purpose
-    )
+    try:
+        result = await otp_service.create_and_send_otp(
+            db,
+            payload.phone,
+            payload.purpose
+        )
+    except SMSQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Hệ thống gửi SMS đang quá tải. Vui lòng thử lại sau"
+        )
     
     return result
 
@@ -1,28 +1,65 @@
 """
 Order/Booking API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
-from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Query, Header
+from fastapi.responses import Response, StreamingResponse
+from typing import List, Optional, Tuple, Union
 from bson import ObjectId
 
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_current_user_for_order_stream
 from app.db.session import get_database
 from app.db import models as db_models
 from app.schemas.order import (
     CreateOrderRequest, CreateOrderResponse, OrderResponse, OrderListResponse,
-    UpdateOrderStatusRequest, VehicleType, OrderStatus, PaymentMethod, LocationInfo
+    OrderView, OrderSummaryResponse, OrderSummaryListResponse, OrderEventResponse, OrderEventListResponse,
+    OrderStreamTokenResponse,
+    UpdateOrderStatusRequest, VehicleType, OrderStatus, PaymentMethod, LocationInfo,
+    BatchQuoteRequest, BatchQuoteResponse, QuoteResult,
+    PresignImageUploadRequest, PresignImageUploadResponse,
+    ConfirmImageUploadRequest, ConfirmImageUploadResponse
 )
-from app.services.upload_service import save_order_images, delete_order_images
-from app.services.pricing_service import calculate_distance, calculate_shipping_fee, validate_vehicle_for_weight
+from app.services.upload_service import (
+    save_order_images, delete_order_images, presign_image_upload, confirm_image_upload,
+    MAX_FILES_PER_ORDER
+)
+from app.services.image_service import process_order_images
+from app.services.pricing_service import (
+    calculate_distance, calculate_shipping_fee, calculate_shipping_fees_batch, validate_vehicle_for_weight
+)
+from app.services.order_stream import order_event_bus, format_sse, SSE_HEARTBEAT, TooManySubscribers
+from app.core.config import settings
 from app.core.exceptions import AppException
+from app.core.security import create_order_stream_token
+from app.core.logging import get_logger
+from app.core.serialization import ModelSerializer, dumps
+from app.db.cache import tracking_cache, tracking_code_ids
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
+logger = get_logger("api.orders")
+
+# Read endpoints convert Mongo documents once (no per-row model + response_model validation)
+ORDER_SERIALIZER = ModelSerializer(OrderResponse)
+ORDER_LIST_SERIALIZER = ModelSerializer(OrderListResponse)
+ORDER_SUMMARY_SERIALIZER = ModelSerializer(OrderSummaryResponse)
+ORDER_SUMMARY_LIST_SERIALIZER = ModelSerializer(OrderSummaryListResponse)
+ORDER_EVENT_SERIALIZER = ModelSerializer(OrderEventResponse)
+ORDER_EVENT_LIST_SERIALIZER = ModelSerializer(OrderEventListResponse)
+
+# Statuses after which a live stream has nothing left to send
+FINAL_ORDER_STATUSES = {OrderStatus.DELIVERED.value, OrderStatus.CANCELLED.value, OrderStatus.FAILED.value}
+
+
+def _list_projection(view: OrderView) -> Optional[dict]:
+    """Mongo projection for a list view (None loads full documents)"""
+    return db_models.ORDER_SUMMARY_PROJECTION if view == OrderView.SUMMARY else None
 
 
 @router.post("", response_model=CreateOrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
+    background_tasks: BackgroundTasks,
+    
     # Order data as JSON
     pickup_address: str = Form(...),
     pickup_lat: float = Form(...),
@@ -118,15 +155,6 @@ async def create_order(
             cod_amount=cod_amount
         )
         
-        # Check if user has sufficient balance
-        user = await db_models.find_user_by_id(db, str(current_user["_id"]))
-        if not user:
-            raise AppException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                message="Người dùng không tồn tại"
-            )
-        
-        user_balance = user.get('wallet_info', {}).get('balance', 0)
         total_amount = pricing['total_amount']
         
         # Create order data
@@ -152,9 +180,15 @@ async def create_order(
             "status": OrderStatus.PENDING.value
         }
         
-        # Create order
-        order = await db_models.create_order(db, order_data)
+        # Create order and pay from wallet when the balance allows
+        # (atomic conditional debit + ledger entry, see create_order_with_wallet_payment)
+        order, is_paid = await db_models.create_order_with_wallet_payment(
+            db, order_data,
+            amount=int(round(total_amount)),
+            payment_note=f"Đã thanh toán {total_amount:,.0f} VNĐ từ ví"
+        )
         order_id = str(order["_id"])
+        payment_required = not is_paid
         
         # Upload images if provided
         if images and len(images) > 0:
@@ -162,25 +196,18 @@ async def create_order(
             valid_images = [img for img in images if img.filename]
             if valid_images:
                 try:
-                    image_paths = await save_order_images(valid_images, order_id)
+                    image_paths = await save_order_images(db, valid_images)
                     await db_models.add_images_to_order(db, order_id, image_paths)
-                except Exception as e:
+                    # Thumbnails/WebP variants are generated after the response is sent
+                    background_tasks.add_task(process_order_images, db, order_id, image_paths)
+                except Exception:
                     # Order created but image upload failed
                     # Don't fail the entire request
-                    print(f"Image upload failed: {e}")
-        
-        # Check if payment is required
-        payment_required = True
-        if user_balance >= total_amount:
-            # Sufficient balance - auto-pay and confirm order
-            await db_models.use_credit_from_user(db, str(current_user["_id"]), total_amount)
-            await db_models.update_order_payment(db, order_id, True, PaymentMethod.WALLET.value)
-            await db_models.update_order_status(
-                db, order_id, OrderStatus.CONFIRMED.value,
-                f"Đã thanh toán {total_amount:,.0f} VNĐ từ ví",
-                str(current_user["_id"])
-            )
-            payment_required = False
+                    logger.warning(
+                        "Image upload failed",
+                        exc_info=True,
+                        extra={"fields": {"order_id": order_id}}
+                    )
         
         return CreateOrderResponse(
             success=True,
@@ -202,11 +229,48 @@ async def create_order(
         )
 
 
-@router.get("", response_model=OrderListResponse)
+@router.post("/quote/batch", response_model=BatchQuoteResponse)
+async def quote_batch(
+    request: BatchQuoteRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Price many orders in one request (e.g. to compare pickup points)
+    
+    **Request Body:**
+    - rows: Up to 1000 rows of pickup/dropoff coordinates, weight, vehicle_type and cod_amount
+    
+    Fees are identical to the single-order pricing used by `POST /orders`.
+    Rows that cannot be priced (weight over the vehicle limit) carry an `error`.
+    """
+    rows = request.rows
+    columns = calculate_shipping_fees_batch(
+        pickup_lat=[row.pickup_lat for row in rows],
+        pickup_lng=[row.pickup_lng for row in rows],
+        dropoff_lat=[row.dropoff_lat for row in rows],
+        dropoff_lng=[row.dropoff_lng for row in rows],
+        weight=[row.weight for row in rows],
+        vehicle_type=[row.vehicle_type for row in rows],
+        cod_amount=[row.cod_amount for row in rows]
+    )
+    
+    fields = list(columns.keys())
+    quotes = [
+        QuoteResult(**dict(zip(fields, values)))
+        for values in zip(*columns.values())
+    ]
+    
+    return BatchQuoteResponse(success=True, count=len(quotes), quotes=quotes)
+
+
+@router.get("", response_model=Union[OrderListResponse, OrderSummaryListResponse])
 async def get_my_orders(
     status_filter: Optional[str] = Query(None, alias="status"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+    include_total: Optional[bool] = Query(None),
+    view: OrderView = Query(OrderView.FULL),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -215,30 +279,39 @@ async def get_my_orders(
     
     **Query Parameters:**
     - status: Filter by order status (optional)
-    - page: Page number (default: 1)
+    - page: Page number (default: 1, ignored when cursor is given)
     - limit: Items per page (default: 10, max: 50)
+    - cursor: `next_cursor` from the previous page (keyset pagination, optional)
+    - include_total: Run an exact count of matching orders (default: only on the first page, without cursor)
+    - view: `full` (default) or `summary` (list fields only: no history, images or contact phones)
     """
     try:
         skip = (page - 1) * limit
-        orders, total = await db_models.get_user_orders(
+        if include_total is None:
+            # Count once for the first page; later pages stay a single index seek
+            include_total = page == 1 and not cursor
+        orders, total, next_cursor = await db_models.get_user_orders(
             db,
             str(current_user["_id"]),
             status_filter,
             limit,
-            skip
+            skip,
+            cursor=cursor,
+            include_total=include_total,
+            projection=_list_projection(view)
         )
         
-        # Convert ObjectId to string for response
-        for order in orders:
-            order["_id"] = str(order["_id"])
-        
-        return OrderListResponse(
-            total=total,
-            page=page,
-            limit=limit,
-            orders=[OrderResponse(**order) for order in orders]
-        )
+        serializer = ORDER_SUMMARY_LIST_SERIALIZER if view == OrderView.SUMMARY else ORDER_LIST_SERIALIZER
+        return serializer.response({
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "orders": orders,
+            "next_cursor": next_cursor
+        })
         
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -279,8 +352,252 @@ async def get_order_detail(
                 message="Bạn không có quyền xem đơn hàng này"
             )
         
-        order["_id"] = str(order["_id"])
-        return OrderResponse(**order)
+        return ORDER_SERIALIZER.response(order)
+        
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi server: {str(e)}"
+        )
+
+
+@router.get("/{order_id}/events", response_model=OrderEventListResponse)
+async def get_order_events(
+    order_id: str,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get the full status timeline of an order, oldest first
+    
+    The order itself only carries the latest changes in `history`.
+    
+    **Path Parameters:**
+    - order_id: Order ID
+    
+    **Query Parameters:**
+    - limit: Events per page (default: 50, max: 100)
+    - cursor: `next_cursor` from the previous page (optional)
+    """
+    try:
+        order = await db_models.get_order_by_id(db, order_id)
+        
+        if not order:
+            raise AppException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                message="Đơn hàng không tồn tại"
+            )
+        
+        user_id = str(current_user["_id"])
+        is_owner = order["user_id"] == user_id
+        is_driver = order.get("driver_id") == user_id
+        is_admin = current_user.get("role") == "admin"
+        
+        if not (is_owner or is_driver or is_admin):
+            raise AppException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                message="Bạn không có quyền xem đơn hàng này"
+            )
+        
+        events, next_cursor = await db_models.get_order_events(db, order_id, limit, cursor)
+        
+        return ORDER_EVENT_LIST_SERIALIZER.response({"events": events, "next_cursor": next_cursor})
+        
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi server: {str(e)}"
+        )
+
+
+async def _order_stream(db: AsyncIOMotorDatabase, order_id: str):
+    """
+    SSE body: the current order, then each status change until a final status
+    
+    The snapshot is read after subscribing, so no change can fall between
+    the two; clients may see one event twice and can skip it by its id.
+    """
+    try:
+        subscription = order_event_bus.subscribe(order_id)
+    except TooManySubscribers:
+        return  # Filled up since _stream_response checked; EventSource reconnects
+    
+    with subscription:
+        order = await db_models.get_order_by_id(db, order_id)
+        if not order:
+            return
+        yield format_sse("order", ORDER_SERIALIZER.dump(order))
+        if order["status"] in FINAL_ORDER_STATUSES:
+            return
+        
+        while True:
+            event = await subscription.get(timeout=settings.ORDER_STREAM_HEARTBEAT_SECONDS)
+            if event is None:
+                yield SSE_HEARTBEAT
+                continue
+            yield format_sse("status", ORDER_EVENT_SERIALIZER.dump(event), event_id=str(event["_id"]))
+            if event["status"] in FINAL_ORDER_STATUSES:
+                return
+
+
+def _stream_response(db: AsyncIOMotorDatabase, order_id: str) -> StreamingResponse:
+    """
+    Open a live stream of an order
+    
+    Raises:
+        AppException: If this worker already holds ORDER_STREAM_MAX_SUBSCRIBERS streams
+    """
+    if order_event_bus.subscriber_count >= order_event_bus.max_subscribers:
+        raise AppException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            message="Quá nhiều kết nối theo dõi đơn hàng, vui lòng thử lại sau"
+        )
+    return StreamingResponse(
+        _order_stream(db, order_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/{order_id}/stream-token", response_model=OrderStreamTokenResponse)
+async def create_stream_token(
+    order_id: str,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get a short-lived token for opening an order's live stream
+    
+    EventSource cannot send an Authorization header; pass this token as
+    `?token=` instead of the access token (which would end up in access
+    logs and browser history). It only opens this order's stream and
+    expires after ORDER_STREAM_TOKEN_EXPIRE_MINUTES, so request a new one
+    before reconnecting after it expires.
+    
+    **Path Parameters:**
+    - order_id: Order ID
+    """
+    try:
+        order = await db_models.get_order_by_id(db, order_id)
+        
+        if not order:
+            raise AppException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                message="Đơn hàng không tồn tại"
+            )
+        
+        user_id = str(current_user["_id"])
+        is_owner = order["user_id"] == user_id
+        is_driver = order.get("driver_id") == user_id
+        is_admin = current_user.get("role") == "admin"
+        
+        if not (is_owner or is_driver or is_admin):
+            raise AppException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                message="Bạn không có quyền xem đơn hàng này"
+            )
+        
+        order_id = str(order["_id"])
+        token, expires_at = create_order_stream_token(user_id, order_id)
+        return OrderStreamTokenResponse(
+            token=token,
+            stream_url=f"/api/v1/orders/{order_id}/stream?token={token}",
+            expires_at=expires_at
+        )
+        
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi server: {str(e)}"
+        )
+
+
+@router.get("/{order_id}/stream", response_class=StreamingResponse)
+async def stream_order(
+    order_id: str,
+    current_user: dict = Depends(get_current_user_for_order_stream),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Live order updates (Server-Sent Events), instead of polling the order
+    
+    Sends `event: order` with the current order, then `event: status` with
+    each new timeline event (same shape as GET /orders/{id}/events), and
+    a `: ping` comment every ORDER_STREAM_HEARTBEAT_SECONDS. The stream
+    ends after delivered/cancelled/failed.
+    
+    **Path Parameters:**
+    - order_id: Order ID
+    
+    **Query Parameters:**
+    - token: Stream token from POST /orders/{order_id}/stream-token, for
+      EventSource clients that cannot send an Authorization header
+      (access tokens are not accepted here)
+    """
+    try:
+        order = await db_models.get_order_by_id(db, order_id)
+        
+        if not order:
+            raise AppException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                message="Đơn hàng không tồn tại"
+            )
+        
+        user_id = str(current_user["_id"])
+        is_owner = order["user_id"] == user_id
+        is_driver = order.get("driver_id") == user_id
+        is_admin = current_user.get("role") == "admin"
+        
+        if not (is_owner or is_driver or is_admin):
+            raise AppException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                message="Bạn không có quyền xem đơn hàng này"
+            )
+        
+        return _stream_response(db, str(order["_id"]))
+        
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi server: {str(e)}"
+        )
+
+
+@router.get("/tracking/{tracking_code}/stream", response_class=StreamingResponse)
+async def stream_tracking(
+    tracking_code: str,
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Live updates of a tracked order (Server-Sent Events, public - no auth required)
+    
+    Same events as GET /orders/{order_id}/stream.
+    
+    **Path Parameters:**
+    - tracking_code: Order tracking code (e.g., SW20240115001)
+    """
+    try:
+        order = await db_models.get_order_by_tracking_code(db, tracking_code)
+        
+        if not order:
+            raise AppException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                message="Không tìm thấy đơn hàng với mã vận đơn này"
+            )
+        
+        return _stream_response(db, str(order["_id"]))
         
     except AppException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -291,28 +608,76 @@ async def get_order_detail(
         )
 
 
+def _order_etag(order: dict) -> str:
+    """Strong ETag of an order's JSON (every order write bumps updated_at)"""
+    return f'"{order["updated_at"].strftime("%Y%m%d%H%M%S%f")}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+async def _tracking_response_entry(db: AsyncIOMotorDatabase, tracking_code: str) -> Optional[Tuple[str, bytes]]:
+    """
+    (ETag, JSON body) of a tracked order, from the per-worker cache when possible
+    
+    Entries are keyed by order_id so status events (which carry it) can
+    invalidate them; TRACKING_CACHE_TTL_SECONDS bounds anything missed.
+    
+    Returns:
+        Tuple (etag, body) or None if no order has this tracking code
+    """
+    order_id = tracking_code_ids.get(tracking_code)
+    entry = tracking_cache.get(order_id) if order_id else None
+    if entry:
+        return entry
+    
+    order = await db_models.get_order_by_tracking_code(db, tracking_code)
+    if not order:
+        return None
+    
+    order_id = str(order["_id"])
+    entry = (_order_etag(order), dumps(ORDER_SERIALIZER.dump(order)))
+    tracking_code_ids.set(tracking_code, order_id)
+    tracking_cache.set(order_id, entry)
+    return entry
+
+
 @router.get("/tracking/{tracking_code}", response_model=OrderResponse)
 async def track_order(
     tracking_code: str,
+    if_none_match: Optional[str] = Header(None),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
     Track order by tracking code (public endpoint - no auth required)
     
+    Responses carry an `ETag`; send it back as `If-None-Match` to get an
+    empty 304 while the order is unchanged. For live updates use
+    GET /orders/tracking/{tracking_code}/stream.
+    
     **Path Parameters:**
     - tracking_code: Order tracking code (e.g., SW20240115001)
     """
     try:
-        order = await db_models.get_order_by_tracking_code(db, tracking_code)
+        entry = await _tracking_response_entry(db, tracking_code)
         
-        if not order:
+        if not entry:
             raise AppException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 message="Không tìm thấy đơn hàng với mã vận đơn này"
             )
         
-        order["_id"] = str(order["_id"])
-        return OrderResponse(**order)
+        etag, body = entry
+        # Clients and proxies may store it but must revalidate every time
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
         
     except AppException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
@@ -378,11 +743,14 @@ async def update_order_status_endpoint(
                 message="Bạn không có quyền cập nhật trạng thái đơn hàng này"
             )
         
-        # Update status
-        success = await db_models.update_order_status(
-            db, order_id, request.status.value,
-            request.note, user_id
-        )
+        # Update status (cancellation goes through the refunding path)
+        if request.status == OrderStatus.CANCELLED:
+            success = bool(await db_models.cancel_order_and_refund(db, order_id, user_id))
+        else:
+            success = await db_models.update_order_status(
+                db, order_id, request.status.value,
+                request.note, user_id
+            )
         
         if not success:
             raise AppException(
@@ -442,23 +810,19 @@ async def cancel_order(
                 message="Không thể hủy đơn hàng đã được lấy"
             )
         
-        # Refund if already paid
-        if order.get("is_paid"):
-            await db_models.add_credit_to_user(db, order["user_id"], order["total_amount"])
+        # Cancel order and refund wallet payment (only one concurrent cancel wins)
+        cancelled = await db_models.cancel_order_and_refund(db, order_id, user_id)
         
-        # Cancel order
-        success = await db_models.delete_order(db, order_id)
-        
-        if not success:
+        if not cancelled:
             raise AppException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                message="Không thể hủy đơn hàng"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message="Không thể hủy đơn hàng đã được lấy"
             )
         
         return {
             "success": True,
             "message": "Đã hủy đơn hàng thành công",
-            "refunded": order.get("is_paid", False)
+            "refunded": cancelled.get("is_paid", False)
         }
         
     except AppException as e:
@@ -472,10 +836,14 @@ async def cancel_order(
 
 # ==================== DRIVER ENDPOINTS ====================
 
-@router.get("/available/list", response_model=List[OrderResponse])
+@router.get("/available/list", response_model=Union[List[OrderResponse], List[OrderSummaryResponse]])
 async def get_available_orders(
     vehicle_type: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=50),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: float = Query(10, gt=0, le=100),
+    view: OrderView = Query(OrderView.FULL),
     current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
@@ -485,6 +853,9 @@ async def get_available_orders(
     **Query Parameters:**
     - vehicle_type: Filter by vehicle type (optional)
     - limit: Maximum number of orders (default: 20, max: 50)
+    - lat, lng: Driver position; when given, orders are sorted nearest pickup first
+    - radius_km: Maximum pickup distance when lat/lng are given (default: 10, max: 100)
+    - view: `full` (default) or `summary` (list fields only: no history, images or contact phones)
     
     **Permissions:** Only drivers can access this endpoint
     """
@@ -496,15 +867,86 @@ async def get_available_orders(
                 message="Chỉ tài xế mới có thể xem đơn hàng khả dụng"
             )
         
-        orders = await db_models.get_available_orders(db, vehicle_type, limit)
+        if (lat is None) != (lng is None):
+            raise AppException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                message="Cần cung cấp cả lat và lng"
+            )
+        
+        orders = await db_models.get_available_orders(
+            db, vehicle_type, limit,
+            lat=lat, lng=lng, radius_km=radius_km,
+            projection=_list_projection(view)
+        )
+        
+        serializer = ORDER_SUMMARY_SERIALIZER if view == OrderView.SUMMARY else ORDER_SERIALIZER
+        return serializer.list_response(orders)
+        
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi server: {str(e)}"
+        )
+
+
+@router.get("/driver/list", response_model=Union[OrderListResponse, OrderSummaryListResponse])
+async def get_driver_orders(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(False),
+    view: OrderView = Query(OrderView.FULL),
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get orders assigned to the current driver
+    
+    **Query Parameters:**
+    - status: Filter by order status (optional)
+    - page: Page number (default: 1, ignored when cursor is given)
+    - limit: Items per page (default: 10, max: 50)
+    - cursor: `next_cursor` from the previous page (keyset pagination, optional)
+    - include_total: Run an exact count of matching orders (default: false)
+    - view: `full` (default) or `summary` (list fields only: no history, images or contact phones)
+    
+    **Permissions:** Only drivers can access this endpoint
+    """
+    try:
+        if current_user.get("role") != "driver":
+            raise AppException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                message="Chỉ tài xế mới có thể xem đơn hàng được giao"
+            )
         
-        for order in orders:
-            order["_id"] = str(order["_id"])
+        skip = (page - 1) * limit
+        orders, total, next_cursor = await db_models.get_driver_orders(
+            db,
+            str(current_user["_id"]),
+            status_filter,
+            limit,
+            skip,
+            cursor=cursor,
+            include_total=include_total,
+            projection=_list_projection(view)
+        )
         
-        return [OrderResponse(**order) for order in orders]
+        serializer = ORDER_SUMMARY_LIST_SERIALIZER if view == OrderView.SUMMARY else ORDER_LIST_SERIALIZER
+        return serializer.response({
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "orders": orders,
+            "next_cursor": next_cursor
+        })
         
     except AppException as e:
         raise HTTPException(status_code=e.status_code, detail=e.message)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -525,6 +967,11 @@ async def accept_order(
     - order_id: Order ID
     
     **Permissions:** Only drivers can accept orders
+    
+    **Errors:**
+    - 404: Order not found
+    - 409: Order already taken by another driver
+    - 400: Order is not in an acceptable status
     """
     try:
         # Check if user is a driver
@@ -534,42 +981,32 @@ async def accept_order(
                 message="Chỉ tài xế mới có thể nhận đơn hàng"
             )
         
-        order = await db_models.get_order_by_id(db, order_id)
+        # Assign driver and move to picking_up in one conditional write
+        driver_id = str(current_user["_id"])
+        order = await db_models.claim_order(
+            db, order_id, driver_id,
+            OrderStatus.PICKING_UP.value,
+            "Tài xế đang đến lấy hàng"
+        )
         
         if not order:
-            raise AppException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                message="Đơn hàng không tồn tại"
-            )
-        
-        if order.get("driver_id"):
-            raise AppException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                message="Đơn hàng đã được tài xế khác nhận"
-            )
-        
-        if order["status"] not in ["pending", "confirmed"]:
+            # Lost the race or not claimable: one extra read on the failure path only
+            existing = await db_models.get_order_by_id(db, order_id)
+            if not existing:
+                raise AppException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    message="Đơn hàng không tồn tại"
+                )
+            if existing.get("driver_id"):
+                raise AppException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    message="Đơn hàng đã được tài xế khác nhận"
+                )
             raise AppException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 message="Đơn hàng không ở trạng thái có thể nhận"
             )
         
-        # Assign driver
-        driver_id = str(current_user["_id"])
-        success = await db_models.assign_driver_to_order(db, order_id, driver_id)
-        
-        if not success:
-            raise AppException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                message="Không thể nhận đơn hàng"
-            )
-        
-        # Update status to picking_up
-        await db_models.update_order_status(
-            db, order_id, OrderStatus.PICKING_UP.value,
-            "Tài xế đang đến lấy hàng", driver_id
-        )
-        
         return {
             "success": True,
             "message": "Đã nhận đơn hàng thành công",
@@ -584,3 +1021,95 @@ async def accept_order(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Lỗi server: {str(e)}"
         )
+
+
+async def _get_own_order_for_images(db: AsyncIOMotorDatabase, order_id: str, current_user: dict) -> dict:
+    """Load an order the current user may add images to"""
+    order = await db_models.get_order_by_id(db, order_id)
+    if not order:
+        raise AppException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            message="Đơn hàng không tồn tại"
+        )
+    if order["user_id"] != str(current_user["_id"]):
+        raise AppException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            message="Bạn không có quyền cập nhật đơn hàng này"
+        )
+    if len(order.get("images", [])) >= MAX_FILES_PER_ORDER:
+        raise AppException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            message=f"Tối đa {MAX_FILES_PER_ORDER} ảnh cho mỗi đơn hàng"
+        )
+    return order
+
+
+@router.post("/{order_id}/images/presign", response_model=PresignImageUploadResponse)
+async def presign_order_image(
+    order_id: str,
+    request: PresignImageUploadRequest,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Get a URL to upload an order image directly to storage
+    
+    The client computes the SHA-256 of the file, uploads it with the
+    returned method, URL and headers (skipped when upload_required is
+    false), then calls POST /orders/{order_id}/images/confirm.
+    """
+    try:
+        await _get_own_order_for_images(db, order_id, current_user)
+        upload = await presign_image_upload(
+            db, request.filename, request.content_type, request.size, request.sha256
+        )
+        return PresignImageUploadResponse(**upload)
+        
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi server: {str(e)}"
+        )
+
+
+@router.post("/{order_id}/images/confirm", response_model=ConfirmImageUploadResponse)
+async def confirm_order_image(
+    order_id: str,
+    request: ConfirmImageUploadRequest,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user),
+    db: AsyncIOMotorDatabase = Depends(get_database)
+):
+    """
+    Attach an image uploaded through a presigned URL to the order
+    """
+    try:
+        order = await _get_own_order_for_images(db, order_id, current_user)
+        image_url = await confirm_image_upload(db, request.filename, request.sha256)
+        
+        if image_url not in order.get("images", []):
+            await db_models.add_images_to_order(db, order_id, [image_url])
+            background_tasks.add_task(process_order_images, db, order_id, [image_url])
+        else:
+            # Already attached: drop the reference taken by this confirm
+            await delete_order_images(db, [image_url])
+        
+        return ConfirmImageUploadResponse(
+            success=True,
+            message="Đã thêm ảnh vào đơn hàng",
+            image_url=image_url
+        )
+        
+    except AppException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi server: {str(e)}"
+        )
@@ -2,7 +2,7 @@
 API v1 Router - Combine all v1 endpoints
 """
 from fastapi import APIRouter
-from app.api.v1 import auth, user, wallet, orders
+from app.api.v1 import auth, user, wallet, orders, uploads
 
 
 # Create main API router
@@ -12,4 +12,5 @@ api_router = APIRouter()
 api_router.include_router(auth.router)
 api_router.include_router(user.router)
 api_router.include_router(wallet.router)
-api_router.include_router(orders.router)
\ No newline at end of file
+api_router.include_router(orders.router)
+api_router.include_router(uploads.router)
@@ -0,0 +1,22 @@
+"""
+Direct upload endpoint for the filesystem storage backend
+"""
+from fastapi import APIRouter, Request
+
+from app.services.upload_service import receive_direct_upload
+
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+
+@router.put("/direct/{token}", response_model=dict)
+async def direct_upload(token: str, request: Request):
+    """
+    Receive a file uploaded with a URL from POST /orders/{order_id}/images/presign
+    
+    Only used by the filesystem backend; with S3 storage clients upload
+    straight to the bucket. The token authorizes exactly one file (key,
+    size and SHA-256), so no bearer token is needed.
+    """
+    key = await receive_direct_upload(token, request.stream())
+    return {"success": True, "key": key}
@@ -1,9 +1,10 @@
 """
 Wallet API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from bson import ObjectId
+from typing import Optional
 
 from app.api.deps import get_current_user, get_database
 from app.schemas.user import UserResponse
@@ -25,15 +26,19 @@ from app.db.models import (
     update_transaction_status,
     add_to_wallet
 )
+from app.db.pagination import split_page
 from app.services.payment_service import PaymentService
+from app.core.serialization import ModelSerializer
 
 
 router = APIRouter(prefix="/wallet", tags=["wallet"])
 
+TRANSACTION_LIST_SERIALIZER = ModelSerializer(TransactionListResponse)
+
 
 @router.get("/", response_model=WalletResponse)
 async def get_wallet(
-    current_user: UserResponse = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
@@ -46,7 +51,7 @@ async def get_wallet(
         - pending_transactions: Number of pending transactions
         - recent_transactions: List of recent transactions
     """
-    wallet_info = await get_wallet_info(db, str(current_user.id))
+    wallet_info = await get_wallet_info(db, str(current_user["_id"]))
     
     if not wallet_info:
         raise HTTPException(
@@ -87,10 +92,11 @@ async def get_wallet(
 
 @router.get("/transactions", response_model=TransactionListResponse)
 async def get_transactions(
-    limit: int = 50,
-    skip: int = 0,
-    transaction_type: str = None,
-    current_user: UserResponse = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=100),
+    skip: int = Query(0, ge=0),
+    transaction_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
@@ -98,53 +104,40 @@ async def get_transactions(
     
     Query Parameters:
         - limit: Maximum number of transactions (default: 50, max: 100)
-        - skip: Number of transactions to skip (for pagination)
+        - skip: Number of transactions to skip (ignored when cursor is given)
         - transaction_type: Filter by type (topup, usage, refund)
+        - cursor: `next_cursor` from the previous page (keyset pagination)
     
     Returns:
-        List of transactions
+        Transactions of this page (`total` is their count, not the number of
+        matching transactions) and the cursor of the next page
     """
-    # Limit validation
-    if limit > 100:
-        limit = 100
+    try:
+        transactions = await get_user_transactions(
+            db,
+            str(current_user["_id"]),
+            limit=limit + 1,
+            skip=skip,
+            transaction_type=transaction_type,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    transactions = await get_user_transactions(
-        db,
-        str(current_user.id),
-        limit=limit,
-        skip=skip,
-        transaction_type=transaction_type
-    )
+    transactions, next_cursor = split_page(transactions, limit)
     
-    # Convert to response format
-    transaction_list = []
-    for tx in transactions:
-        tx_dict = {
-            "_id": str(tx['_id']),
-            "user_id": tx['user_id'],
-            "amount": tx['amount'],
-            "type": tx['type'],
-            "description": tx.get('description'),
-            "status": tx['status'],
-            "payment_id": tx.get('payment_id'),
-            "payment_method": tx.get('payment_method'),
-            "payment_details": tx.get('payment_details'),
-            "created_at": tx['created_at'],
-            "updated_at": tx['updated_at'],
-            "completed_at": tx.get('completed_at')
-        }
-        transaction_list.append(TransactionResponse(**tx_dict))
-    
-    return TransactionListResponse(
-        total=len(transaction_list),
-        transactions=transaction_list
-    )
+    # Documents are converted once by the precompiled serializer
+    return TRANSACTION_LIST_SERIALIZER.response({
+        "total": len(transactions),
+        "transactions": transactions,
+        "next_cursor": next_cursor
+    })
 
 
 @router.post("/topup", response_model=TopUpResponse)
 async def create_topup(
     request: TopUpRequest,
-    current_user: UserResponse = Depends(get_current_user),
+    current_user: dict = Depends(get_current_user),
     db: AsyncIOMotorDatabase = Depends(get_database)
 ):
     """
@@ -168,19 +161,19 @@ async def create_topup(
     if request.payment_method in ['qr', 'bank_transfer']:
         payment_info = payment_service.create_bank_transfer_payment(
             amount=request.amount,
-            user_id=str(current_user.id)
+            user_id=str(current_user["_id"])
         )
     elif request.payment_method == 'momo':
         payment_info = payment_service.create_momo_payment(
             amount=request.amount,
-            user_id=str(current_user.id),
-            order_info=f"Nap tien Shipway - {current_user.name}"
+            user_id=str(current_user["_id"]),
+            order_info=f"Nap tien Shipway - {current_user['name']}"
         )
     elif request.payment_method == 'vnpay':
         payment_info = payment_service.create_vnpay_payment(
             amount=request.amount,
-            user_id=str(current_user.id),
-            order_info=f"Nap tien Shipway - {current_user.name}"
+            user_id=str(current_user["_id"]),
+            order_info=f"Nap tien Shipway - {current_user['name']}"
         )
     else:
         raise HTTPException(
@@ -190,7 +183,7 @@ async def create_topup(
     
     # Create transaction record
     transaction_data = {
-        "user_id": str(current_user.id),
+        "user_id": str(current_user["_id"]),
         "amount": request.amount,
         "type": "topup",
         "description": f"Nạp tiền qua {request.payment_method}",
@@ -249,11 +242,11 @@ async def verify_payment(
             message="Transaction not found"
         )
     
-    # Check if transaction is already completed
-    if transaction['status'] == 'completed':
+    # Only pending transactions can be settled (not completed, failed or expired)
+    if transaction['status'] != 'pending':
         return PaymentVerificationResponse(
             success=False,
-            message="Transaction already completed"
+            message=f"Transaction already {transaction['status']}"
         )
     
     # Verify signature (in production)
@@ -278,12 +271,20 @@ async def verify_payment(
             "payment_time": request.payment_time.isoformat() if request.payment_time else None
         }
         
-        await update_transaction_status(
+        # Conditional on still being pending, so a top-up expired (or settled
+        # by a duplicate callback) since the check above is never credited
+        completed = await update_transaction_status(
             db,
             str(transaction['_id']),
             'completed',
-            payment_details
+            payment_details,
+            expected_status='pending'
         )
+        if not completed:
+            return PaymentVerificationResponse(
+                success=False,
+                message="Transaction is no longer pending"
+            )
         
         # Add credit to user
         user = await add_to_wallet(
@@ -305,7 +306,8 @@ async def verify_payment(
         await update_transaction_status(
             db,
             str(transaction['_id']),
-            'failed'
+            'failed',
+            expected_status='pending'
         )
         
         return PaymentVerificationResponse(
@@ -18,6 +18,7 @@ class Settings(BaseSettings):
     MONGODB_URL: Optional[str] = None
     DB_NAME: Optional[str] = None
     MONGODB_DB_NAME: Optional[str] = None
+    ENSURE_INDEXES_ON_STARTUP: bool = True
     
     # JWT - Support both naming conventions
     SECRET_KEY: Optional[str] = None
@@ -26,15 +27,80 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: Optional[int] = None
     JWT_EXPIRE_MINUTES: Optional[int] = None
     
+    # Authenticated user cache (per worker)
+    USER_CACHE_TTL_SECONDS: float = 30
+    USER_CACHE_MAX_SIZE: int = 10000
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4  # Threads used for bcrypt off the event loop
+    
     # OTP
     OTP_EXPIRE_MINUTES: int = 5
     OTP_MAX_ATTEMPTS: int = 5
+    OTP_STORE: str = "mongo"  # "mongo" | "memory" (single worker only)
+    OTP_MEMORY_MAX_SIZE: int = 100000
+    
+    # Orders
+    TRACKING_CODE_BLOCK_SIZE: int = 1  # >1 reserves tracking code ranges per worker
+    ORDER_HISTORY_SNAPSHOT_SIZE: int = 10  # Latest status events kept on the order (full timeline: order_events)
+    
+    # Live order streams (SSE)
+    ORDER_STREAM_MAX_SUBSCRIBERS: int = 10000  # Open streams per worker
+    ORDER_STREAM_QUEUE_SIZE: int = 16  # Events buffered per stream before the oldest is dropped
+    ORDER_STREAM_HEARTBEAT_SECONDS: float = 15.0  # Keep-alive comment interval
+    ORDER_STREAM_TOKEN_EXPIRE_MINUTES: int = 5  # Lifetime of ?token= stream tokens (checked when a stream opens)
+    
+    # Public tracking response cache (per worker; 0 disables)
+    TRACKING_CACHE_TTL_SECONDS: float = 5
+    TRACKING_CACHE_MAX_SIZE: int = 10000
+    
+    # Images
+    IMAGE_WORKERS: int = 2  # Processes generating resized image variants
+    
+    # Upload storage
+    STORAGE_BACKEND: str = "filesystem"  # "filesystem" | "s3"
+    PRESIGNED_UPLOAD_EXPIRE_SECONDS: int = 900
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None  # MinIO / moto; empty for AWS
+    S3_REGION: str = "us-east-1"
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_PUBLIC_URL: Optional[str] = None  # CDN or public bucket URL
+    
+    # Scheduler (maintenance jobs)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_BATCH_SIZE: int = 500  # Documents per batch
+    SCHEDULER_MAX_BATCHES: int = 20  # Batches per job run
+    OTP_CLEANUP_INTERVAL_SECONDS: int = 300
+    TOPUP_EXPIRY_INTERVAL_SECONDS: int = 60
     
     # Twilio (Optional - for SMS)
     TWILIO_ACCOUNT_SID: Optional[str] = None
     TWILIO_AUTH_TOKEN: Optional[str] = None
     TWILIO_PHONE_NUMBER: Optional[str] = None
     
+    # SMS queue
+    SMS_PROVIDER: Optional[str] = None  # "twilio" | "fake" (default: twilio if configured)
+    SMS_WORKERS: int = 4
+    SMS_QUEUE_SIZE: int = 1000
+    SMS_MAX_RETRIES: int = 3
+    SMS_RETRY_BACKOFF_SECONDS: float = 1.0
+    SMS_RATE_PER_SECOND: float = 10.0  # Provider send rate limit (0 = unlimited)
+    
+    # Logging (JSON lines on stdout, written by a background thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" | "text" (local development)
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped, never waited on
+    LOG_SAMPLE_RATE: float = 0.1  # Share of high-volume (sampled) records kept
+    LOG_REDACT: bool = True  # Mask phone numbers and OTP codes
+    
+    # Responses
+    TRUSTED_RESPONSES: bool = True  # List/detail endpoints skip response_model validation
+    
+    # Metrics (Prometheus, served at /metrics)
+    METRICS_ENABLED: bool = True
+    
     # Environment
     NODE_ENV: str = "development"
     
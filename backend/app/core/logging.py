@@ -0,0 +1,193 @@
+"""
+Structured logging - JSON records written off the request path
+
+Handlers only put records on a bounded queue; a QueueListener thread
+formats and writes them, so request handlers never block on stdout.
+
+Usage:
+    logger = get_logger("otp")
+    logger.info("OTP created", extra={"fields": {"phone": phone}, "sampled": True})
+
+- fields: extra key/values of the record (redacted like the message)
+- sampled: high-volume record, kept with probability LOG_SAMPLE_RATE
+"""
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.core.metrics import LOG_RECORDS_DROPPED
+from app.core.request_context import get_request_id
+
+
+ROOT_LOGGER = "shipway"
+
+# Field names whose values are never logged
+SECRET_FIELDS = {"otp", "otp_code", "code", "password", "token", "access_token"}
+
+# Field names holding phone numbers (masked, last 3 digits kept)
+PHONE_FIELDS = {"phone", "to"}
+
+# Phone numbers in free text: 0xxxxxxxxx / +84xxxxxxxxx (not inside IDs)
+PHONE_RE = re.compile(r"(?<![\w+])\+?\d{6,12}(\d{3})(?!\w)")
+
+# OTP codes in free text ("OTP ... 123456")
+OTP_RE = re.compile(r"(?i)(otp\D{0,30}?)\d{4,8}")
+
+_listener: Optional[QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the application namespace (shipway.<name>)"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def redact(value: Any) -> Any:
+    """Mask phone numbers and OTP codes in a string (other values unchanged)"""
+    if not isinstance(value, str):
+        return value
+    value = OTP_RE.sub(r"\1******", value)
+    return PHONE_RE.sub(r"***\1", value)
+
+
+def redact_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Redact the extra fields of a record by name and content"""
+    redacted = {}
+    for key, value in fields.items():
+        if key in SECRET_FIELDS:
+            redacted[key] = "***"
+        elif key in PHONE_FIELDS and value is not None:
+            value = str(value)
+            redacted[key] = f"***{value[-3:]}"
+        else:
+            redacted[key] = redact(value)
+    return redacted
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Attach the request ID and apply sampling (runs on the calling thread)
+
+    The request ID lives in a context variable, so it must be read before
+    the record crosses to the listener thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", False) and record.levelno < logging.WARNING:
+            if random.random() >= settings.LOG_SAMPLE_RATE:
+                LOG_RECORDS_DROPPED.labels("sampled").inc()
+                return False
+        record.request_id = get_request_id()
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the traceback separate from the message (formatted by the listener)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels("queue_full").inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (ts, level, logger, msg, request_id, fields, exc)"""
+
+    def __init__(self, redact_values: bool = True):
+        super().__init__()
+        self.redact_values = redact_values
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        fields = getattr(record, "fields", None) or {}
+        if self.redact_values:
+            message = redact(message)
+            fields = redact_fields(fields)
+
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": message
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(JsonFormatter):
+    """Human-readable lines for local development ([LEVEL] logger: msg key=value)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        fields = getattr(record, "fields", None) or {}
+        if self.redact_values:
+            message = redact(message)
+            fields = redact_fields(fields)
+
+        line = f"[{record.levelname}] {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            line += f" (request {request_id})"
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+def setup_logging() -> None:
+    """
+    Route the application loggers through a background queue listener (idempotent)
+
+    Called first in the app lifespan; `shutdown_logging` flushes the queue.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter_class = TextFormatter if settings.LOG_FORMAT == "text" else JsonFormatter
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter_class(redact_values=settings.LOG_REDACT))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.handlers = [queue_handler]
+    logger.setLevel(settings.LOG_LEVEL.upper())
+    logger.propagate = False
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Stop the listener thread after writing queued records"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
+    logging.getLogger(ROOT_LOGGER).handlers = []
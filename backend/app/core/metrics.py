@@ -0,0 +1,275 @@
+"""
+Prometheus metrics (HTTP routes and MongoDB commands)
+"""
+import os
+import time
+from typing import Any, Dict, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from pymongo import monitoring
+from starlette.routing import Match
+
+
+# Route label of requests that match no route (keeps 404 scans out of the label set)
+UNMATCHED_ROUTE = "<unmatched>"
+
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+# ==================== HTTP ====================
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"]
+)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template and status code",
+    ["method", "route", "status"]
+)
+
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum"
+)
+
+
+def resolve_route(scope: Dict[str, Any]) -> str:
+    """
+    Route template of a request (e.g. /api/v1/orders/{order_id})
+
+    Templates, not raw paths, are used as labels so IDs in the URL do not
+    create a time series per order.
+
+    Args:
+        scope: ASGI scope (scope["app"] is set by Starlette)
+
+    Returns:
+        Route template, mount path for static files, or UNMATCHED_ROUTE
+    """
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    if router is None:
+        return UNMATCHED_ROUTE
+
+    partial = None
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path or "/"
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path  # Path matched, method did not (405)
+    return partial or UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency, status and in-flight requests per route
+
+    Add it last so it is the outermost middleware and times the whole stack.
+    """
+
+    def __init__(self, app, exclude_paths: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = resolve_route(scope)
+        status_code = 500  # Reported if the app raises before responding
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            status = str(status_code)
+            HTTP_REQUESTS.labels(method, route, status).inc()
+            HTTP_REQUEST_DURATION.labels(method, route, status).observe(elapsed)
+
+
+# ==================== MONGODB ====================
+
+MONGO_COMMAND_DURATION = Histogram(
+    "mongodb_command_duration_seconds",
+    "MongoDB command latency by collection and command",
+    ["collection", "command", "status"],
+    buckets=MONGO_BUCKETS
+)
+
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongodb_pool_connections",
+    "Open connections in the MongoDB pool",
+    ["address"],
+    multiprocess_mode="livesum"
+)
+
+MONGO_POOL_CHECKED_OUT = Gauge(
+    "mongodb_pool_checked_out_connections",
+    "Connections currently checked out of the MongoDB pool",
+    ["address"],
+    multiprocess_mode="livesum"
+)
+
+MONGO_POOL_MAX_SIZE = Gauge(
+    "mongodb_pool_max_size",
+    "maxPoolSize of the MongoDB client (per server)",
+    multiprocess_mode="max"
+)
+
+MONGO_POOL_CHECKOUT_FAILURES = Counter(
+    "mongodb_pool_checkout_failures_total",
+    "Failed connection checkouts (pool timeout, connection error, ...)",
+    ["address", "reason"]
+)
+
+
+def _address_label(address: Tuple[str, int]) -> str:
+    return f"{address[0]}:{address[1]}"
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    pymongo command listener recording per-collection, per-command timings
+
+    Succeeded/failed events do not carry the collection, so it is kept
+    from the started event until the command finishes. Listeners run on
+    the driver's threads; the pending dict only sees atomic operations.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[Any, int, int], str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple[Any, int, int]:
+        return (event.connection_id, event.request_id, event.operation_id)
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        self._pending[self._key(event)] = target if isinstance(target, str) else ""
+
+    def _observe(self, event, status: str) -> None:
+        collection = self._pending.pop(self._key(event), "")
+        MONGO_COMMAND_DURATION.labels(collection, event.command_name, status).observe(
+            event.duration_micros / 1_000_000
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._observe(event, "ok")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._observe(event, "error")
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """pymongo pool listener keeping open / checked-out connection gauges"""
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        address = _address_label(event.address)
+        MONGO_POOL_CONNECTIONS.labels(address).set(0)
+        MONGO_POOL_CHECKED_OUT.labels(address).set(0)
+
+    def connection_created(self, event) -> None:
+        MONGO_POOL_CONNECTIONS.labels(_address_label(event.address)).inc()
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        MONGO_POOL_CONNECTIONS.labels(_address_label(event.address)).dec()
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        MONGO_POOL_CHECKOUT_FAILURES.labels(_address_label(event.address), str(event.reason)).inc()
+
+    def connection_checked_out(self, event) -> None:
+        MONGO_POOL_CHECKED_OUT.labels(_address_label(event.address)).inc()
+
+    def connection_checked_in(self, event) -> None:
+        MONGO_POOL_CHECKED_OUT.labels(_address_label(event.address)).dec()
+
+
+def mongo_event_listeners() -> list:
+    """Listeners to pass to the Motor client (event_listeners=...)"""
+    return [MongoCommandMetrics(), MongoPoolMetrics()]
+
+
+# ==================== ORDER STREAMS ====================
+
+ORDER_STREAM_SUBSCRIBERS = Gauge(
+    "order_stream_subscribers",
+    "Open live order streams (SSE connections)",
+    multiprocess_mode="livesum"
+)
+
+ORDER_STREAM_EVENTS = Counter(
+    "order_stream_events_total",
+    "Order events fanned out to live streams (dropped = slow client, oldest event discarded)",
+    ["result"]
+)
+
+
+# ==================== LOGGING ====================
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records not written (sampled out, or log queue full)",
+    ["reason"]
+)
+
+
+# ==================== EXPOSITION ====================
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format
+
+    With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR (an empty
+    directory shared by the workers) so every worker's samples are merged.
+
+    Returns:
+        (body, content type)
+    """
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,93 @@
+"""
+Request-scoped context (per HTTP request)
+"""
+import re
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Incoming request IDs are reused only if they look like IDs (no log injection)
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Memo of values loaded during the current request (e.g. users by id)
+_request_memo: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_memo", default=None)
+
+# Correlation ID of the current request (logs, X-Request-ID response header)
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+def get_request_memo() -> Optional[Dict[str, Any]]:
+    """
+    Get the memo dict of the current request
+
+    Returns:
+        Memo dict, or None outside of an HTTP request (scripts, jobs)
+    """
+    return _request_memo.get()
+
+
+def get_request_id() -> Optional[str]:
+    """
+    Get the correlation ID of the current request
+
+    Returns:
+        Request ID, or None outside of an HTTP request
+    """
+    return _request_id.get()
+
+
+@contextmanager
+def request_id_context(request_id: Optional[str]) -> Iterator[None]:
+    """Run a block under a request ID (background work started by a request)"""
+    token = _request_id.set(request_id)
+    try:
+        yield
+    finally:
+        _request_id.reset(token)
+
+
+class RequestContextMiddleware:
+    """
+    Pure ASGI middleware that opens a fresh request context per HTTP request
+
+    Pure ASGI (not BaseHTTPMiddleware) so the context variables set here are
+    visible to dependencies and handlers of the same request. The request
+    ID is taken from the X-Request-ID header when valid (set by a proxy or
+    the client), otherwise generated, and echoed in the response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        header_name = REQUEST_ID_HEADER.lower().encode("latin-1")
+        for name, value in scope["headers"]:
+            if name == header_name:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id or not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((header_name, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        memo_token = _request_memo.set({})
+        id_token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(id_token)
+            _request_memo.reset(memo_token)
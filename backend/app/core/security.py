@@ -1,20 +1,29 @@
 """
 Security utilities for JWT and password hashing
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import bcrypt
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from app.core.config import settings
 
 
+# Bounded pool for bcrypt work (bcrypt releases the GIL while hashing)
+_password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="bcrypt"
+)
+
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     # Convert password to bytes
     password_bytes = password.encode('utf-8')
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     # Return as string
     return hashed.decode('utf-8')
@@ -29,6 +38,20 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(password_bytes, hashed_bytes)
 
 
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the bcrypt pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_hash_executor, hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bcrypt pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _password_hash_executor, verify_password, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """
     Create JWT access token
@@ -84,3 +107,54 @@ def decode_access_token(token: str) -> Dict[str, Any]:
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+ORDER_STREAM_TOKEN_PURPOSE = "order_stream"
+
+
+def create_order_stream_token(user_id: str, order_id: str) -> Tuple[str, datetime]:
+    """
+    Create a short-lived token that only opens one order's live stream
+    
+    EventSource cannot send headers, so the stream takes its token from
+    the query string, where it ends up in access logs and browser
+    history; this token is useless for anything else and expires after
+    ORDER_STREAM_TOKEN_EXPIRE_MINUTES.
+    
+    Args:
+        user_id: User the stream is opened for
+        order_id: Order the token is bound to
+        
+    Returns:
+        Tuple (token, expiry time)
+    """
+    expires_delta = timedelta(minutes=settings.ORDER_STREAM_TOKEN_EXPIRE_MINUTES)
+    token = create_access_token(
+        {"user_id": user_id, "order_id": order_id, "purpose": ORDER_STREAM_TOKEN_PURPOSE},
+        expires_delta
+    )
+    return token, datetime.utcnow() + expires_delta
+
+
+def decode_order_stream_token(token: str, order_id: str) -> Dict[str, Any]:
+    """
+    Decode a token from create_order_stream_token
+    
+    Args:
+        token: Stream token
+        order_id: Order whose stream is being opened
+        
+    Returns:
+        Decoded token payload
+        
+    Raises:
+        HTTPException: If the token is invalid, expired, not a stream token
+            or bound to another order
+    """
+    payload = decode_access_token(token)
+    if payload.get("purpose") != ORDER_STREAM_TOKEN_PURPOSE or payload.get("order_id") != order_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials"
+        )
+    return payload
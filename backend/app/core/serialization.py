@@ -0,0 +1,154 @@
+"""
+Fast JSON responses - orjson rendering and precompiled document serializers
+"""
+import types
+import typing
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.core.config import settings
+
+
+def _default(value: Any) -> Any:
+    """Types orjson does not serialize natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", by_alias=True)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes (ObjectId as string, datetime as ISO 8601)"""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson
+
+    Used as the app's default response class; endpoints returning it
+    directly also skip FastAPI's response_model validation.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ==================== PRECOMPILED SERIALIZERS ====================
+
+Converter = Optional[Callable[[Any], Any]]
+
+
+def _to_str(value: Any) -> Any:
+    return value if value is None or type(value) is str else str(value)
+
+
+def _to_float(value: Any) -> Any:
+    return float(value) if type(value) is int else value
+
+
+def _enum_value(value: Any) -> Any:
+    return value.value if isinstance(value, Enum) else value
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if typing.get_origin(annotation) in (typing.Union, types.UnionType):
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _compile_converter(annotation: Any) -> Converter:
+    """Converter for values of a field type (None when values pass through as-is)"""
+    annotation = _unwrap_optional(annotation)
+    origin = typing.get_origin(annotation)
+
+    if origin in (list, List):
+        (item,) = typing.get_args(annotation) or (Any,)
+        convert_item = _compile_converter(item)
+        if convert_item is None:
+            return None
+        return lambda values: None if values is None else [convert_item(v) for v in values]
+
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            nested = ModelSerializer(annotation)
+            return lambda value: None if value is None else nested.convert(value)
+        if issubclass(annotation, Enum):
+            return _enum_value
+        if annotation is str:
+            return _to_str  # ObjectId -> str
+        if annotation is float:
+            return _to_float  # Mongo may hold ints; keep the documented type
+    return None  # datetime, dict, int, bool, Any: orjson handles them
+
+
+class ModelSerializer:
+    """
+    Converts trusted documents to a model's JSON shape without validation
+
+    Built once per response model: each field's output key (alias, like
+    FastAPI's by_alias output), default and converter are resolved up front,
+    so dumping a document is one pass over the fields. Documents are
+    assumed to be well-formed (they come from our own writes); set
+    TRUSTED_RESPONSES=false to also validate the output through the model.
+
+    Args:
+        model: Pydantic response model
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.fields: List[Tuple[str, str, Any, Optional[Callable[[], Any]], Converter]] = []
+        for name, info in model.model_fields.items():
+            key = info.alias or name
+            default = None if info.is_required() else info.default
+            self.fields.append((key, name, default, info.default_factory, _compile_converter(info.annotation)))
+
+    def convert(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Map one document (keyed by alias or field name) to the model's JSON shape"""
+        if isinstance(document, BaseModel):
+            return document.model_dump(mode="json", by_alias=True)
+
+        output = {}
+        for key, name, default, default_factory, convert in self.fields:
+            if key in document:
+                value = document[key]
+            elif name in document:
+                value = document[name]
+            elif default_factory is not None:
+                value = default_factory()
+            else:
+                value = default
+            output[key] = value if convert is None or value is None else convert(value)
+        return output
+
+    def dump(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert one document to response JSON data
+
+        With TRUSTED_RESPONSES=false the result is validated once against
+        the model, surfacing schema drift as errors.
+        """
+        output = self.convert(document)
+        if not settings.TRUSTED_RESPONSES:
+            return self.model.model_validate(output).model_dump(mode="json", by_alias=True)
+        return output
+
+    def dump_many(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.dump(document) for document in documents]
+
+    def response(self, document: Dict[str, Any], status_code: int = 200) -> FastJSONResponse:
+        """Response with one converted document (bypasses response_model validation)"""
+        return FastJSONResponse(self.dump(document), status_code=status_code)
+
+    def list_response(self, documents: List[Dict[str, Any]], status_code: int = 200) -> FastJSONResponse:
+        """Response with a JSON array of converted documents"""
+        return FastJSONResponse(self.dump_many(documents), status_code=status_code)
@@ -0,0 +1,85 @@
+"""
+In-process caches (per worker)
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+from app.core.config import settings
+
+
+class TTLCache:
+    """
+    Small LRU cache with per-entry time-to-live and hit/miss counters
+
+    Not shared between workers: every uvicorn worker keeps its own copy,
+    so entries must be invalidated explicitly on local writes and
+    bounded by a short TTL for writes made by other workers.
+
+    Args:
+        max_size: Maximum number of entries (least recently used are evicted)
+        ttl_seconds: Lifetime of an entry
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a live entry or None"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store an entry, evicting the least recently used one if full"""
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop an entry if present"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Authenticated user documents keyed by user_id (str)
+user_cache = TTLCache(settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+# Public tracking responses keyed by order_id (str): (etag, JSON body)
+tracking_cache = TTLCache(settings.TRACKING_CACHE_MAX_SIZE, settings.TRACKING_CACHE_TTL_SECONDS)
+
+# Tracking code -> order_id (codes never change, so entries only age out)
+tracking_code_ids = TTLCache(settings.TRACKING_CACHE_MAX_SIZE, 3600)
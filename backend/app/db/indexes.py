@@ -0,0 +1,245 @@
+"""
+Declarative index registry, startup reconciliation and index advisor
+
+Usage:
+    python -m app.db.indexes            # create/reconcile all indexes
+    python -m app.db.indexes --report   # explain() every query shape, flag COLLSCANs
+    python -m app.db.indexes --backfill-geo  # add GeoJSON pickup points to old orders
+    python -m app.db.indexes --backfill-events  # move old order history to order_events (after deploying)
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE
+from pymongo.errors import OperationFailure
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.logging import get_logger
+
+
+logger = get_logger("db.indexes")
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """A single index definition"""
+    collection: str
+    keys: List[Tuple[str, Any]]
+    name: str
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """A query issued by app/db/models.py, used by the index advisor"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[List[Tuple[str, int]]] = None
+
+
+# ==================== INDEX REGISTRY ====================
+
+INDEXES: List[IndexSpec] = [
+    # users
+    IndexSpec("users", [("phone", ASCENDING)], "uniq_phone", {"unique": True}),
+
+    # orders
+    IndexSpec("orders", [("tracking_code", ASCENDING)], "uniq_tracking_code", {"unique": True}),
+    IndexSpec(
+        "orders",
+        [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        "user_created"
+    ),
+    IndexSpec(
+        "orders",
+        [("driver_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)],
+        "driver_status_created"
+    ),
+    IndexSpec(
+        "orders",
+        [("driver_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        "driver_created"
+    ),
+    IndexSpec(
+        "orders",
+        [("pickup_info.location", GEOSPHERE), ("status", ASCENDING), ("vehicle_type", ASCENDING)],
+        "pickup_location_2dsphere"
+    ),
+
+    # order_events (status timeline, paged oldest first)
+    IndexSpec(
+        "order_events",
+        [("order_id", ASCENDING), ("ts", ASCENDING), ("_id", ASCENDING)],
+        "order_ts"
+    ),
+
+    # transactions
+    IndexSpec(
+        "transactions",
+        [("payment_id", ASCENDING)],
+        "uniq_payment_id",
+        # Usage/refund entries have no payment_id
+        {"unique": True, "partialFilterExpression": {"payment_id": {"$type": "string"}}}
+    ),
+    IndexSpec(
+        "transactions",
+        [("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+        "user_created"
+    ),
+    IndexSpec(
+        "transactions",
+        [("user_id", ASCENDING), ("status", ASCENDING)],
+        "user_status"
+    ),
+    IndexSpec(
+        "transactions",
+        [("status", ASCENDING), ("type", ASCENDING), ("payment_details.expires_at", ASCENDING)],
+        "status_type_expires"
+    ),
+
+    # otps
+    IndexSpec(
+        "otps",
+        [("phone", ASCENDING), ("purpose", ASCENDING)],
+        "uniq_phone_purpose",
+        {"unique": True}
+    ),
+    IndexSpec("otps", [("expires_at", ASCENDING)], "ttl_expires_at", {"expireAfterSeconds": 0}),
+]
+
+
+# ==================== QUERY SHAPES (models.py) ====================
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape("find_user_by_phone", "users", {"phone": "+84900000000"}),
+    QueryShape("consume_otp", "otps",
+               {"phone": "+84900000000", "purpose": "register", "is_used": False,
+                "expires_at": {"$gt": datetime.utcnow()}, "attempts": {"$lt": 5}, "otp": "123456"}),
+    QueryShape("cleanup_expired_otps", "otps", {"expires_at": {"$lt": datetime.utcnow()}}),
+    QueryShape("get_user_transactions", "transactions", {"user_id": "u"},
+               [("created_at", -1), ("_id", -1)]),
+    QueryShape("get_transaction_by_payment_id", "transactions", {"payment_id": "SW0"}),
+    QueryShape("get_wallet_info.pending", "transactions", {"user_id": "u", "status": "pending"}),
+    QueryShape("expire_stale_topups", "transactions",
+               {"status": "pending", "type": "topup",
+                "payment_details.expires_at": {"$lt": datetime.utcnow().isoformat()}}),
+    QueryShape("get_order_by_tracking_code", "orders", {"tracking_code": "SW0"}),
+    QueryShape("get_user_orders", "orders", {"user_id": "u"},
+               [("created_at", -1), ("_id", -1)]),
+    QueryShape("get_driver_orders", "orders", {"driver_id": "d"},
+               [("created_at", -1), ("_id", -1)]),
+    QueryShape("get_available_orders", "orders",
+               {"driver_id": None, "status": {"$in": ["pending", "confirmed"]}},
+               [("created_at", -1)]),
+    QueryShape("get_order_events", "order_events", {"order_id": "o"},
+               [("ts", 1), ("_id", 1)]),
+]
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> Dict[str, int]:
+    """
+    Idempotently create every index in the registry
+
+    Existing identical indexes are a no-op on the server. Conflicts (same
+    name with different options, duplicate keys violating a unique index)
+    are reported and skipped so startup never fails on them.
+
+    Args:
+        db: Database instance
+
+    Returns:
+        Dict with "ok" and "failed" counts
+    """
+    result = {"ok": 0, "failed": 0}
+    for spec in INDEXES:
+        try:
+            await db[spec.collection].create_index(spec.keys, name=spec.name, **spec.options)
+            result["ok"] += 1
+        except OperationFailure as e:
+            result["failed"] += 1
+            logger.warning(
+                "Index not created",
+                extra={"fields": {"collection": spec.collection, "index": spec.name, "error": str(e)}}
+            )
+    return result
+
+
+def _find_stages(plan: Dict[str, Any]) -> List[str]:
+    """Collect stage names of a (nested) winning plan"""
+    stages = [plan.get("stage", "")]
+    if "inputStage" in plan:
+        stages += _find_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _find_stages(child)
+    if "queryPlan" in plan:
+        stages += _find_stages(plan["queryPlan"])
+    return stages
+
+
+async def index_report(db: AsyncIOMotorDatabase) -> List[Dict[str, Any]]:
+    """
+    Run explain() for every registered query shape
+
+    Args:
+        db: Database instance
+
+    Returns:
+        One row per query shape with its plan stages and a COLLSCAN flag
+    """
+    rows = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape.collection].find(shape.filter)
+        if shape.sort:
+            cursor = cursor.sort(shape.sort)
+        explain = await cursor.explain()
+        stages = _find_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+        rows.append({
+            "query": shape.name,
+            "collection": shape.collection,
+            "stages": [s for s in stages if s],
+            "collscan": "COLLSCAN" in stages
+        })
+    return rows
+
+
+async def _main(report: bool, backfill_geo: bool, backfill_events: bool) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.core.config import settings
+
+    client = AsyncIOMotorClient(settings.get_mongodb_url())
+    try:
+        db = client[settings.get_db_name()]
+        result = await ensure_indexes(db)
+        print(f"[OK] Indexes reconciled: {result['ok']} ok, {result['failed']} failed")
+
+        if backfill_geo:
+            from app.db.models import backfill_pickup_locations
+            updated = await backfill_pickup_locations(db)
+            print(f"[OK] Backfilled pickup locations on {updated} orders")
+
+        if backfill_events:
+            from app.db.models import backfill_order_events
+            migrated = await backfill_order_events(db)
+            print(f"[OK] Moved history of {migrated} orders to order_events")
+
+        if not report:
+            return 1 if result["failed"] else 0
+
+        rows = await index_report(db)
+        for row in rows:
+            flag = "COLLSCAN" if row["collscan"] else "ok"
+            print(f"{flag:9} {row['collection']:13} {row['query']:32} {' <- '.join(row['stages'])}")
+        return 1 if any(row["collscan"] for row in rows) else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile MongoDB indexes")
+    parser.add_argument("--report", action="store_true", help="explain() every query shape and flag COLLSCANs")
+    parser.add_argument("--backfill-geo", action="store_true", help="add GeoJSON pickup points to existing orders")
+    parser.add_argument("--backfill-events", action="store_true", help="move existing order history to order_events")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_main(args.report, args.backfill_geo, args.backfill_events)))
@@ -1,14 +1,28 @@
 """
 Database models and operations
 """
-from datetime import datetime
-from typing import Optional, Dict, Any
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, List, Tuple
 from bson import ObjectId
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from enum import Enum
-from app.core.security import hash_password, verify_password
+from app.core.config import settings
+from app.core.security import hash_password_async, verify_password_async
+from app.core.exceptions import ServerException
+from app.services.sequence_service import next_sequence, seed_sequence, SequenceBlockAllocator
+from app.db.pagination import KEYSET_SORT, apply_cursor, split_page
+from app.db.cache import user_cache, tracking_cache
+from app.db.session import mongodb
+from app.core.request_context import get_request_memo
+from app.core.logging import get_logger
+from app.services.order_stream import order_event_bus
 from decimal import Decimal
 
+logger = get_logger("db.models")
+
 # ==================== USER MODEL ====================
 
 async def create_user(db: AsyncIOMotorDatabase, user_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -23,7 +37,7 @@ async def create_user(db: AsyncIOMotorDatabase, user_data: Dict[str, Any]) -> Di
         Created user document
     """
     # Hash password
-    user_data['password'] = hash_password(user_data['password'])
+    user_data['password'] = await hash_password_async(user_data['password'])
     user_data['created_at'] = datetime.utcnow()
     user_data['updated_at'] = datetime.utcnow()
     
@@ -35,10 +49,10 @@ async def create_user(db: AsyncIOMotorDatabase, user_data: Dict[str, Any]) -> Di
             "total_usage": 0
         }
     
-    result = await db.users.insert_one(user_data)
-    user = await db.users.find_one({"_id": result.inserted_id})
+    # insert_one sets user_data['_id'], so the document is already complete
+    await db.users.insert_one(user_data)
     
-    return user
+    return user_data
 
 
 async def find_user_by_phone(db: AsyncIOMotorDatabase, phone: str) -> Optional[Dict[str, Any]]:
@@ -54,6 +68,46 @@ async def find_user_by_id(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Di
         return None
 
 
+async def get_user_cached(db: AsyncIOMotorDatabase, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Find user by ID through the request memo and the per-worker user cache
+    
+    A request never loads the same user twice, and repeated requests of the
+    same user within USER_CACHE_TTL_SECONDS skip Mongo entirely.
+    
+    Args:
+        db: Database instance
+        user_id: User ID
+        
+    Returns:
+        User document (shallow copy) or None
+    """
+    memo = get_request_memo()
+    memo_key = f"user:{user_id}"
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+    
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await find_user_by_id(db, user_id)
+        if user is not None:
+            user_cache.set(user_id, user)
+    
+    if user is not None:
+        user = dict(user)
+    if memo is not None:
+        memo[memo_key] = user
+    return user
+
+
+def invalidate_user_cache(user_id: str) -> None:
+    """Drop a user from the per-worker cache and the current request memo"""
+    user_cache.invalidate(user_id)
+    memo = get_request_memo()
+    if memo is not None:
+        memo.pop(f"user:{user_id}", None)
+
+
 async def update_user(db: AsyncIOMotorDatabase, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     Update user information
@@ -68,39 +122,48 @@ async def update_user(db: AsyncIOMotorDatabase, user_id: str, update_data: Dict[
     """
     update_data['updated_at'] = datetime.utcnow()
     
-    await db.users.update_one(
+    user = await db.users.find_one_and_update(
         {"_id": ObjectId(user_id)},
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
+    invalidate_user_cache(user_id)
     
-    return await find_user_by_id(db, user_id)
+    return user
 
 
 async def update_user_password(db: AsyncIOMotorDatabase, phone: str, new_password: str) -> bool:
     """Update user password"""
-    hashed_password = hash_password(new_password)
+    hashed_password = await hash_password_async(new_password)
     
-    result = await db.users.update_one(
+    user = await db.users.find_one_and_update(
         {"phone": phone},
         {"$set": {
             "password": hashed_password,
             "updated_at": datetime.utcnow()
-        }}
+        }},
+        projection={"_id": 1}
     )
+    if not user:
+        return False
     
-    return result.modified_count > 0
+    invalidate_user_cache(str(user["_id"]))
+    return True
 
 
 async def verify_user_password(user: Dict[str, Any], password: str) -> bool:
     """Verify user password"""
-    return verify_password(password, user['password'])
+    return await verify_password_async(password, user['password'])
 
 
 # ==================== OTP MODEL ====================
 
 async def create_otp(db: AsyncIOMotorDatabase, otp_data: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Create a new OTP record
+    Create (or replace) the OTP for a phone and purpose
+    
+    One upsert on the unique (phone, purpose) key replaces any previous
+    OTP, so there is never more than one record per pair.
     
     Args:
         db: Database instance
@@ -109,82 +172,128 @@ async def create_otp(db: AsyncIOMotorDatabase, otp_data: Dict[str, Any]) -> Dict
     Returns:
         Created OTP document
     """
-    # Delete existing OTPs for the same phone and purpose
-    await db.otps.delete_many({
-        "phone": otp_data['phone'],
-        "purpose": otp_data['purpose']
-    })
-    
     otp_data['created_at'] = datetime.utcnow()
     otp_data['attempts'] = 0
     otp_data['is_used'] = False
     
-    result = await db.otps.insert_one(otp_data)
-    otp = await db.otps.find_one({"_id": result.inserted_id})
+    await db.otps.update_one(
+        {"phone": otp_data['phone'], "purpose": otp_data['purpose']},
+        {"$set": otp_data},
+        upsert=True
+    )
     
-    return otp
+    return otp_data
 
 
-async def find_latest_otp(
+def _usable_otp_filter(phone: str, purpose: str, now: datetime, max_attempts: int) -> Dict[str, Any]:
+    """Filter matching an unused, unexpired OTP with attempts left"""
+    return {
+        "phone": phone,
+        "purpose": purpose,
+        "is_used": False,
+        "expires_at": {"$gt": now},
+        "attempts": {"$lt": max_attempts}
+    }
+
+
+async def consume_otp(
     db: AsyncIOMotorDatabase,
     phone: str,
-    purpose: str
+    purpose: str,
+    otp_code: str,
+    max_attempts: int
 ) -> Optional[Dict[str, Any]]:
     """
-    Find the latest unused OTP for a phone and purpose
+    Atomically mark a matching OTP as used
+    
+    Code, expiry and attempt checks are part of the filter, so a code
+    can only be consumed once even under concurrent verifies.
     
     Args:
         db: Database instance
         phone: Phone number
-        purpose: OTP purpose (register, reset-password, verify-phone)
+        purpose: OTP purpose
+        otp_code: Submitted code
+        max_attempts: Maximum verification attempts
         
     Returns:
-        OTP document if found, None otherwise
+        Consumed OTP document, or None if the code did not match a usable OTP
     """
-    return await db.otps.find_one(
-        {
-            "phone": phone,
-            "purpose": purpose,
-            "is_used": False
-        },
-        sort=[("created_at", -1)]
+    query = _usable_otp_filter(phone, purpose, datetime.utcnow(), max_attempts)
+    query["otp"] = otp_code
+    return await db.otps.find_one_and_update(
+        query,
+        {"$set": {"is_used": True}},
+        return_document=ReturnDocument.AFTER
     )
 
 
-async def mark_otp_as_used(db: AsyncIOMotorDatabase, otp_id: ObjectId) -> bool:
-    """Mark OTP as used"""
-    result = await db.otps.update_one(
-        {"_id": otp_id},
-        {"$set": {"is_used": True}}
+async def record_failed_otp_attempt(
+    db: AsyncIOMotorDatabase,
+    phone: str,
+    purpose: str,
+    max_attempts: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Increment attempts of a usable OTP after a wrong code
+    
+    Returns:
+        Updated OTP document, or None if there is no usable OTP
+    """
+    return await db.otps.find_one_and_update(
+        _usable_otp_filter(phone, purpose, datetime.utcnow(), max_attempts),
+        {"$inc": {"attempts": 1}},
+        return_document=ReturnDocument.AFTER
     )
-    return result.modified_count > 0
 
 
-async def increment_otp_attempts(db: AsyncIOMotorDatabase, otp_id: ObjectId) -> int:
+async def delete_unusable_otp(
+    db: AsyncIOMotorDatabase,
+    phone: str,
+    purpose: str,
+    max_attempts: int
+) -> Optional[Dict[str, Any]]:
     """
-    Increment OTP verification attempts
+    Delete the unused OTP of a phone and purpose if it is expired or out of attempts
+    
+    The conditions are part of the filter, so an OTP re-sent since the
+    failed attempt (a fresh, usable code) is never deleted.
     
     Returns:
-        New attempt count
+        Deleted OTP document, or None if there was no unusable OTP
     """
-    result = await db.otps.find_one_and_update(
-        {"_id": otp_id},
-        {"$inc": {"attempts": 1}},
-        return_document=True
-    )
-    return result['attempts'] if result else 0
+    return await db.otps.find_one_and_delete({
+        "phone": phone,
+        "purpose": purpose,
+        "is_used": False,
+        "$or": [
+            {"expires_at": {"$lte": datetime.utcnow()}},
+            {"attempts": {"$gte": max_attempts}}
+        ]
+    })
 
 
-async def cleanup_expired_otps(db: AsyncIOMotorDatabase) -> int:
+async def cleanup_expired_otps(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
     """
-    Clean up expired OTPs
+    Clean up expired OTPs (one bounded batch)
     
+    The TTL index removes expired OTPs eventually; this sweep makes it
+    deterministic and keeps each delete small.
+    
+    Args:
+        db: Database instance
+        batch_size: Maximum OTPs deleted per call
+        
     Returns:
         Number of deleted OTP records
     """
-    result = await db.otps.delete_many({
-        "expires_at": {"$lt": datetime.utcnow()}
-    })
+    expired = await db.otps.find(
+        {"expires_at": {"$lt": datetime.utcnow()}}, {"_id": 1}
+    ).limit(batch_size).to_list(length=batch_size)
+    if not expired:
+        return 0
+    
+    result = await db.otps.delete_many({"_id": {"$in": [otp["_id"] for otp in expired]}})
     return result.deleted_count
 
 
@@ -207,10 +316,9 @@ async def create_transaction(
     transaction_data['created_at'] = datetime.utcnow()
     transaction_data['updated_at'] = datetime.utcnow()
     
-    result = await db.transactions.insert_one(transaction_data)
-    transaction = await db.transactions.find_one({"_id": result.inserted_id})
+    await db.transactions.insert_one(transaction_data)
     
-    return transaction
+    return transaction_data
 
 
 async def get_user_transactions(
@@ -218,7 +326,8 @@ async def get_user_transactions(
     user_id: str,
     limit: int = 50,
     skip: int = 0,
-    transaction_type: Optional[str] = None
+    transaction_type: Optional[str] = None,
+    cursor: Optional[str] = None
 ) -> list:
     """
     Get user's transaction history
@@ -227,8 +336,9 @@ async def get_user_transactions(
         db: Database instance
         user_id: User ID
         limit: Maximum number of transactions to return
-        skip: Number of transactions to skip (for pagination)
+        skip: Number of transactions to skip (ignored when cursor is given)
         transaction_type: Filter by type (topup, usage, refund)
+        cursor: Keyset cursor from a previous page (optional)
         
     Returns:
         List of transaction documents
@@ -237,8 +347,10 @@ async def get_user_transactions(
     if transaction_type:
         query["type"] = transaction_type
     
-    cursor = db.transactions.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    transactions = await cursor.to_list(length=limit)
+    find_cursor = db.transactions.find(apply_cursor(query, cursor)).sort(KEYSET_SORT)
+    if not cursor and skip:
+        find_cursor = find_cursor.skip(skip)
+    transactions = await find_cursor.limit(limit).to_list(length=limit)
     
     return transactions
 
@@ -266,7 +378,8 @@ async def update_transaction_status(
     db: AsyncIOMotorDatabase,
     transaction_id: str,
     status: str,
-    payment_details: Optional[Dict[str, Any]] = None
+    payment_details: Optional[Dict[str, Any]] = None,
+    expected_status: Optional[str] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Update transaction status
@@ -274,11 +387,14 @@ async def update_transaction_status(
     Args:
         db: Database instance
         transaction_id: Transaction ID
-        status: New status (pending, completed, failed, cancelled)
+        status: New status (pending, completed, failed, cancelled, expired)
         payment_details: Additional payment details (optional)
+        expected_status: Only update if the transaction is still in this
+            status (compare-and-set; optional)
         
     Returns:
-        Updated transaction document
+        Updated transaction document, or None if it is missing or no longer
+        in expected_status
     """
     update_data = {
         "status": status,
@@ -291,12 +407,54 @@ async def update_transaction_status(
     if status == "completed":
         update_data["completed_at"] = datetime.utcnow()
     
-    await db.transactions.update_one(
-        {"_id": ObjectId(transaction_id)},
-        {"$set": update_data}
+    try:
+        oid = ObjectId(transaction_id)
+    except Exception:
+        return None
+    
+    query = {"_id": oid}
+    if expected_status is not None:
+        query["status"] = expected_status
+    
+    return await db.transactions.find_one_and_update(
+        query,
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
+
+
+async def expire_stale_topups(db: AsyncIOMotorDatabase, batch_size: int = 1000) -> int:
+    """
+    Mark pending top-ups whose payment window has passed as expired (one bounded batch)
+    
+    `payment_details.expires_at` is stored as an ISO string, so it is
+    compared against the current time in the same format.
     
-    return await get_transaction_by_id(db, transaction_id)
+    Args:
+        db: Database instance
+        batch_size: Maximum transactions updated per call
+        
+    Returns:
+        Number of expired transactions
+    """
+    now = datetime.utcnow()
+    stale = await db.transactions.find(
+        {
+            "status": "pending",
+            "type": "topup",
+            "payment_details.expires_at": {"$lt": now.isoformat()}
+        },
+        {"_id": 1}
+    ).limit(batch_size).to_list(length=batch_size)
+    if not stale:
+        return 0
+    
+    result = await db.transactions.update_many(
+        # Re-check status so a payment verified meanwhile is not overwritten
+        {"_id": {"$in": [tx["_id"] for tx in stale]}, "status": "pending"},
+        {"$set": {"status": "expired", "updated_at": now}}
+    )
+    return result.modified_count
 
 
 async def get_wallet_info(
@@ -359,7 +517,7 @@ async def add_to_wallet(
     Returns:
         Updated user document
     """
-    await db.users.update_one(
+    user = await db.users.find_one_and_update(
         {"_id": ObjectId(user_id)},
         {
             "$inc": {
@@ -369,10 +527,12 @@ async def add_to_wallet(
             "$set": {
                 "updated_at": datetime.utcnow()
             }
-        }
+        },
+        return_document=ReturnDocument.AFTER
     )
+    invalidate_user_cache(user_id)
     
-    return await find_user_by_id(db, user_id)
+    return user
 
 
 async def use_from_wallet(
@@ -391,16 +551,12 @@ async def use_from_wallet(
     Returns:
         Updated user document or None if insufficient balance
     """
-    user = await find_user_by_id(db, user_id)
-    if not user:
-        return None
-    
-    wallet_balance = user.get('wallet_info', {}).get('balance', 0)
-    if wallet_balance < amount:
-        return None  # Insufficient balance
-    
-    await db.users.update_one(
-        {"_id": ObjectId(user_id)},
+    # The balance check is part of the filter, so the debit is atomic
+    user = await db.users.find_one_and_update(
+        {
+            "_id": ObjectId(user_id),
+            "wallet_info.balance": {"$gte": amount}
+        },
         {
             "$inc": {
                 "wallet_info.balance": -amount,
@@ -409,59 +565,274 @@ async def use_from_wallet(
             "$set": {
                 "updated_at": datetime.utcnow()
             }
-        }
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    invalidate_user_cache(user_id)
+    
+    return user  # None if user not found or insufficient balance
+
+
+async def debit_wallet(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    amount: int,
+    description: str,
+    order_id: Optional[str] = None,
+    session=None
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically debit the wallet and append a usage entry to the ledger
+    
+    The balance check lives in the update filter, so concurrent debits can
+    never take the balance below zero. The ledger (`transactions`) is
+    append-only: corrections are new refund entries, never edits.
+    
+    Args:
+        db: Database instance
+        user_id: User ID
+        amount: Amount to debit (VND)
+        description: Ledger description
+        order_id: Related order (optional)
+        session: Client session when running inside a transaction (optional)
+        
+    Returns:
+        Updated user document, or None if insufficient balance / user not found
+    """
+    now = datetime.utcnow()
+    user = await db.users.find_one_and_update(
+        {
+            "_id": ObjectId(user_id),
+            "wallet_info.balance": {"$gte": amount}
+        },
+        {
+            "$inc": {
+                "wallet_info.balance": -amount,
+                "wallet_info.total_usage": amount
+            },
+            "$set": {"updated_at": now}
+        },
+        return_document=ReturnDocument.AFTER,
+        session=session
     )
+    if not user:
+        return None
     
-    return await find_user_by_id(db, user_id)
+    await db.transactions.insert_one({
+        "user_id": user_id,
+        "amount": amount,
+        "type": "usage",
+        "description": description,
+        "status": "completed",
+        "order_id": order_id,
+        "balance_after": user["wallet_info"]["balance"],
+        "created_at": now,
+        "updated_at": now,
+        "completed_at": now
+    }, session=session)
+    invalidate_user_cache(user_id)
+    
+    return user
+
+
+async def refund_to_wallet(
+    db: AsyncIOMotorDatabase,
+    user_id: str,
+    amount: int,
+    description: str,
+    order_id: Optional[str] = None,
+    session=None
+) -> Optional[Dict[str, Any]]:
+    """
+    Credit a previous debit back and append a refund entry to the ledger
+    
+    Args:
+        db: Database instance
+        user_id: User ID
+        amount: Amount to refund (VND)
+        description: Ledger description
+        order_id: Related order (optional)
+        session: Client session when running inside a transaction (optional)
+        
+    Returns:
+        Updated user document, or None if user not found
+    """
+    now = datetime.utcnow()
+    user = await db.users.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        {
+            "$inc": {
+                "wallet_info.balance": amount,
+                "wallet_info.total_usage": -amount
+            },
+            "$set": {"updated_at": now}
+        },
+        return_document=ReturnDocument.AFTER,
+        session=session
+    )
+    if not user:
+        return None
+    
+    await db.transactions.insert_one({
+        "user_id": user_id,
+        "amount": amount,
+        "type": "refund",
+        "description": description,
+        "status": "completed",
+        "order_id": order_id,
+        "balance_after": user["wallet_info"]["balance"],
+        "created_at": now,
+        "updated_at": now,
+        "completed_at": now
+    }, session=session)
+    invalidate_user_cache(user_id)
+    
+    return user
 
 
 # ==================== ORDER MODEL ====================
 
+# Optional per-worker block allocator for tracking codes
+_tracking_code_allocator: Optional[SequenceBlockAllocator] = (
+    SequenceBlockAllocator(settings.TRACKING_CODE_BLOCK_SIZE)
+    if settings.TRACKING_CODE_BLOCK_SIZE > 1 else None
+)
+
+# Day counters this worker has already seeded from existing orders
+_seeded_tracking_counters: set = set()
+
+
+def invalidate_order_cache(order_id: str) -> None:
+    """Drop an order's cached public tracking response (this worker)"""
+    tracking_cache.invalidate(order_id)
+
+
+# Status changes of every worker (local writes and the change stream) reach the bus
+order_event_bus.add_listener(lambda event: invalidate_order_cache(event["order_id"]))
+
+
 async def generate_tracking_code(db: AsyncIOMotorDatabase) -> str:
     """
     Generate unique tracking code for order
     
+    Uses an atomic per-day counter (`counters` collection), so codes stay
+    unique under concurrent inserts and across workers. Before a worker
+    first uses a day's counter it is raised to the highest code already
+    issued that day, so codes created before the counter existed (or
+    before it was reset) are never repeated.
+    
     Args:
         db: Database instance
         
     Returns:
         Unique tracking code (format: SW + YYYYMMDD + sequential number)
     """
-    from datetime import datetime
     today = datetime.utcnow().strftime("%Y%m%d")
     prefix = f"SW{today}"
+    counter_name = f"tracking_code:{today}"
     
-    # Find the highest order number for today
-    last_order = await db.orders.find_one(
-        {"tracking_code": {"$regex": f"^{prefix}"}},
-        sort=[("tracking_code", -1)]
-    )
+    if counter_name not in _seeded_tracking_counters:
+        highest = await _highest_tracking_number(db, prefix)
+        if highest:  # No codes yet today: a counter starting at 1 cannot collide
+            await seed_sequence(db, counter_name, highest)
+        _seeded_tracking_counters.clear()  # Only today's counter matters
+        _seeded_tracking_counters.add(counter_name)
     
-    if last_order:
-        # Extract number and increment
-        last_code = last_order["tracking_code"]
-        last_number = int(last_code[len(prefix):])
-        new_number = last_number + 1
+    if _tracking_code_allocator:
+        new_number = await _tracking_code_allocator.next(db, counter_name)
     else:
-        new_number = 1
+        new_number = await next_sequence(db, counter_name)
     
     return f"{prefix}{new_number:03d}"
 
 
-async def create_order(db: AsyncIOMotorDatabase, order_data: Dict[str, Any]) -> Dict[str, Any]:
+async def _highest_tracking_number(db: AsyncIOMotorDatabase, prefix: str) -> int:
     """
-    Create a new order
+    Highest number used by existing tracking codes with a prefix (0 if none)
+    
+    Numbers are zero-padded to 3 digits but grow longer past 999, so the
+    lexically greatest code is only the highest among codes of its length:
+    look again for longer codes until there are none. Each lookup is an
+    anchored-prefix scan of the uniq_tracking_code index.
+    """
+    highest = 0
+    min_digits = 1
+    while True:
+        order = await db.orders.find_one(
+            {"tracking_code": {"$regex": f"^{prefix}\\d{{{min_digits},}}$"}},
+            {"tracking_code": 1},
+            sort=[("tracking_code", -1)]
+        )
+        if not order:
+            return highest
+        number = order["tracking_code"][len(prefix):]
+        highest = int(number)
+        min_digits = len(number) + 1
+
+
+def build_geo_point(location_info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Build a GeoJSON Point from a location info dict with lat/lng
+    
+    Args:
+        location_info: Location dict (pickup_info / dropoff_info)
+        
+    Returns:
+        GeoJSON Point ([lng, lat] order) or None if coordinates are missing
+    """
+    if not location_info:
+        return None
+    lat, lng = location_info.get('lat'), location_info.get('lng')
+    if lat is None or lng is None:
+        return None
+    return {"type": "Point", "coordinates": [float(lng), float(lat)]}
+
+
+async def backfill_pickup_locations(db: AsyncIOMotorDatabase, batch_size: int = 500) -> int:
+    """
+    Add GeoJSON pickup locations to orders created before they were stored
     
     Args:
         db: Database instance
-        order_data: Order data dictionary
+        batch_size: Orders updated per round trip
         
     Returns:
-        Created order document
+        Number of orders updated
     """
+    updated = 0
+    query = {
+        "pickup_info.location": {"$exists": False},
+        "pickup_info.lat": {"$type": "number"},
+        "pickup_info.lng": {"$type": "number"}
+    }
+    while True:
+        orders = await db.orders.find(
+            query, {"pickup_info.lat": 1, "pickup_info.lng": 1}
+        ).limit(batch_size).to_list(length=batch_size)
+        if not orders:
+            return updated
+        
+        requests = [
+            UpdateOne(
+                {"_id": order["_id"]},
+                {"$set": {"pickup_info.location": build_geo_point(order["pickup_info"])}}
+            )
+            for order in orders
+        ]
+        result = await db.orders.bulk_write(requests, ordered=False)
+        updated += result.modified_count
+
+
+async def _prepare_order_document(db: AsyncIOMotorDatabase, order_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill tracking code, location, timestamps, status, history and flags"""
     # Generate tracking code
     order_data['tracking_code'] = await generate_tracking_code(db)
     
+    # GeoJSON pickup point for nearest-first driver queries (2dsphere index)
+    pickup_location = build_geo_point(order_data.get('pickup_info'))
+    if pickup_location:
+        order_data['pickup_info']['location'] = pickup_location
+    
     # Set timestamps
     order_data['created_at'] = datetime.utcnow()
     order_data['updated_at'] = datetime.utcnow()
@@ -475,16 +846,126 @@ async def create_order(db: AsyncIOMotorDatabase, order_data: Dict[str, Any]) ->
         "timestamp": datetime.utcnow(),
         "note": "Đơn hàng được tạo"
     }]
+    order_data['history_migrated'] = True  # Whole timeline lives in order_events
     
     # Initialize flags
     order_data['is_reviewed'] = False
     order_data['is_paid'] = False
     
-    # Insert order
-    result = await db.orders.insert_one(order_data)
-    order = await db.orders.find_one({"_id": result.inserted_id})
+    return order_data
+
+
+async def create_order(db: AsyncIOMotorDatabase, order_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create a new order
+    
+    Args:
+        db: Database instance
+        order_data: Order data dictionary
+        
+    Returns:
+        Created order document
+    """
+    await _prepare_order_document(db, order_data)
     
-    return order
+    # Insert order (insert_one sets order_data['_id'])
+    await db.orders.insert_one(order_data)
+    await record_order_events(db, str(order_data['_id']), order_data['history'])
+    
+    return order_data
+
+
+async def create_order_with_wallet_payment(
+    db: AsyncIOMotorDatabase,
+    order_data: Dict[str, Any],
+    amount: int,
+    payment_note: str
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Create an order and pay it from the wallet if the balance allows
+    
+    The order is inserted already paid/confirmed when the atomic debit
+    succeeds, otherwise it is inserted unpaid (pending).
+    
+    On replica sets / sharded clusters the debit, the ledger entry, the
+    order insert and its timeline events commit in one multi-document
+    transaction run through `with_transaction`, which retries the whole
+    callback on TransientTransactionError (e.g. a WriteConflict between
+    two orders debiting the same wallet) and retries the commit on
+    UnknownTransactionCommitResult. On a standalone mongod the same steps
+    run as a compensating sequence:
+    
+        1. debit_wallet (conditional debit + usage ledger entry)
+        2. insert the order
+        
+    If step 2 fails, the debit is reversed with refund_to_wallet (which
+    appends a refund ledger entry) and the error is re-raised, so the
+    wallet is never charged for an order that does not exist.
+    
+    Args:
+        db: Database instance
+        order_data: Order data dictionary
+        amount: Amount to debit (VND)
+        payment_note: History note of the payment
+        
+    Returns:
+        Tuple (created order document, whether it was paid)
+    """
+    await _prepare_order_document(db, order_data)
+    order_data['_id'] = ObjectId()
+    order_id = str(order_data['_id'])
+    user_id = order_data['user_id']
+    description = f"Thanh toán đơn hàng {order_data['tracking_code']}"
+    
+    def mark_paid():
+        now = datetime.utcnow()
+        order_data['is_paid'] = True
+        order_data['paid_amount'] = amount
+        order_data['status'] = 'confirmed'
+        order_data['history'].append({
+            "status": 'confirmed',
+            "timestamp": now,
+            "note": payment_note,
+            "updated_by": user_id
+        })
+    
+    if mongodb.supports_transactions:
+        unpaid_status = order_data['status']
+        unpaid_history = list(order_data['history'])
+        
+        async def attempt(session) -> Tuple[bool, List[Dict[str, Any]]]:
+            # Runs again from scratch on every retry: reset what mark_paid changed
+            order_data.update(is_paid=False, status=unpaid_status, history=list(unpaid_history))
+            order_data.pop('paid_amount', None)
+            user = await debit_wallet(db, user_id, amount, description, order_id, session=session)
+            if user:
+                mark_paid()
+            await db.orders.insert_one(order_data, session=session)
+            events = await record_order_events(db, order_id, order_data['history'], session=session)
+            return bool(user), events
+        
+        async with await db.client.start_session() as session:
+            paid, events = await session.with_transaction(attempt)
+        invalidate_user_cache(user_id)  # Again after commit: a read during the transaction may have re-cached it
+        order_event_bus.publish(events)
+        return order_data, paid
+    
+    user = await debit_wallet(db, user_id, amount, description, order_id)
+    if user:
+        mark_paid()
+    try:
+        await db.orders.insert_one(order_data)
+    except Exception:
+        if user:
+            await refund_to_wallet(
+                db, user_id, amount,
+                f"Hoàn tiền đơn hàng {order_data['tracking_code']} (tạo đơn thất bại)",
+                order_id
+            )
+        raise
+    await record_order_events(db, order_id, order_data['history'])
+    
+    return order_data, bool(user)
 
 
 async def get_order_by_id(db: AsyncIOMotorDatabase, order_id: str) -> Optional[Dict[str, Any]]:
@@ -522,13 +1003,63 @@ async def get_order_by_tracking_code(
     return await db.orders.find_one({"tracking_code": tracking_code})
 
 
+# Fields of an order list row (OrderSummaryResponse): no history, images or
+# contact phones, so list pages stay small however long an order's history grows.
+# Includes the KEYSET_SORT fields needed to build the next cursor.
+ORDER_SUMMARY_PROJECTION = {
+    "tracking_code": 1,
+    "user_id": 1,
+    "driver_id": 1,
+    "status": 1,
+    "vehicle_type": 1,
+    "product_name": 1,
+    "distance_km": 1,
+    "total_amount": 1,
+    "is_paid": 1,
+    "pickup_info.address": 1,
+    "dropoff_info.address": 1,
+    "dropoff_info.contact_name": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+
+async def _list_orders_page(
+    db: AsyncIOMotorDatabase,
+    query: Dict[str, Any],
+    limit: int,
+    skip: int,
+    cursor: Optional[str],
+    include_total: bool,
+    projection: Optional[Dict[str, Any]] = None
+) -> tuple[List[Dict[str, Any]], Optional[int], Optional[str]]:
+    """
+    Fetch one page of orders in KEYSET_SORT order
+    
+    Fetches limit + 1 documents to detect the next page, so each page is a
+    single bounded index seek. The exact count is only run on request.
+    """
+    total = await db.orders.count_documents(query) if include_total else None
+    
+    find_cursor = db.orders.find(apply_cursor(query, cursor), projection).sort(KEYSET_SORT)
+    if not cursor and skip:
+        find_cursor = find_cursor.skip(skip)
+    documents = await find_cursor.limit(limit + 1).to_list(length=limit + 1)
+    
+    orders, next_cursor = split_page(documents, limit)
+    return orders, total, next_cursor
+
+
 async def get_user_orders(
     db: AsyncIOMotorDatabase,
     user_id: str,
     status: Optional[str] = None,
     limit: int = 20,
-    skip: int = 0
-) -> tuple[List[Dict[str, Any]], int]:
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    projection: Optional[Dict[str, Any]] = None
+) -> tuple[List[Dict[str, Any]], Optional[int], Optional[str]]:
     """
     Get user's orders with pagination
     
@@ -537,24 +1068,20 @@ async def get_user_orders(
         user_id: User ID
         status: Filter by status (optional)
         limit: Number of orders to return
-        skip: Number of orders to skip
+        skip: Number of orders to skip (ignored when cursor is given)
+        cursor: Keyset cursor from a previous page (optional)
+        include_total: Whether to run an exact count
+        projection: Fields to return, e.g. ORDER_SUMMARY_PROJECTION (default: all)
         
     Returns:
-        Tuple of (orders list, total count)
+        Tuple of (orders list, total count or None, next cursor or None)
     """
     query = {"user_id": user_id}
     
     if status:
         query["status"] = status
     
-    # Get total count
-    total = await db.orders.count_documents(query)
-    
-    # Get paginated results
-    cursor = db.orders.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    orders = await cursor.to_list(length=limit)
-    
-    return orders, total
+    return await _list_orders_page(db, query, limit, skip, cursor, include_total, projection)
 
 
 async def get_driver_orders(
@@ -562,8 +1089,11 @@ async def get_driver_orders(
     driver_id: str,
     status: Optional[str] = None,
     limit: int = 20,
-    skip: int = 0
-) -> tuple[List[Dict[str, Any]], int]:
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    projection: Optional[Dict[str, Any]] = None
+) -> tuple[List[Dict[str, Any]], Optional[int], Optional[str]]:
     """
     Get driver's assigned orders
     
@@ -572,21 +1102,20 @@ async def get_driver_orders(
         driver_id: Driver ID
         status: Filter by status (optional)
         limit: Number of orders to return
-        skip: Number of orders to skip
+        skip: Number of orders to skip (ignored when cursor is given)
+        cursor: Keyset cursor from a previous page (optional)
+        include_total: Whether to run an exact count
+        projection: Fields to return, e.g. ORDER_SUMMARY_PROJECTION (default: all)
         
     Returns:
-        Tuple of (orders list, total count)
+        Tuple of (orders list, total count or None, next cursor or None)
     """
     query = {"driver_id": driver_id}
     
     if status:
         query["status"] = status
     
-    total = await db.orders.count_documents(query)
-    cursor = db.orders.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    orders = await cursor.to_list(length=limit)
-    
-    return orders, total
+    return await _list_orders_page(db, query, limit, skip, cursor, include_total, projection)
 
 
 async def update_order_status(
@@ -597,7 +1126,7 @@ async def update_order_status(
     updated_by: Optional[str] = None
 ) -> bool:
     """
-    Update order status and add to history
+    Update order status and record the change (history snapshot + order_events)
     
     Args:
         db: Database instance
@@ -618,16 +1147,13 @@ async def update_order_status(
     
     result = await db.orders.update_one(
         {"_id": ObjectId(order_id)},
-        {
-            "$set": {
-                "status": new_status,
-                "updated_at": datetime.utcnow()
-            },
-            "$push": {"history": history_entry}
-        }
+        history_update({"status": new_status, "updated_at": datetime.utcnow()}, history_entry)
     )
     
-    return result.modified_count > 0
+    if result.modified_count == 0:
+        return False
+    await record_order_events(db, order_id, [history_entry])
+    return True
 
 
 async def assign_driver_to_order(
@@ -656,9 +1182,68 @@ async def assign_driver_to_order(
         }
     )
     
+    invalidate_order_cache(order_id)
     return result.modified_count > 0
 
 
+# Statuses in which an unassigned order can still be accepted by a driver
+CLAIMABLE_ORDER_STATUSES = ["pending", "confirmed"]
+
+
+async def claim_order(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    driver_id: str,
+    new_status: str,
+    note: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Atomically assign a driver to an unassigned order (compare-and-set)
+    
+    One conditional `find_one_and_update`: the order is only matched while
+    `driver_id` is null and its status is claimable, and the driver, status
+    and history entry are written together. Exactly one of several racing
+    drivers can win.
+    
+    Args:
+        db: Database instance
+        order_id: Order ID
+        driver_id: Driver ID
+        new_status: Status after acceptance
+        note: Optional history note
+        
+    Returns:
+        Updated order document, or None if the order is missing, already
+        taken or not in a claimable status
+    """
+    try:
+        oid = ObjectId(order_id)
+    except Exception:
+        return None
+    
+    history_entry = {
+        "status": new_status,
+        "timestamp": datetime.utcnow(),
+        "note": note,
+        "updated_by": driver_id
+    }
+    order = await db.orders.find_one_and_update(
+        {
+            "_id": oid,
+            "driver_id": None,
+            "status": {"$in": CLAIMABLE_ORDER_STATUSES}
+        },
+        history_update(
+            {"driver_id": driver_id, "status": new_status, "updated_at": history_entry["timestamp"]},
+            history_entry
+        ),
+        return_document=ReturnDocument.AFTER
+    )
+    if order:
+        await record_order_events(db, order_id, [history_entry])
+    return order
+
+
 async def update_order_payment(
     db: AsyncIOMotorDatabase,
     order_id: str,
@@ -688,6 +1273,7 @@ async def update_order_payment(
         }
     )
     
+    invalidate_order_cache(order_id)
     return result.modified_count > 0
 
 
@@ -715,48 +1301,524 @@ async def add_images_to_order(
         }
     )
     
+    invalidate_order_cache(order_id)
     return result.modified_count > 0
 
 
-async def delete_order(db: AsyncIOMotorDatabase, order_id: str) -> bool:
+async def add_image_variants_to_order(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    variants: List[Dict[str, Any]]
+) -> bool:
     """
-    Delete an order (soft delete by setting status to cancelled)
+    Record resized image variants on an order
     
     Args:
         db: Database instance
         order_id: Order ID
+        variants: One dict per image ("original" plus one URL per variant)
         
     Returns:
         True if successful, False otherwise
     """
-    return await update_order_status(db, order_id, "cancelled", "Đơn hàng đã bị hủy")
+    result = await db.orders.update_one(
+        {"_id": ObjectId(order_id)},
+        {
+            "$push": {"image_variants": {"$each": variants}},
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+    )
+    
+    invalidate_order_cache(order_id)
+    return result.modified_count > 0
+
+
+async def delete_order(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    updated_by: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Delete an order (soft delete by setting status to cancelled)
+    
+    Conditional on the order still being cancellable (pending/confirmed),
+    so of two concurrent cancels only one succeeds (and refunds).
+    
+    Args:
+        db: Database instance
+        order_id: Order ID
+        updated_by: User who cancelled (optional)
+        
+    Returns:
+        Order document before cancellation, or None if not cancellable
+    """
+    history_entry = {
+        "status": "cancelled",
+        "timestamp": datetime.utcnow(),
+        "note": "Đơn hàng đã bị hủy",
+        "updated_by": updated_by
+    }
+    order = await db.orders.find_one_and_update(
+        {
+            "_id": ObjectId(order_id),
+            "status": {"$in": CLAIMABLE_ORDER_STATUSES}
+        },
+        history_update({"status": "cancelled", "updated_at": history_entry["timestamp"]}, history_entry)
+    )
+    if order:
+        await record_order_events(db, order_id, [history_entry])
+    return order
+
+
+async def cancel_order_and_refund(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    updated_by: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Cancel an order and refund the wallet payment, if any
+    
+    The refund only runs for the caller that won the conditional cancel,
+    so an order is never refunded twice.
+    
+    Args:
+        db: Database instance
+        order_id: Order ID
+        updated_by: User who cancelled (optional)
+        
+    Returns:
+        Order document before cancellation, or None if not cancellable
+    """
+    order = await delete_order(db, order_id, updated_by)
+    if order and order.get("is_paid"):
+        await refund_to_wallet(
+            db, order["user_id"],
+            order.get("paid_amount", int(round(order["total_amount"]))),
+            f"Hoàn tiền đơn hàng {order['tracking_code']}",
+            order_id
+        )
+    return order
 
 
 async def get_available_orders(
     db: AsyncIOMotorDatabase,
     vehicle_type: Optional[str] = None,
-    limit: int = 20
+    limit: int = 20,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    projection: Optional[Dict[str, Any]] = None
 ) -> List[Dict[str, Any]]:
     """
     Get available orders for drivers (pending/confirmed orders without assigned driver)
     
+    With a driver position, orders are returned nearest pickup first within
+    `radius_km`, using one `$geoNear` on the `pickup_info.location` 2dsphere
+    index; each order then carries `pickup_distance_km`. Without a position
+    the newest orders are returned.
+    
     Args:
         db: Database instance
         vehicle_type: Filter by vehicle type (optional)
         limit: Number of orders to return
+        lat: Driver latitude (optional)
+        lng: Driver longitude (optional)
+        radius_km: Maximum pickup distance in km (optional, requires lat/lng)
+        projection: Fields to return, e.g. ORDER_SUMMARY_PROJECTION (default: all)
         
     Returns:
         List of available orders
     """
     query = {
         "driver_id": None,
-        "status": {"$in": ["pending", "confirmed"]}
+        "status": {"$in": CLAIMABLE_ORDER_STATUSES}
     }
     
     if vehicle_type:
         query["vehicle_type"] = vehicle_type
     
-    cursor = db.orders.find(query).sort("created_at", -1).limit(limit)
+    if lat is not None and lng is not None:
+        geo_near = {
+            "near": {"type": "Point", "coordinates": [lng, lat]},
+            "key": "pickup_info.location",
+            "distanceField": "pickup_distance_km",
+            "distanceMultiplier": 0.001,  # meters -> km
+            "spherical": True,
+            "query": query
+        }
+        if radius_km is not None:
+            geo_near["maxDistance"] = radius_km * 1000
+        
+        pipeline = [{"$geoNear": geo_near}, {"$limit": limit}]
+        if projection:
+            pipeline.append({"$project": {**projection, "pickup_distance_km": 1}})
+        cursor = db.orders.aggregate(pipeline)
+        orders = await cursor.to_list(length=limit)
+        for order in orders:
+            order["pickup_distance_km"] = round(order["pickup_distance_km"], 2)
+        return orders
+    
+    cursor = db.orders.find(query, projection).sort("created_at", -1).limit(limit)
     orders = await cursor.to_list(length=limit)
     
-    return orders
\ No newline at end of file
+    return orders
+
+
+# ==================== ORDER EVENTS (status timeline) ====================
+#
+# Every status change is one document in `order_events`; the order itself
+# only keeps the latest ORDER_HISTORY_SNAPSHOT_SIZE entries in `history`,
+# so order documents stop growing with the number of transitions.
+#
+# Orders created before order_events existed keep their full `history`
+# until backfill_order_events has copied it and set `history_migrated`;
+# only then is their snapshot trimmed, so nothing is lost whether the
+# backfill runs before or after the deploy.
+
+def history_update(fields: Dict[str, Any], entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Update pipeline setting `fields` and appending a history entry
+    
+    The snapshot is trimmed to ORDER_HISTORY_SNAPSHOT_SIZE only on
+    migrated orders (values are $literal, so notes starting with "$" are
+    stored as-is).
+    
+    Args:
+        fields: Fields to set
+        entry: History entry to append
+        
+    Returns:
+        Pipeline for update_one / find_one_and_update
+    """
+    history = {"$concatArrays": [{"$ifNull": ["$history", []]}, {"$literal": [entry]}]}
+    return [{"$set": {
+        **{field: {"$literal": value} for field, value in fields.items()},
+        "history": {"$cond": [
+            {"$eq": ["$history_migrated", True]},
+            {"$slice": [history, -settings.ORDER_HISTORY_SNAPSHOT_SIZE]},
+            history
+        ]}
+    }}]
+
+
+def _event_document(order_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "order_id": order_id,
+        "ts": entry["timestamp"],
+        "status": entry["status"],
+        "note": entry.get("note"),
+        "updated_by": entry.get("updated_by")
+    }
+
+
+async def record_order_events(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    entries: List[Dict[str, Any]],
+    session=None
+) -> List[Dict[str, Any]]:
+    """
+    Append history entries to an order's timeline and publish them to live streams
+    
+    Inside a transaction (session given) a failure aborts the whole write,
+    and the caller publishes the returned events once it commits. Without
+    one the order update has already happened, so a failed insert is
+    logged instead of failing the request; the snapshot on the order
+    still has the entry.
+    
+    Args:
+        db: Database instance
+        order_id: Order ID
+        entries: History entries (status, timestamp, note, updated_by)
+        session: Client session of a running transaction (optional)
+        
+    Returns:
+        Inserted order_events documents
+    """
+    documents = [_event_document(order_id, entry) for entry in entries]
+    if session is not None:
+        await db.order_events.insert_many(documents, session=session)
+        return documents
+    try:
+        await db.order_events.insert_many(documents)
+    except Exception as e:
+        logger.warning(
+            "Order event not recorded",
+            extra={"fields": {"order_id": order_id, "count": len(documents), "error": str(e)}}
+        )
+        invalidate_order_cache(order_id)
+        return []
+    order_event_bus.publish(documents)
+    return documents
+
+
+async def get_order_events(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get one page of an order's status timeline, oldest first
+    
+    Args:
+        db: Database instance
+        order_id: Order ID
+        limit: Page size
+        cursor: Keyset cursor from a previous page (optional)
+        
+    Returns:
+        Tuple of (events, next cursor or None)
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = apply_cursor({"order_id": order_id}, cursor, time_field="ts", ascending=True)
+    documents = await db.order_events.find(query).sort(
+        [("ts", 1), ("_id", 1)]
+    ).limit(limit + 1).to_list(length=limit + 1)
+    return split_page(documents, limit, time_field="ts")
+
+
+async def backfill_order_events(db: AsyncIOMotorDatabase, batch_size: int = 200) -> int:
+    """
+    Move the history of orders created before order_events existed
+    
+    Copies every `history` entry of unmigrated orders that is not yet in
+    order_events (matched by status and timestamp, so events written by
+    status updates since the deploy are not duplicated), then sets
+    `history_migrated` and trims the snapshot. Safe to re-run, and to run
+    while the app serves requests.
+    
+    Args:
+        db: Database instance
+        batch_size: Orders per round trip
+        
+    Returns:
+        Number of orders migrated
+    """
+    migrated = 0
+    last_id = None
+    while True:
+        query = {"history_migrated": {"$ne": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        orders = await db.orders.find(
+            query, {"history": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not orders:
+            return migrated
+        last_id = orders[-1]["_id"]
+        
+        order_ids = [str(order["_id"]) for order in orders]
+        recorded = {
+            (event["order_id"], event["status"], event["ts"])
+            async for event in db.order_events.find(
+                {"order_id": {"$in": order_ids}}, {"order_id": 1, "status": 1, "ts": 1, "_id": 0}
+            )
+        }
+        missing = [
+            _event_document(str(order["_id"]), entry)
+            for order in orders
+            for entry in order.get("history", [])
+            if (str(order["_id"]), entry["status"], entry["timestamp"]) not in recorded
+        ]
+        if missing:
+            await db.order_events.insert_many(missing)
+        await db.orders.bulk_write([
+            UpdateOne(
+                {"_id": order["_id"]},
+                {
+                    "$set": {"history_migrated": True},
+                    "$push": {"history": {"$each": [], "$slice": -settings.ORDER_HISTORY_SNAPSHOT_SIZE}}
+                }
+            )
+            for order in orders
+        ], ordered=False)
+        migrated += len(orders)
+
+
+# ==================== JOB LEASES ====================
+
+async def acquire_job_lease(
+    db: AsyncIOMotorDatabase,
+    job_name: str,
+    owner: str,
+    lease_seconds: float
+) -> bool:
+    """
+    Acquire (or renew) the lease of a scheduled job
+    
+    The lease is taken if it is free, expired or already held by `owner`.
+    A concurrent holder makes the upsert collide on `_id`, which means the
+    lease is taken.
+    
+    Args:
+        db: Database instance
+        job_name: Job name (lease `_id`)
+        owner: Unique ID of the calling worker
+        lease_seconds: Lease duration
+        
+    Returns:
+        True if the caller now holds the lease
+    """
+    now = datetime.utcnow()
+    try:
+        await db.job_leases.find_one_and_update(
+            {
+                "_id": job_name,
+                "$or": [{"expires_at": {"$lte": now}}, {"owner": owner}]
+            },
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease_seconds), "acquired_at": now}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def release_job_lease(db: AsyncIOMotorDatabase, job_name: str, owner: str) -> bool:
+    """Release a job lease held by `owner`"""
+    result = await db.job_leases.update_one(
+        {"_id": job_name, "owner": owner},
+        {"$set": {"expires_at": datetime.utcnow()}}
+    )
+    return result.modified_count > 0
+
+
+# ==================== BLOBS (content-addressed uploads) ====================
+
+# A blob being deleted (deleting_at set) is taken over by new references
+# after this long, in case its deleter died before removing the record
+BLOB_DELETE_LEASE = timedelta(minutes=5)
+# How long a new reference waits for a deletion in progress to finish
+BLOB_DELETE_WAIT_SECONDS = 10.0
+
+
+async def add_blob_reference(
+    db: AsyncIOMotorDatabase,
+    blob_key: str,
+    sha256: str,
+    size: int
+) -> int:
+    """
+    Take a reference on a blob, registering it if new
+    
+    If the blob is being deleted, waits until its deleter has removed the
+    file and the record, then registers it again (refcount 1), so the
+    caller knows it must store the file.
+    
+    Args:
+        db: Database instance
+        blob_key: SHA-256 hex digest + file extension
+        sha256: SHA-256 hex digest
+        size: Size in bytes
+        
+    Returns:
+        Reference count after the increment (1 means the blob is new)
+        
+    Raises:
+        ServerException: If the deletion did not finish within BLOB_DELETE_WAIT_SECONDS
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + BLOB_DELETE_WAIT_SECONDS
+    while True:
+        now = datetime.utcnow()
+        try:
+            blob = await db.blobs.find_one_and_update(
+                {
+                    "_id": blob_key,
+                    "$or": [
+                        {"deleting_at": {"$exists": False}},
+                        {"deleting_at": {"$lte": now - BLOB_DELETE_LEASE}}
+                    ]
+                },
+                {
+                    "$inc": {"refcount": 1},
+                    "$set": {"updated_at": now},
+                    "$unset": {"deleting_at": ""},
+                    "$setOnInsert": {"sha256": sha256, "size": size, "created_at": now}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return blob["refcount"]
+        except DuplicateKeyError:
+            # Being deleted: the upsert cannot match and collides on _id
+            if loop.time() >= deadline:
+                raise ServerException("Ảnh đang được xoá, vui lòng thử lại")
+            await asyncio.sleep(0.05)
+
+
+async def find_blob(db: AsyncIOMotorDatabase, blob_key: str) -> Optional[Dict[str, Any]]:
+    """Find a registered blob by key"""
+    return await db.blobs.find_one({"_id": blob_key})
+
+
+async def release_blob_reference(db: AsyncIOMotorDatabase, blob_key: str) -> bool:
+    """
+    Drop a reference on a blob, marking it as being deleted at zero
+    
+    When this returns True the caller owns the deletion: it must remove
+    the stored file(s) and then call remove_blob. Until then new
+    references wait (see add_blob_reference), so a concurrent upload of
+    the same content cannot have its file deleted from under it.
+    
+    Args:
+        db: Database instance
+        blob_key: Blob key
+        
+    Returns:
+        True if this was the last reference (the file must be removed)
+    """
+    blob = await db.blobs.find_one_and_update(
+        {"_id": blob_key, "refcount": {"$gt": 0}},
+        {"$inc": {"refcount": -1}, "$set": {"updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if not blob or blob["refcount"] > 0:
+        return False
+    
+    # Only claim the deletion if nobody took a new reference in the meantime
+    result = await db.blobs.update_one(
+        {"_id": blob_key, "refcount": {"$lte": 0}, "deleting_at": {"$exists": False}},
+        {"$set": {"deleting_at": datetime.utcnow()}}
+    )
+    return result.modified_count > 0
+
+
+async def remove_blob(db: AsyncIOMotorDatabase, blob_key: str) -> bool:
+    """
+    Unregister a blob whose deletion was claimed by release_blob_reference
+    
+    Returns:
+        False if a new reference took the blob over in the meantime
+    """
+    result = await db.blobs.delete_one(
+        {"_id": blob_key, "refcount": {"$lte": 0}, "deleting_at": {"$exists": True}}
+    )
+    return result.deleted_count > 0
+
+
+async def get_blob_stats(db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+    """
+    Storage and deduplication statistics of uploaded blobs
+    
+    Returns:
+        Dict with blob/reference counts, stored and logical bytes and
+        dedup_ratio (logical bytes / stored bytes)
+    """
+    result = await db.blobs.aggregate([
+        {"$group": {
+            "_id": None,
+            "blobs": {"$sum": 1},
+            "references": {"$sum": "$refcount"},
+            "stored_bytes": {"$sum": "$size"},
+            "logical_bytes": {"$sum": {"$multiply": ["$size", "$refcount"]}}
+        }}
+    ]).to_list(length=1)
+    
+    stats = result[0] if result else {"blobs": 0, "references": 0, "stored_bytes": 0, "logical_bytes": 0}
+    stats.pop("_id", None)
+    stats["dedup_ratio"] = round(stats["logical_bytes"] / stats["stored_bytes"], 3) if stats["stored_bytes"] else 1.0
+    return stats
@@ -0,0 +1,111 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple
+from bson import ObjectId
+
+
+# Sort order used by every keyset-paginated listing (newest first)
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+
+def encode_cursor(document: Dict[str, Any], time_field: str = "created_at") -> str:
+    """
+    Build an opaque cursor token pointing after a document
+
+    Args:
+        document: Last document of the current page
+        time_field: Datetime field the listing is sorted by (then _id)
+
+    Returns:
+        URL-safe cursor token
+    """
+    payload = {
+        "t": document[time_field].isoformat(),
+        "id": str(document["_id"])
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decode a cursor token created by `encode_cursor`
+
+    Args:
+        token: Cursor token
+
+    Returns:
+        Tuple (created_at, _id)
+
+    Raises:
+        ValueError: If token is malformed
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except Exception:
+        raise ValueError("Cursor không hợp lệ")
+
+
+def apply_cursor(
+    query: Dict[str, Any],
+    cursor: Optional[str],
+    time_field: str = "created_at",
+    ascending: bool = False
+) -> Dict[str, Any]:
+    """
+    Restrict a query to documents after the cursor
+
+    Args:
+        query: Base Mongo filter
+        cursor: Cursor token (optional)
+        time_field: Datetime field the listing is sorted by (then _id)
+        ascending: Oldest first instead of KEYSET_SORT's newest first
+
+    Returns:
+        Filter to use for the page query
+    """
+    if not cursor:
+        return query
+
+    last_time, last_id = decode_cursor(cursor)
+    after = "$gt" if ascending else "$lt"
+    return {
+        **query,
+        "$or": [
+            {time_field: {after: last_time}},
+            {time_field: last_time, "_id": {after: last_id}}
+        ]
+    }
+
+
+def split_page(
+    documents: List[Dict[str, Any]],
+    limit: int,
+    time_field: str = "created_at"
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Split a `limit + 1` fetch into the page and the next cursor
+
+    Args:
+        documents: Documents fetched with limit + 1
+        limit: Page size
+        time_field: Datetime field the listing is sorted by (then _id)
+
+    Returns:
+        Tuple (page documents, next cursor or None if last page)
+
+    Raises:
+        ValueError: If limit is below 1
+    """
+    if limit < 1:
+        raise ValueError("limit phải lớn hơn 0")
+    if len(documents) <= limit:
+        return documents, None
+    page = documents[:limit]
+    return page, encode_cursor(page[-1], time_field)
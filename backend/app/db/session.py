@@ -3,6 +3,12 @@ Database connection and session management
 """
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
+from app.db.indexes import ensure_indexes
+from app.core.logging import get_logger
+from app.core.metrics import MONGO_POOL_MAX_SIZE, mongo_event_listeners
+
+
+logger = get_logger("db")
 
 
 class MongoDB:
@@ -10,25 +16,48 @@ class MongoDB:
     
     client: AsyncIOMotorClient = None
     db = None
+    supports_transactions: bool = False
 
 
 mongodb = MongoDB()
 
 
 async def connect_to_mongo():
-    """Connect to MongoDB"""
+    """Connect to MongoDB and reconcile indexes"""
     mongodb_url = settings.get_mongodb_url()
     db_name = settings.get_db_name()
-    mongodb.client = AsyncIOMotorClient(mongodb_url)
+    listeners = mongo_event_listeners() if settings.METRICS_ENABLED else []
+    mongodb.client = AsyncIOMotorClient(mongodb_url, event_listeners=listeners)
+    MONGO_POOL_MAX_SIZE.set(mongodb.client.options.pool_options.max_pool_size)
     mongodb.db = mongodb.client[db_name]
-    print(f"[OK] Connected to MongoDB: {db_name}")
+    logger.info("Connected to MongoDB", extra={"fields": {"db": db_name}})
+    
+    mongodb.supports_transactions = await detect_transactions_support(mongodb.db)
+    
+    if settings.ENSURE_INDEXES_ON_STARTUP:
+        result = await ensure_indexes(mongodb.db)
+        logger.info("Indexes reconciled", extra={"fields": result})
+
+
+async def detect_transactions_support(db) -> bool:
+    """
+    Check whether the deployment supports multi-document transactions
+    
+    Transactions need a replica set or a sharded cluster (mongos);
+    a standalone mongod does not support them.
+    """
+    try:
+        hello = await db.command("hello")
+    except Exception:
+        return False
+    return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
 
 
 async def close_mongo_connection():
     """Close MongoDB connection"""
     if mongodb.client:
         mongodb.client.close()
-        print("[CLOSED] Closed MongoDB connection")
+        logger.info("Closed MongoDB connection")
 
 
 def get_database():
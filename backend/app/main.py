@@ -1,15 +1,24 @@
 """
 FastAPI Application - Main Entry Point
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from pathlib import Path
 import os
 from app.core.config import settings
-from app.db.session import connect_to_mongo, close_mongo_connection
+from app.db.session import connect_to_mongo, close_mongo_connection, mongodb
 from app.api.v1.router import api_router
+from app.core.request_context import RequestContextMiddleware
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.logging import setup_logging, shutdown_logging
+from app.core.serialization import FastJSONResponse
+from app.db.cache import user_cache, tracking_cache
+from app.services.sms_service import sms_queue
+from app.services.scheduler import scheduler
+from app.services.order_stream import order_event_bus
+from app.services.image_service import shutdown_image_executor
 
 
 @asynccontextmanager
@@ -19,6 +28,7 @@ async def lifespan(app: FastAPI):
     """
     # Startup
     print("[START] Starting application...")
+    setup_logging()
     await connect_to_mongo()
     
     # Ensure upload directory exists
@@ -26,10 +36,21 @@ async def lifespan(app: FastAPI):
     upload_dir.mkdir(exist_ok=True)
     (upload_dir / "orders").mkdir(exist_ok=True)
     
+    await sms_queue.start()
+    if settings.SCHEDULER_ENABLED:
+        await scheduler.start(mongodb.db)
+    # Change streams (other workers' order updates) need a replica set, like transactions
+    await order_event_bus.start(mongodb.db, change_stream=mongodb.supports_transactions)
+    
     yield
     # Shutdown
     print("[SHUTDOWN] Shutting down application...")
+    await order_event_bus.stop()
+    await scheduler.stop()
+    await sms_queue.stop()
+    shutdown_image_executor()
     await close_mongo_connection()
+    shutdown_logging()
 
 
 # Create FastAPI app
@@ -51,6 +72,7 @@ app = FastAPI(
         "docExpansion": "list",           # Show list of endpoints
         "syntaxHighlight.theme": "monokai"  # Syntax highlighting theme
     },
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -87,6 +109,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request-scoped context (memo of users loaded during the request)
+app.add_middleware(RequestContextMiddleware)
+
+# Per-route latency / in-flight metrics (added last = outermost, times the whole stack)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 # Mount static files for uploads
 upload_dir = Path("uploads")
@@ -138,6 +167,7 @@ async def root():
             "openapi_schema": "/openapi.json"
         },
         "health": "/health",
+        "metrics": "/metrics",
         "api_base": "/api/v1"
     }
 
@@ -155,8 +185,26 @@ async def health_check():
     return {
         "status": "healthy",
         "app": settings.APP_NAME,
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "caches": {
+            "users": user_cache.stats(),
+            "tracking": tracking_cache.stats()
+        },
+        "sms_queue": sms_queue.stats(),
+        "scheduler": scheduler.stats(),
+        "order_stream": order_event_bus.stats()
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics (HTTP routes, MongoDB commands and connection pool)
+    """
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 # Run with: uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
@@ -31,6 +31,12 @@ class OrderStatus(str, Enum):
     FAILED = "failed"             # Giao hàng thất bại
 
 
+class OrderView(str, Enum):
+    """Shape of orders in list responses"""
+    FULL = "full"           # OrderResponse
+    SUMMARY = "summary"     # OrderSummaryResponse (list rows)
+
+
 class PaymentMethod(str, Enum):
     """Payment methods"""
     WALLET = "wallet"       # Ví điện tử
@@ -132,6 +138,63 @@ class UpdateOrderStatusRequest(BaseModel):
         }
 
 
+class QuoteRow(BaseModel):
+    """One origin/destination row of a batch quote"""
+    pickup_lat: float = Field(..., ge=-90, le=90)
+    pickup_lng: float = Field(..., ge=-180, le=180)
+    dropoff_lat: float = Field(..., ge=-90, le=90)
+    dropoff_lng: float = Field(..., ge=-180, le=180)
+    weight: float = Field(..., gt=0, le=10000, description="Khối lượng (kg)")
+    vehicle_type: VehicleType
+    cod_amount: float = Field(0, ge=0, description="Tiền thu hộ (COD)")
+
+
+class BatchQuoteRequest(BaseModel):
+    """Request to price many orders at once"""
+    rows: List[QuoteRow] = Field(..., min_length=1, max_length=1000)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "rows": [
+                    {
+                        "pickup_lat": 10.7329269,
+                        "pickup_lng": 106.7172715,
+                        "dropoff_lat": 10.8231271,
+                        "dropoff_lng": 106.7574535,
+                        "weight": 5.5,
+                        "vehicle_type": "bike",
+                        "cod_amount": 500000
+                    }
+                ]
+            }
+        }
+
+
+class PresignImageUploadRequest(BaseModel):
+    """Request a direct-to-storage upload of an order image"""
+    filename: str = Field(..., max_length=255)
+    content_type: str = Field(..., pattern=r"^image/[a-z0-9.+-]+$")
+    size: int = Field(..., gt=0, description="Kích thước file (bytes)")
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$", description="SHA-256 (hex) của file")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "filename": "product.jpg",
+                "content_type": "image/jpeg",
+                "size": 482133,
+                "sha256": "3738a2fda89926085def7b9d3caa7a065c7bb823306c0988e97d7600a1ed9bed"
+            }
+        }
+
+
+class ConfirmImageUploadRequest(BaseModel):
+    """Attach a directly uploaded image to an order"""
+    filename: str = Field(..., max_length=255)
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+
+
 # ==================== ORDER RESPONSE SCHEMAS ====================
 
 class OrderHistoryItem(BaseModel):
@@ -152,6 +215,13 @@ class OrderHistoryItem(BaseModel):
         }
 
 
+class ImageVariants(BaseModel):
+    """Resized WebP copies of an order image"""
+    original: str
+    thumb: Optional[str] = None  # 160px
+    medium: Optional[str] = None  # 800px
+
+
 class OrderResponse(BaseModel):
     """Complete order information"""
     id: str = Field(alias="_id")
@@ -166,6 +236,7 @@ class OrderResponse(BaseModel):
     # Product info
     product_name: str
     images: List[str] = []
+    image_variants: List[ImageVariants] = []  # Filled shortly after upload
     weight: float
     length: Optional[float] = None
     width: Optional[float] = None
@@ -185,12 +256,15 @@ class OrderResponse(BaseModel):
     
     # Status
     status: OrderStatus
-    history: List[Dict[str, Any]] = []
+    history: List[Dict[str, Any]] = []  # Latest changes only; full timeline: GET /orders/{id}/events
     is_reviewed: bool = False
     
     # Timestamps
     created_at: datetime
     updated_at: datetime
+    
+    # Only set on nearest-first available order lists
+    pickup_distance_km: Optional[float] = None
 
     class Config:
         populate_by_name = True
@@ -239,10 +313,11 @@ class OrderResponse(BaseModel):
 
 class OrderListResponse(BaseModel):
     """Paginated list of orders"""
-    total: int
+    total: Optional[int] = None  # Only set when include_total=true
     page: int
     limit: int
     orders: List[OrderResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
 
     class Config:
         json_schema_extra = {
@@ -250,11 +325,89 @@ class OrderListResponse(BaseModel):
                 "total": 50,
                 "page": 1,
                 "limit": 10,
-                "orders": []
+                "orders": [],
+                "next_cursor": "eyJ0IjoiMjAyNC0wMS0xNVQxMDowMDowMCIsImlkIjoiNjVhMWIyYzNkNGU1ZjY3ODkwMTIzNDUifQ"
             }
         }
 
 
+class OrderEventResponse(BaseModel):
+    """One status change in an order's timeline (order_events)"""
+    id: str = Field(alias="_id")
+    order_id: str
+    ts: datetime
+    status: OrderStatus
+    note: Optional[str] = None
+    updated_by: Optional[str] = None  # user_id or driver_id
+
+    class Config:
+        populate_by_name = True
+
+
+class OrderEventListResponse(BaseModel):
+    """Page of an order's timeline, oldest first"""
+    events: List[OrderEventResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
+
+
+class OrderStreamTokenResponse(BaseModel):
+    """Short-lived token for opening an order's live stream from EventSource"""
+    token: str
+    stream_url: str  # Stream URL with the token as ?token=
+    expires_at: datetime  # The stream must be opened (or reopened) before this
+
+
+class OrderSummaryResponse(BaseModel):
+    """One order list row (view=summary): no history, images or contact phones"""
+    id: str = Field(alias="_id")
+    tracking_code: str
+    user_id: str
+    driver_id: Optional[str] = None
+    status: OrderStatus
+    vehicle_type: VehicleType
+    product_name: str
+    distance_km: float
+    total_amount: float
+    is_paid: bool
+    pickup_info: Dict[str, Any]  # address
+    dropoff_info: Dict[str, Any]  # address, contact_name
+    created_at: datetime
+    updated_at: datetime
+    
+    # Only set on nearest-first available order lists
+    pickup_distance_km: Optional[float] = None
+
+    class Config:
+        populate_by_name = True
+        json_schema_extra = {
+            "example": {
+                "id": "65a1b2c3d4e5f6789012345",
+                "tracking_code": "SW20240115001",
+                "user_id": "65a1b2c3d4e5f678901234",
+                "driver_id": None,
+                "status": "pending",
+                "vehicle_type": "bike",
+                "product_name": "Quần áo thời trang",
+                "distance_km": 8.5,
+                "total_amount": 545000,
+                "is_paid": True,
+                "pickup_info": {"address": "123 Nguyễn Văn Linh, Q.7"},
+                "dropoff_info": {"address": "456 Lê Văn Việt, Q.9", "contact_name": "Trần Thị B"},
+                "created_at": "2024-01-15T10:00:00Z",
+                "updated_at": "2024-01-15T10:00:00Z"
+            }
+        }
+
+
+class OrderSummaryListResponse(BaseModel):
+    """Paginated list of order summaries (view=summary)"""
+    total: Optional[int] = None  # Only set when include_total=true
+    page: int
+    limit: int
+    orders: List[OrderSummaryResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
+
+
 class CreateOrderResponse(BaseModel):
     """Response after creating an order"""
     success: bool
@@ -275,3 +428,44 @@ class CreateOrderResponse(BaseModel):
                 "payment_required": True
             }
         }
+
+
+class QuoteResult(BaseModel):
+    """Fee breakdown of one batch quote row (same fields as calculate_shipping_fee)"""
+    distance_km: float
+    base_fee: float
+    distance_fee: float
+    weight_surcharge: float
+    cod_fee: float
+    shipping_fee: float
+    total_amount: float
+    error: Optional[str] = None  # Set when the row cannot be priced (e.g. overweight)
+
+
+class BatchQuoteResponse(BaseModel):
+    """Batch quote results, in request row order"""
+    success: bool
+    count: int
+    quotes: List[QuoteResult]
+
+
+class PresignImageUploadResponse(BaseModel):
+    """
+    Where and how to upload an image
+
+    When upload_required is false the image is already stored and the
+    client can confirm right away.
+    """
+    upload_required: bool
+    key: str
+    method: Optional[str] = None
+    url: Optional[str] = None
+    headers: Dict[str, str] = {}  # Must be sent with the upload request
+    expires_at: Optional[datetime] = None
+
+
+class ConfirmImageUploadResponse(BaseModel):
+    """Response after attaching an uploaded image"""
+    success: bool
+    message: str
+    image_url: str
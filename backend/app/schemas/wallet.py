@@ -32,7 +32,7 @@ class TransactionResponse(TransactionBase):
     """Schema for transaction response"""
     id: str = Field(..., alias="_id")
     user_id: str
-    status: str = Field(..., description="Transaction status: pending, completed, failed, cancelled")
+    status: str = Field(..., description="Transaction status: pending, completed, failed, cancelled, expired")
     payment_id: Optional[str] = None
     payment_method: Optional[str] = None
     payment_details: Optional[dict] = None
@@ -50,8 +50,9 @@ class TransactionResponse(TransactionBase):
 class TransactionListResponse(BaseModel):
     """Schema for transaction list response"""
     success: bool = True
-    total: int
+    total: int  # Transactions in this page (no count query is run)
     transactions: List[TransactionResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
 
 
 # ==================== WALLET SCHEMAS ====================
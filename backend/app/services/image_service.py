@@ -0,0 +1,172 @@
+"""
+Image service - Resized WebP variants of order images (Pillow in a process pool)
+"""
+import asyncio
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.config import settings
+from app.db import models
+from app.services.storage import storage, LOCAL_TEMP_DIR
+from app.core.logging import get_logger
+
+
+logger = get_logger("images")
+
+# Variant name -> longest side in pixels
+IMAGE_VARIANTS = {"thumb": 160, "medium": 800}
+WEBP_QUALITY = 80
+VARIANTS_SUBDIR = "variants"
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown_image_executor() -> None:
+    """Stop the worker processes (called on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def variant_key(key: str, size: int) -> str:
+    """Storage key of the `size` variant of an image (blobs/ab/cd/variants/<stem>_<size>.webp)"""
+    parent, filename = key.rsplit("/", 1)
+    return f"{parent}/{VARIANTS_SUBDIR}/{Path(filename).stem}_{size}.webp"
+
+
+def variant_keys(key: str) -> List[str]:
+    """Storage keys of every variant of an image"""
+    return [variant_key(key, size) for size in IMAGE_VARIANTS.values()]
+
+
+def render_variants(source: str, output_dir: str, sizes: Dict[str, int]) -> Dict[str, str]:
+    """
+    Write resized WebP copies of an image (runs in a worker process)
+
+    The EXIF orientation is applied to the pixels and the metadata is not
+    copied, so variants carry no EXIF (GPS, camera serial, ...).
+
+    Args:
+        source: Path of the original image
+        output_dir: Directory for the variants
+        sizes: Variant name -> longest side in pixels
+
+    Returns:
+        Variant name -> written file path
+    """
+    from PIL import Image, ImageOps
+
+    written = {}
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        for name, size in sizes.items():
+            variant = image.copy()
+            variant.thumbnail((size, size))
+            path = os.path.join(output_dir, f"{name}_{size}.webp")
+            variant.save(path, "WEBP", quality=WEBP_QUALITY, method=4)
+            written[name] = path
+    return written
+
+
+async def generate_image_variants(image_url: str) -> Dict[str, str]:
+    """
+    Create the resized variants of a stored order image
+
+    Blobs are content-addressed, so variants that already exist in
+    storage are reused instead of rendered again.
+
+    Args:
+        image_url: URL of the original as returned by the storage backend
+
+    Returns:
+        Dict with "original" and one URL per variant name
+
+    Raises:
+        ValueError: If the URL does not belong to the storage backend
+    """
+    key = storage.key_from_url(image_url)
+    if key is None:
+        raise ValueError(f"Not a stored image: {image_url}")
+
+    missing = {
+        name: size for name, size in IMAGE_VARIANTS.items()
+        if not await storage.exists(variant_key(key, size))
+    }
+
+    if missing:
+        work_dir = LOCAL_TEMP_DIR / f"variants-{uuid.uuid4().hex}"
+        work_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            source = storage.local_path(key)
+            if source is None:
+                source = work_dir / Path(key).name
+                await storage.get_file(key, source)
+
+            loop = asyncio.get_running_loop()
+            written = await loop.run_in_executor(
+                _get_executor(), render_variants, str(source), str(work_dir), missing
+            )
+            for name, path in written.items():
+                await storage.put_file(variant_key(key, missing[name]), Path(path), "image/webp")
+        finally:
+            await asyncio.to_thread(shutil.rmtree, work_dir, True)
+
+    variants = {"original": image_url}
+    for name, size in IMAGE_VARIANTS.items():
+        variants[name] = storage.url(variant_key(key, size))
+    return variants
+
+
+async def process_order_images(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    image_paths: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Generate variants for an order's images and record them on the order
+
+    Meant to run as a background task after the upload; images that fail
+    to process are skipped (clients fall back to the original).
+
+    Args:
+        db: Database instance
+        order_id: Order ID
+        image_paths: URLs of the originals
+
+    Returns:
+        Recorded variant entries
+    """
+    results = await asyncio.gather(
+        *[generate_image_variants(path) for path in image_paths],
+        return_exceptions=True
+    )
+
+    variants = []
+    for path, result in zip(image_paths, results):
+        if isinstance(result, Exception):
+            logger.warning(
+                "Image variants failed",
+                exc_info=(type(result), result, result.__traceback__),
+                extra={"fields": {"order_id": order_id, "path": path}}
+            )
+        else:
+            variants.append(result)
+
+    if variants:
+        await models.add_image_variants_to_order(db, order_id, variants)
+    return variants
@@ -0,0 +1,247 @@
+"""
+Order Stream - In-process pub/sub of order status events for live tracking
+
+Status writers (app/db/models.py) publish every new order_events document
+to this worker's subscribers. With several workers, a MongoDB change
+stream on order_events forwards events written by the other workers
+(change streams need a replica set; on a standalone mongod each worker
+only sees its own writes).
+"""
+import asyncio
+import random
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import ORDER_STREAM_EVENTS, ORDER_STREAM_SUBSCRIBERS
+from app.core.serialization import dumps
+
+
+logger = get_logger("order_stream")
+
+
+class TooManySubscribers(Exception):
+    """Raised when this worker already holds ORDER_STREAM_MAX_SUBSCRIBERS streams"""
+
+
+class Subscription:
+    """
+    One live stream's view of an order's events
+
+    Events wait in a small bounded queue; if a slow client lets it fill,
+    the oldest event is dropped (the newest status is what matters).
+    Use as a context manager so the subscription is always removed.
+
+    Args:
+        bus: Owning bus
+        order_id: Order ID
+        max_size: Queued events before dropping the oldest
+    """
+
+    def __init__(self, bus: "OrderEventBus", order_id: str, max_size: int):
+        self.bus = bus
+        self.order_id = order_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.dropped = 0
+
+    def put(self, event: Dict[str, Any]) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            ORDER_STREAM_EVENTS.labels("dropped").inc()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next event, or None if none arrived within `timeout` seconds
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class OrderEventBus:
+    """
+    Fans order events out to this worker's live streams
+
+    Publishing is synchronous and O(subscribers of that order): idle
+    streams of other orders cost nothing but their queue.
+
+    Args:
+        max_subscribers: Streams allowed on this worker
+        queue_size: Queued events per stream
+    """
+
+    def __init__(
+        self,
+        max_subscribers: int = settings.ORDER_STREAM_MAX_SUBSCRIBERS,
+        queue_size: int = settings.ORDER_STREAM_QUEUE_SIZE
+    ):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        # IDs of events published locally, so the change stream does not deliver them twice
+        self._recent_ids: "OrderedDict[Any, None]" = OrderedDict()
+        self._recent_limit = 10000
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._bridge_task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.bridged = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def subscribe(self, order_id: str) -> Subscription:
+        """
+        Start receiving an order's events
+
+        Raises:
+            TooManySubscribers: If the worker is at ORDER_STREAM_MAX_SUBSCRIBERS
+        """
+        if self._count >= self.max_subscribers:
+            raise TooManySubscribers()
+        subscription = Subscription(self, order_id, self.queue_size)
+        self._subscribers.setdefault(order_id, set()).add(subscription)
+        self._count += 1
+        ORDER_STREAM_SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.order_id)
+        if not subscribers or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.order_id]
+        self._count -= 1
+        ORDER_STREAM_SUBSCRIBERS.dec()
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Call `listener(event)` for every event of any order (local and bridged)
+
+        Used for cache invalidation; listeners must be quick and not raise.
+        """
+        self._listeners.append(listener)
+
+    def _deliver(self, event: Dict[str, Any]) -> None:
+        for listener in self._listeners:
+            listener(event)
+        for subscription in self._subscribers.get(event["order_id"], ()):
+            subscription.put(event)
+            ORDER_STREAM_EVENTS.labels("delivered").inc()
+
+    def publish(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Deliver order_events documents written by this worker
+
+        Args:
+            events: Inserted order_events documents (with _id)
+        """
+        for event in events:
+            self._recent_ids[event["_id"]] = None
+            if len(self._recent_ids) > self._recent_limit:
+                self._recent_ids.popitem(last=False)
+            self.published += 1
+            self._deliver(event)
+
+    def _publish_remote(self, event: Dict[str, Any]) -> None:
+        if event["_id"] in self._recent_ids:
+            del self._recent_ids[event["_id"]]
+            return  # Written (and already delivered) by this worker
+        self.bridged += 1
+        self._deliver(event)
+
+    # ==================== CHANGE STREAM BRIDGE ====================
+
+    @property
+    def bridge_running(self) -> bool:
+        return self._bridge_task is not None and not self._bridge_task.done()
+
+    async def start(self, db: AsyncIOMotorDatabase, change_stream: bool) -> None:
+        """
+        Start the change stream bridge (idempotent)
+
+        Args:
+            db: Database instance
+            change_stream: Whether the deployment supports change streams
+                (replica set / sharded cluster)
+        """
+        if self.bridge_running or not change_stream:
+            return
+        self._bridge_task = asyncio.create_task(self._bridge(db), name="order-stream-bridge")
+        logger.info("Order stream bridge started")
+
+    async def stop(self) -> None:
+        if self._bridge_task is None:
+            return
+        self._bridge_task.cancel()
+        await asyncio.gather(self._bridge_task, return_exceptions=True)
+        self._bridge_task = None
+
+    async def _bridge(self, db: AsyncIOMotorDatabase) -> None:
+        """Forward order_events inserts from every worker, resuming after errors"""
+        resume_token = None
+        delay = 1.0
+        while True:
+            try:
+                async with db.order_events.watch(
+                    [{"$match": {"operationType": "insert"}}],
+                    resume_after=resume_token
+                ) as stream:
+                    delay = 1.0
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._publish_remote(change["fullDocument"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Order change stream interrupted",
+                    extra={"fields": {"error": str(e), "retry_in_s": round(delay, 1)}}
+                )
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+                delay = min(delay * 2, 30.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self._count,
+            "orders": len(self._subscribers),
+            "published": self.published,
+            "bridged": self.bridged,
+            "bridge_running": self.bridge_running
+        }
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> bytes:
+    """
+    Encode one Server-Sent Events message
+
+    Args:
+        event: Event name (EventSource listener type)
+        data: JSON-serializable payload
+        event_id: Message ID (lets clients skip duplicates; optional)
+    """
+    head = f"id: {event_id}\nevent: {event}\n" if event_id else f"event: {event}\n"
+    return head.encode() + b"data: " + dumps(data) + b"\n\n"
+
+
+# Keep-alive comment (ignored by EventSource, keeps proxies from closing idle streams)
+SSE_HEARTBEAT = b": ping\n\n"
+
+
+# Process-wide bus (bridge started from the app lifespan)
+order_event_bus = OrderEventBus()
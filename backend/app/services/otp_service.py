@@ -5,18 +5,15 @@ import random
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from twilio.rest import Client as TwilioClient
 from app.core.config import settings
-from app.db import models
+from app.services.otp_store import (
+    otp_store, OTP_EXPIRED, OTP_EXHAUSTED, OTP_INVALID, OTP_NOT_FOUND
+)
+from app.services.sms_service import sms_queue, SMSQueueFull
+from app.core.logging import get_logger
 
 
-# Initialize Twilio client if configured
-twilio_client: Optional[TwilioClient] = None
-if settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN:
-    twilio_client = TwilioClient(
-        settings.TWILIO_ACCOUNT_SID,
-        settings.TWILIO_AUTH_TOKEN
-    )
+logger = get_logger("otp")
 
 
 def generate_otp() -> str:
@@ -31,7 +28,10 @@ def generate_otp() -> str:
 
 async def send_sms(phone: str, otp: str) -> Dict[str, Any]:
     """
-    Send OTP via SMS using Twilio
+    Queue OTP SMS for background delivery
+    
+    The SMS queue workers handle provider calls, retries and rate limiting,
+    so this returns as soon as the message is enqueued.
     
     Args:
         phone: Phone number
@@ -39,28 +39,18 @@ async def send_sms(phone: str, otp: str) -> Dict[str, Any]:
         
     Returns:
         Result dictionary
+        
+    Raises:
+        SMSQueueFull: If the SMS queue is full
     """
-    if not twilio_client:
-        print(f"[WARN] Twilio not configured. OTP for {phone}: {otp}")
-        return {
-            "success": True,
-            "message": "OTP sent (mock)",
-            "otp": otp if settings.NODE_ENV == "development" else None
-        }
-    
+    body = f"Mã OTP của bạn là: {otp}. Mã này có hiệu lực trong {settings.OTP_EXPIRE_MINUTES} phút."
     try:
-        message = twilio_client.messages.create(
-            body=f"Mã OTP của bạn là: {otp}. Mã này có hiệu lực trong {settings.OTP_EXPIRE_MINUTES} phút.",
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=phone
-        )
-        
-        print(f"[OK] SMS sent to {phone}: {message.sid}")
-        return {"success": True, "message": "OTP sent successfully"}
-        
-    except Exception as e:
-        print(f"[ERROR] Error sending SMS: {str(e)}")
-        raise Exception("Failed to send OTP via SMS")
+        await sms_queue.enqueue(phone, body)
+    except SMSQueueFull:
+        logger.error("SMS queue full, OTP not queued", extra={"fields": {"phone": phone}})
+        raise
+    
+    return {"success": True, "message": "OTP queued"}
 
 
 async def create_and_send_otp(
@@ -78,6 +68,9 @@ async def create_and_send_otp(
         
     Returns:
         Result dictionary with success status and expiration time
+        
+    Raises:
+        SMSQueueFull: If the SMS queue is full
     """
     # Generate OTP
     otp_code = generate_otp()
@@ -85,20 +78,16 @@ async def create_and_send_otp(
     # Calculate expiration time
     expires_at = datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
     
-    # Save OTP to database
-    otp_data = {
-        "phone": phone,
-        "otp": otp_code,
-        "purpose": purpose,
-        "expires_at": expires_at
-    }
-    
-    otp = await models.create_otp(db, otp_data)
+    # Save OTP (replaces any previous OTP for this phone and purpose)
+    await otp_store.save(db, phone, purpose, otp_code, expires_at)
     
-    # Send OTP via SMS
-    sms_result = await send_sms(phone, otp_code)
+    # Queue OTP SMS (delivered in the background)
+    await send_sms(phone, otp_code)
     
-    print(f"[OTP] OTP created for {phone} ({purpose}): {otp_code}")
+    logger.info(
+        "OTP created",
+        extra={"fields": {"phone": phone, "purpose": purpose, "otp_code": otp_code}, "sampled": True}
+    )
     
     result = {
         "success": True,
@@ -131,47 +120,35 @@ async def verify_otp_code(
     Returns:
         Result dictionary with verification status
     """
-    # Find latest OTP
-    otp = await models.find_latest_otp(db, phone, purpose)
+    result = await otp_store.verify(db, phone, purpose, otp_code, settings.OTP_MAX_ATTEMPTS)
     
-    if not otp:
+    if result.status == OTP_NOT_FOUND:
         return {
             "success": False,
             "message": "OTP không tồn tại hoặc đã được sử dụng"
         }
     
-    # Check if expired
-    if datetime.utcnow() > otp['expires_at']:
-        await db.otps.delete_one({"_id": otp['_id']})
+    if result.status == OTP_EXPIRED:
         return {
             "success": False,
             "message": "OTP đã hết hạn"
         }
     
-    # Check attempts
-    if otp['attempts'] >= settings.OTP_MAX_ATTEMPTS:
-        await db.otps.delete_one({"_id": otp['_id']})
+    if result.status == OTP_EXHAUSTED:
         return {
             "success": False,
             "message": "Đã vượt quá số lần thử. Vui lòng gửi lại OTP mới"
         }
     
-    # Verify OTP
-    if otp['otp'] != otp_code:
-        # Increment attempts
-        new_attempts = await models.increment_otp_attempts(db, otp['_id'])
-        remaining = settings.OTP_MAX_ATTEMPTS - new_attempts
-        
+    if result.status == OTP_INVALID:
+        remaining = result.remaining_attempts
         return {
             "success": False,
             "message": f"OTP không đúng. Còn {remaining} lần thử",
             "remaining_attempts": remaining
         }
     
-    # Mark as used
-    await models.mark_otp_as_used(db, otp['_id'])
-    
-    print(f"[OK] OTP verified for {phone}")
+    logger.info("OTP verified", extra={"fields": {"phone": phone, "purpose": purpose}, "sampled": True})
     
     return {
         "success": True,
@@ -0,0 +1,214 @@
+"""
+OTP Store - Pluggable storage for OTP codes (MongoDB or in-process TTL)
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.config import settings
+from app.db import models
+
+
+# Verification outcomes
+OTP_OK = "ok"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+OTP_EXHAUSTED = "exhausted"
+OTP_NOT_FOUND = "not_found"
+
+
+@dataclass
+class OTPVerification:
+    """Result of an OTP verification"""
+    status: str
+    remaining_attempts: Optional[int] = None
+
+
+class OTPStore(ABC):
+    """Interface of an OTP store"""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def save(
+        self,
+        db: AsyncIOMotorDatabase,
+        phone: str,
+        purpose: str,
+        otp_code: str,
+        expires_at: datetime
+    ) -> None:
+        """
+        Store an OTP, replacing any previous one for the phone and purpose
+
+        Args:
+            db: Database instance
+            phone: Phone number
+            purpose: OTP purpose
+            otp_code: OTP code
+            expires_at: Expiration time (UTC)
+        """
+
+    @abstractmethod
+    async def verify(
+        self,
+        db: AsyncIOMotorDatabase,
+        phone: str,
+        purpose: str,
+        otp_code: str,
+        max_attempts: int
+    ) -> OTPVerification:
+        """
+        Verify and consume an OTP
+
+        A wrong code counts as an attempt. Expired and exhausted OTPs are
+        removed.
+
+        Args:
+            db: Database instance
+            phone: Phone number
+            purpose: OTP purpose
+            otp_code: Submitted code
+            max_attempts: Maximum verification attempts
+
+        Returns:
+            OTPVerification with one of the OTP_* statuses
+        """
+
+    @abstractmethod
+    async def cleanup(self, db: AsyncIOMotorDatabase, batch_size: int) -> int:
+        """
+        Remove expired OTPs (one bounded batch)
+
+        Returns:
+            Number of removed OTPs
+        """
+
+
+class MongoOTPStore(OTPStore):
+    """
+    OTP store on the `otps` collection
+
+    One upsert per send. A correct code is consumed with a single
+    conditional find_one_and_update; wrong codes cost one more update and
+    only terminal failures (expired, exhausted) need a third call.
+    """
+
+    name = "mongo"
+
+    async def save(self, db, phone, purpose, otp_code, expires_at) -> None:
+        await models.create_otp(db, {
+            "phone": phone,
+            "otp": otp_code,
+            "purpose": purpose,
+            "expires_at": expires_at
+        })
+
+    async def verify(self, db, phone, purpose, otp_code, max_attempts) -> OTPVerification:
+        if await models.consume_otp(db, phone, purpose, otp_code, max_attempts):
+            return OTPVerification(OTP_OK)
+
+        otp = await models.record_failed_otp_attempt(db, phone, purpose, max_attempts)
+        if otp:
+            return OTPVerification(OTP_INVALID, max_attempts - otp['attempts'])
+
+        otp = await models.delete_unusable_otp(db, phone, purpose, max_attempts)
+        if not otp:
+            return OTPVerification(OTP_NOT_FOUND)
+        if otp['expires_at'] <= datetime.utcnow():
+            return OTPVerification(OTP_EXPIRED)
+        return OTPVerification(OTP_EXHAUSTED)
+
+    async def cleanup(self, db, batch_size) -> int:
+        return await models.cleanup_expired_otps(db, batch_size)
+
+
+class InMemoryOTPStore(OTPStore):
+    """
+    In-process OTP store with expiry, for single-node deployments
+
+    OTPs are lost on restart and are not shared between workers, so only
+    use it with a single uvicorn worker. Save and verify run without
+    awaiting, which makes them atomic on the event loop.
+
+    Args:
+        max_size: Maximum stored OTPs (oldest are evicted first)
+    """
+
+    name = "memory"
+
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        # (phone, purpose) -> (otp_code, expires_at, attempts)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, datetime, int]]" = OrderedDict()
+
+    async def save(self, db, phone, purpose, otp_code, expires_at) -> None:
+        key = (phone, purpose)
+        self._entries.pop(key, None)
+        self._entries[key] = (otp_code, expires_at, 0)
+        if len(self._entries) > self.max_size:
+            self.purge_expired()
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def verify(self, db, phone, purpose, otp_code, max_attempts) -> OTPVerification:
+        key = (phone, purpose)
+        entry = self._entries.get(key)
+        if entry is None:
+            return OTPVerification(OTP_NOT_FOUND)
+
+        code, expires_at, attempts = entry
+        if expires_at <= datetime.utcnow():
+            del self._entries[key]
+            return OTPVerification(OTP_EXPIRED)
+        if attempts >= max_attempts:
+            del self._entries[key]
+            return OTPVerification(OTP_EXHAUSTED)
+        if code != otp_code:
+            self._entries[key] = (code, expires_at, attempts + 1)
+            return OTPVerification(OTP_INVALID, max_attempts - attempts - 1)
+
+        del self._entries[key]
+        return OTPVerification(OTP_OK)
+
+    async def cleanup(self, db, batch_size) -> int:
+        return self.purge_expired()
+
+    def purge_expired(self) -> int:
+        """
+        Drop expired OTPs
+
+        Returns:
+            Number of removed entries
+        """
+        now = datetime.utcnow()
+        expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def create_otp_store(backend: str = settings.OTP_STORE) -> OTPStore:
+    """
+    Build the OTP store selected by OTP_STORE
+
+    Args:
+        backend: "mongo" or "memory"
+
+    Returns:
+        OTPStore instance
+    """
+    if backend == "mongo":
+        return MongoOTPStore()
+    if backend == "memory":
+        return InMemoryOTPStore(settings.OTP_MEMORY_MAX_SIZE)
+    raise ValueError(f"Unknown OTP_STORE: {backend}")
+
+
+# Process-wide OTP store
+otp_store = create_otp_store()
@@ -1,9 +1,10 @@
 """
 Pricing service for calculating shipping fees
 """
-from typing import Dict, Any
+from typing import Dict, Any, List, Sequence
 from app.schemas.order import VehicleType
 import math
+import numpy as np
 
 
 # Base pricing configuration (VND)
@@ -130,6 +131,140 @@ def calculate_shipping_fee(
     }
 
 
+# Vehicle lookup tables for the batch path (same order as VEHICLE_ORDER)
+VEHICLE_ORDER: List[VehicleType] = list(PRICING_CONFIG.keys())
+_VEHICLE_INDEX = {vehicle: i for i, vehicle in enumerate(VEHICLE_ORDER)}
+_BASE_FEE = np.array([PRICING_CONFIG[v]["base_fee"] for v in VEHICLE_ORDER], dtype=np.float64)
+_PER_KM = np.array([PRICING_CONFIG[v]["per_km"] for v in VEHICLE_ORDER], dtype=np.float64)
+_MAX_WEIGHT = np.array([PRICING_CONFIG[v]["max_weight"] for v in VEHICLE_ORDER], dtype=np.float64)
+_WEIGHT_SURCHARGE = np.array([PRICING_CONFIG[v]["weight_surcharge"] for v in VEHICLE_ORDER], dtype=np.float64)
+
+# Distances whose 2-decimal rounding is this close to a tie are recomputed
+# with the scalar path, so vectorized trig can never flip a rounding result
+_ROUNDING_TIE_TOLERANCE = 1e-6
+
+
+def calculate_distances_batch(
+    lat1: np.ndarray,
+    lng1: np.ndarray,
+    lat2: np.ndarray,
+    lng2: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized `calculate_distance` (Haversine, rounded to 2 decimals)
+    
+    Args:
+        lat1, lng1: Arrays of first location coordinates
+        lat2, lng2: Arrays of second location coordinates
+        
+    Returns:
+        Array of distances in kilometers, identical to calculate_distance
+    """
+    R = 6371.0
+    
+    lat1_rad = np.radians(lat1)
+    lng1_rad = np.radians(lng1)
+    lat2_rad = np.radians(lat2)
+    lng2_rad = np.radians(lng2)
+    
+    dlat = lat2_rad - lat1_rad
+    dlng = lng2_rad - lng1_rad
+    
+    a = np.sin(dlat / 2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlng / 2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    distance = R * c
+    
+    # np.round and round() only disagree next to a .5 tie, where a 1-ulp
+    # difference in sin/cos/atan2 could also flip the result
+    scaled = distance * 100
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < _ROUNDING_TIE_TOLERANCE
+    rounded = np.round(distance, 2)
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = calculate_distance(
+            float(lat1[i]), float(lng1[i]), float(lat2[i]), float(lng2[i])
+        )
+    return rounded
+
+
+def calculate_shipping_fees_batch(
+    pickup_lat: Sequence[float],
+    pickup_lng: Sequence[float],
+    dropoff_lat: Sequence[float],
+    dropoff_lng: Sequence[float],
+    weight: Sequence[float],
+    vehicle_type: Sequence[VehicleType],
+    cod_amount: Sequence[float]
+) -> Dict[str, Any]:
+    """
+    Price N orders at once with NumPy array operations
+    
+    Every fee column is bit-identical to calling calculate_distance and
+    calculate_shipping_fee row by row. Rows over the vehicle's max weight
+    get an error message instead of raising.
+    
+    Args:
+        pickup_lat, pickup_lng: Pickup coordinates per row
+        dropoff_lat, dropoff_lng: Dropoff coordinates per row
+        weight: Package weight in kg per row
+        vehicle_type: Vehicle type per row
+        cod_amount: COD amount per row
+        
+    Returns:
+        Dict of columns (lists): distance_km, base_fee, distance_fee,
+        weight_surcharge, cod_fee, shipping_fee, total_amount, error
+    """
+    lat1 = np.asarray(pickup_lat, dtype=np.float64)
+    lng1 = np.asarray(pickup_lng, dtype=np.float64)
+    lat2 = np.asarray(dropoff_lat, dtype=np.float64)
+    lng2 = np.asarray(dropoff_lng, dtype=np.float64)
+    weights = np.asarray(weight, dtype=np.float64)
+    cod = np.asarray(cod_amount, dtype=np.float64)
+    # VehicleType is a str enum, so both members and raw values hit the dict
+    try:
+        vehicle_idx = np.array([_VEHICLE_INDEX[v] for v in vehicle_type], dtype=np.intp)
+    except KeyError as e:
+        raise ValueError(f"Loại xe không hợp lệ: {e.args[0]}")
+    
+    distance_km = calculate_distances_batch(lat1, lng1, lat2, lng2)
+    
+    base_fee = _BASE_FEE[vehicle_idx]
+    distance_fee = distance_km * _PER_KM[vehicle_idx]
+    
+    surcharge_rate = _WEIGHT_SURCHARGE[vehicle_idx]
+    weight_surcharge = np.where(
+        (weights > 50) & (surcharge_rate > 0),
+        (weights - 50) * surcharge_rate,
+        0.0
+    )
+    
+    cod_fee = np.where(cod > 0, np.minimum(cod * 0.01, 50000), 0.0)
+    
+    shipping_fee = base_fee + distance_fee + weight_surcharge + cod_fee
+    shipping_fee = np.ceil(shipping_fee / 1000) * 1000
+    total_amount = shipping_fee + cod
+    
+    max_weight = _MAX_WEIGHT[vehicle_idx]
+    overweight = weights > max_weight
+    errors: List[Any] = [None] * len(weights)
+    for i in np.flatnonzero(overweight):
+        vehicle = VEHICLE_ORDER[vehicle_idx[i]]
+        errors[i] = (
+            f"Khối lượng vượt quá giới hạn cho loại xe {vehicle.value}. "
+            f"Tối đa: {PRICING_CONFIG[vehicle]['max_weight']}kg"
+        )
+    
+    return {
+        "distance_km": distance_km.tolist(),
+        "base_fee": base_fee.astype(np.int64).tolist(),
+        "distance_fee": distance_fee.tolist(),
+        "weight_surcharge": weight_surcharge.tolist(),
+        "cod_fee": cod_fee.tolist(),
+        "shipping_fee": shipping_fee.astype(np.int64).tolist(),
+        "total_amount": total_amount.tolist(),
+        "error": errors
+    }
+
+
 def validate_vehicle_for_weight(weight: float, vehicle_type: VehicleType) -> bool:
     """
     Check if vehicle type can handle the given weight
@@ -0,0 +1,204 @@
+"""
+Scheduler - Periodic maintenance jobs with MongoDB leases
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.config import settings
+from app.db import models
+from app.core.logging import get_logger
+
+
+logger = get_logger("scheduler")
+
+# A job receives the database and returns the number of documents it processed
+JobFunc = Callable[[AsyncIOMotorDatabase], Awaitable[int]]
+
+
+@dataclass
+class JobStats:
+    """Per-job counters"""
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0  # Lease held by another worker
+    processed: int = 0
+    last_run_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_processed: Optional[int] = None
+    last_error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    """
+    A periodic job
+
+    Args:
+        name: Unique job name (also the lease ID)
+        func: Coroutine function doing one run
+        interval_seconds: Time between runs
+        jitter: Random spread applied to each interval, as a fraction of it
+    """
+    name: str
+    func: JobFunc
+    interval_seconds: float
+    jitter: float = 0.1
+    stats: JobStats = field(default_factory=JobStats)
+
+    def next_delay(self) -> float:
+        spread = self.interval_seconds * self.jitter
+        return max(0.0, self.interval_seconds + random.uniform(-spread, spread))
+
+
+class Scheduler:
+    """
+    Runs registered jobs periodically on the event loop
+
+    Before each run a worker takes the job's lease in the `job_leases`
+    collection for one interval, so with several uvicorn workers (or
+    replicas) each job runs once per interval. The lease is renewed by
+    its holder and taken over by another worker once it expires.
+    """
+
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: JobFunc, interval_seconds: float, jitter: float = 0.1) -> Job:
+        """
+        Register a job
+
+        Raises:
+            ValueError: If a job with the same name exists
+        """
+        if name in self.jobs:
+            raise ValueError(f"Job already registered: {name}")
+        job = Job(name, func, interval_seconds, jitter)
+        self.jobs[name] = job
+        return job
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        """Start one loop per job (idempotent)"""
+        if self.running:
+            return
+        self._db = db
+        self._tasks = [
+            asyncio.create_task(self._loop(job), name=f"job-{job.name}")
+            for job in self.jobs.values()
+        ]
+        logger.info("Scheduler started", extra={"fields": {"jobs": list(self.jobs), "owner": self.owner}})
+
+    async def stop(self) -> None:
+        """Cancel job loops and release held leases"""
+        if not self.running:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for name in self.jobs:
+            try:
+                await models.release_job_lease(self._db, name, self.owner)
+            except Exception as e:
+                logger.warning("Could not release job lease", extra={"fields": {"job": name, "error": str(e)}})
+
+    async def run_job(self, job: Job) -> bool:
+        """
+        Run a job once if this worker can take its lease
+
+        Returns:
+            True if the job ran successfully
+        """
+        try:
+            if not await models.acquire_job_lease(self._db, job.name, self.owner, job.interval_seconds):
+                job.stats.skipped += 1
+                return False
+
+            started = time.perf_counter()
+            job.stats.last_run_at = datetime.utcnow()
+            processed = await job.func(self._db)
+        except Exception as e:
+            job.stats.failures += 1
+            job.stats.last_error = str(e)
+            logger.error("Job failed", exc_info=True, extra={"fields": {"job": job.name}})
+            return False
+
+        job.stats.runs += 1
+        job.stats.processed += processed
+        job.stats.last_processed = processed
+        job.stats.last_duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        job.stats.last_error = None
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-job metrics"""
+        return {
+            "running": self.running,
+            "jobs": {name: asdict(job.stats) for name, job in self.jobs.items()}
+        }
+
+    async def _loop(self, job: Job) -> None:
+        # Stagger the first run so workers started together do not collide
+        await asyncio.sleep(random.uniform(0, job.interval_seconds * job.jitter))
+        while True:
+            await self.run_job(job)
+            await asyncio.sleep(job.next_delay())
+
+
+# ==================== MAINTENANCE JOBS ====================
+
+async def run_in_batches(db: AsyncIOMotorDatabase, batch: JobFunc) -> int:
+    """
+    Repeat a batch function until it finds nothing or SCHEDULER_MAX_BATCHES is reached
+
+    Args:
+        db: Database instance
+        batch: Coroutine function processing one batch
+
+    Returns:
+        Total number of processed documents
+    """
+    total = 0
+    for _ in range(settings.SCHEDULER_MAX_BATCHES):
+        processed = await batch(db)
+        total += processed
+        if processed < settings.SCHEDULER_BATCH_SIZE:
+            break
+        # Give request handlers a turn between batches
+        await asyncio.sleep(0)
+    return total
+
+
+async def expire_otps_job(db: AsyncIOMotorDatabase) -> int:
+    """Remove expired OTPs from the configured OTP store"""
+    from app.services.otp_store import otp_store
+
+    return await run_in_batches(
+        db, lambda db: otp_store.cleanup(db, settings.SCHEDULER_BATCH_SIZE)
+    )
+
+
+async def expire_topups_job(db: AsyncIOMotorDatabase) -> int:
+    """Mark pending top-ups past their payment window as expired"""
+    return await run_in_batches(
+        db, lambda db: models.expire_stale_topups(db, settings.SCHEDULER_BATCH_SIZE)
+    )
+
+
+# Process-wide scheduler (started from the app lifespan)
+scheduler = Scheduler()
+scheduler.add_job("expire_otps", expire_otps_job, settings.OTP_CLEANUP_INTERVAL_SECONDS)
+scheduler.add_job("expire_topups", expire_topups_job, settings.TOPUP_EXPIRY_INTERVAL_SECONDS)
@@ -0,0 +1,105 @@
+"""
+Sequence service - Atomic counters for human-readable codes (tracking codes, ...)
+"""
+import asyncio
+from typing import Dict, Tuple
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+async def reserve_sequence_block(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    size: int = 1
+) -> Tuple[int, int]:
+    """
+    Atomically reserve a range of values from a named counter
+
+    Uses one `find_one_and_update` with `$inc` + upsert on the `counters`
+    collection, so concurrent callers (even across uvicorn workers) never
+    receive overlapping ranges.
+
+    Args:
+        db: Database instance
+        name: Counter name (e.g. "tracking_code:20240115")
+        size: Number of values to reserve
+
+    Returns:
+        Tuple (first, last) of the reserved range, inclusive
+    """
+    counter = await db.counters.find_one_and_update(
+        {"_id": name},
+        {"$inc": {"seq": size}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    last = counter["seq"]
+    return last - size + 1, last
+
+
+async def seed_sequence(db: AsyncIOMotorDatabase, name: str, value: int) -> None:
+    """
+    Raise a named counter to at least `value` (never lowers it)
+
+    `$max` makes seeding idempotent and safe next to concurrent `$inc`s:
+    values already handed out stay behind the counter.
+
+    Args:
+        db: Database instance
+        name: Counter name
+        value: Highest value already in use
+    """
+    await db.counters.update_one({"_id": name}, {"$max": {"seq": value}}, upsert=True)
+
+
+async def next_sequence(db: AsyncIOMotorDatabase, name: str) -> int:
+    """
+    Get the next value of a named counter (one round trip)
+
+    Args:
+        db: Database instance
+        name: Counter name
+
+    Returns:
+        Next sequence value (starts at 1)
+    """
+    first, _ = await reserve_sequence_block(db, name, 1)
+    return first
+
+
+class SequenceBlockAllocator:
+    """
+    In-process block allocator on top of `reserve_sequence_block`
+
+    Reserves `block_size` values per round trip and hands them out locally.
+    Values stay unique across workers because every block is reserved
+    atomically; they are only monotonic within a single worker.
+
+    Args:
+        block_size: Number of values reserved per round trip
+    """
+
+    def __init__(self, block_size: int = 10):
+        self.block_size = max(1, block_size)
+        self._blocks: Dict[str, Tuple[int, int]] = {}
+        self._lock = asyncio.Lock()
+
+    async def next(self, db: AsyncIOMotorDatabase, name: str) -> int:
+        """
+        Get the next value for a counter, refilling the local block if needed
+
+        Args:
+            db: Database instance
+            name: Counter name
+
+        Returns:
+            Next sequence value
+        """
+        async with self._lock:
+            current, last = self._blocks.get(name, (1, 0))
+            if current > last:
+                current, last = await reserve_sequence_block(db, name, self.block_size)
+                # Drop exhausted blocks of other counters (e.g. yesterday's)
+                self._blocks.clear()
+            self._blocks[name] = (current + 1, last)
+            return current
@@ -0,0 +1,304 @@
+"""
+SMS Service - Pluggable providers behind an asyncio outbound queue
+"""
+import asyncio
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.request_context import get_request_id, request_id_context
+
+
+logger = get_logger("sms")
+
+
+# ==================== PROVIDERS ====================
+
+class SMSProvider(ABC):
+    """Interface of an SMS provider"""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def send(self, phone: str, body: str) -> str:
+        """
+        Send one SMS
+
+        Args:
+            phone: Recipient phone number
+            body: Message text
+
+        Returns:
+            Provider message ID
+
+        Raises:
+            Exception: If the provider rejected or failed the message
+        """
+
+
+class TwilioSMSProvider(SMSProvider):
+    """Twilio REST provider (the blocking client runs in a worker thread)"""
+
+    name = "twilio"
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+        from twilio.rest import Client as TwilioClient
+
+        self.client = TwilioClient(account_sid, auth_token)
+        self.from_number = from_number
+
+    async def send(self, phone: str, body: str) -> str:
+        message = await asyncio.to_thread(
+            self.client.messages.create,
+            body=body,
+            from_=self.from_number,
+            to=phone
+        )
+        return message.sid
+
+
+class FakeSMSProvider(SMSProvider):
+    """
+    Local provider that records messages instead of sending them
+
+    Used in development when Twilio is not configured, and in tests.
+
+    Args:
+        fail_times: Number of initial send attempts that raise (to exercise retries)
+    """
+
+    name = "fake"
+
+    def __init__(self, fail_times: int = 0):
+        self.sent: List[Tuple[str, str]] = []
+        self.fail_times = fail_times
+        self.attempts = 0
+
+    async def send(self, phone: str, body: str) -> str:
+        self.attempts += 1
+        if self.attempts <= self.fail_times:
+            raise RuntimeError("Fake provider failure")
+        self.sent.append((phone, body))
+        logger.info("SMS sent (fake provider)", extra={"fields": {"phone": phone, "body": body}, "sampled": True})
+        return f"fake-{len(self.sent)}"
+
+
+def create_sms_provider() -> SMSProvider:
+    """
+    Build the provider selected by SMS_PROVIDER
+
+    Defaults to Twilio when its credentials are configured, otherwise
+    to the fake provider.
+    """
+    provider = settings.SMS_PROVIDER
+    twilio_configured = bool(settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN)
+    if provider is None:
+        provider = "twilio" if twilio_configured else "fake"
+
+    if provider == "twilio":
+        if not twilio_configured:
+            raise ValueError("SMS_PROVIDER=twilio requires TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN")
+        return TwilioSMSProvider(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            settings.TWILIO_PHONE_NUMBER
+        )
+    if provider == "fake":
+        return FakeSMSProvider()
+    raise ValueError(f"Unknown SMS_PROVIDER: {provider}")
+
+
+# ==================== RATE LIMITING ====================
+
+class TokenBucket:
+    """
+    Async token bucket limiting sends per second
+
+    Args:
+        rate: Tokens added per second (<= 0 disables limiting)
+        burst: Maximum stored tokens
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until one token is available and take it"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# ==================== QUEUE ====================
+
+class SMSQueueFull(Exception):
+    """Raised when the outbound queue cannot accept more messages"""
+
+
+@dataclass
+class SMSMessage:
+    """Outbound SMS"""
+    phone: str
+    body: str
+    attempts: int = 0
+    request_id: Optional[str] = None  # Request that queued it (log correlation)
+
+
+class SMSQueue:
+    """
+    Bounded outbound SMS queue drained by a pool of asyncio workers
+
+    Failed sends are retried with exponential backoff and jitter; every
+    send goes through the provider's token bucket.
+
+    Args:
+        provider: SMS provider (created from settings when omitted)
+        workers: Number of worker tasks
+        max_size: Maximum queued messages
+        max_retries: Retries after the first failed attempt
+        backoff_seconds: Base retry delay (doubled per attempt)
+        rate_per_second: Provider rate limit
+    """
+
+    def __init__(
+        self,
+        provider: Optional[SMSProvider] = None,
+        workers: int = settings.SMS_WORKERS,
+        max_size: int = settings.SMS_QUEUE_SIZE,
+        max_retries: int = settings.SMS_MAX_RETRIES,
+        backoff_seconds: float = settings.SMS_RETRY_BACKOFF_SECONDS,
+        rate_per_second: float = settings.SMS_RATE_PER_SECOND
+    ):
+        self._provider = provider
+        self.workers = workers
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.rate_per_second = rate_per_second
+        self._queue: Optional[asyncio.Queue] = None
+        self._limiter: Optional[TokenBucket] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retry_tasks: set = set()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+
+    @property
+    def provider(self) -> SMSProvider:
+        if self._provider is None:
+            self._provider = create_sms_provider()
+        return self._provider
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Start the worker pool (idempotent)"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._limiter = TokenBucket(self.rate_per_second)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"sms-worker-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(
+            "SMS queue started",
+            extra={"fields": {"workers": self.workers, "provider": self.provider.name}}
+        )
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Drain queued messages (up to `timeout` seconds) and stop the workers"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("SMS queue stopped with undelivered messages", extra={"fields": {"queued": self._queue.qsize()}})
+        for task in [*self._tasks, *self._retry_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retry_tasks, return_exceptions=True)
+        self._tasks = []
+        self._retry_tasks.clear()
+
+    async def enqueue(self, phone: str, body: str) -> None:
+        """
+        Queue an SMS without waiting for delivery
+
+        Raises:
+            SMSQueueFull: If the queue is at capacity
+        """
+        if not self.running:
+            await self.start()
+        try:
+            self._queue.put_nowait(SMSMessage(phone=phone, body=body, request_id=get_request_id()))
+        except asyncio.QueueFull:
+            raise SMSQueueFull("SMS queue is full")
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        return {
+            "provider": self._provider.name if self._provider else None,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                with request_id_context(message.request_id):
+                    await self._deliver(message)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, message: SMSMessage) -> None:
+        await self._limiter.acquire()
+        message.attempts += 1
+        try:
+            await self.provider.send(message.phone, message.body)
+            self.sent += 1
+        except Exception as e:
+            if message.attempts > self.max_retries:
+                self.failed += 1
+                logger.error(
+                    "SMS delivery failed",
+                    extra={"fields": {"phone": message.phone, "attempts": message.attempts, "error": str(e)}}
+                )
+                return
+            self.retried += 1
+            delay = self.backoff_seconds * (2 ** (message.attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+            task = asyncio.create_task(self._retry_later(message, delay))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+
+    async def _retry_later(self, message: SMSMessage, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.failed += 1
+            logger.error("SMS dropped: queue full on retry", extra={"fields": {"phone": message.phone}})
+
+
+# Process-wide outbound queue (started from the app lifespan)
+sms_queue = SMSQueue()
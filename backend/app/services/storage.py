@@ -0,0 +1,353 @@
+"""
+Storage - Pluggable object storage for uploads (local filesystem or S3-compatible)
+"""
+import asyncio
+import base64
+import shutil
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+import aiofiles.os
+from jose import jwt, JWTError
+from app.core.config import settings
+
+
+# Local directory served at /uploads by the filesystem backend
+UPLOAD_DIR = Path("uploads")
+
+# Scratch space for uploads in progress (same filesystem as UPLOAD_DIR, so
+# the filesystem backend can move finished files into place atomically)
+LOCAL_TEMP_DIR = UPLOAD_DIR / ".tmp"
+
+# Stored blobs never change (content-addressed), so clients may cache forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class StorageBackend(ABC):
+    """Interface of an upload storage backend (keys are relative paths like blobs/ab/cd/x.jpg)"""
+
+    name: str = "base"
+
+    @abstractmethod
+    async def put_file(self, key: str, local_path: Path, content_type: Optional[str] = None) -> None:
+        """
+        Move a finished local file into storage (the local file is consumed)
+
+        Args:
+            key: Object key
+            local_path: Local file to store
+            content_type: MIME type (optional)
+        """
+
+    @abstractmethod
+    async def get_file(self, key: str, local_path: Path) -> None:
+        """Copy an object to a local file"""
+
+    @abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """
+        Size of an object
+
+        Returns:
+            Size in bytes, or None if the object does not exist
+        """
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Delete an object (missing objects are ignored)"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """Public URL of an object"""
+
+    @abstractmethod
+    async def presign_upload(
+        self,
+        key: str,
+        content_type: str,
+        size: int,
+        sha256: str
+    ) -> Dict[str, Any]:
+        """
+        Authorize one direct upload of an object, bypassing the API
+
+        The upload is bound to the exact size and SHA-256 digest, so the
+        stored object is guaranteed to match its content-addressed key.
+
+        Args:
+            key: Object key
+            content_type: MIME type
+            size: Exact size in bytes
+            sha256: SHA-256 hex digest
+
+        Returns:
+            Dict with method, url, headers (to send with the request) and expires_at
+        """
+
+    async def exists(self, key: str) -> bool:
+        return await self.size(key) is not None
+
+    async def sha256(self, key: str) -> Optional[str]:
+        """
+        SHA-256 the backend recorded for an object
+
+        Returns:
+            Hex digest, or None if the backend keeps none for the object
+        """
+        return None
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Local path of an object if the backend stores files locally"""
+        return None
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        """
+        Object key of a URL returned by `url`
+
+        Returns:
+            Key, or None if the URL does not belong to this backend
+        """
+        prefix = self.url("")
+        if url.startswith(prefix):
+            return url[len(prefix):]
+        return None
+
+
+class FilesystemStorage(StorageBackend):
+    """
+    Stores objects under a local directory served by StaticFiles
+
+    Direct uploads go to PUT /api/v1/uploads/direct/{token}, where the
+    token is a short-lived JWT bound to the key, size and digest. They
+    still pass through the API process; deployments that need image bytes
+    to bypass the API should use S3Storage.
+
+    Args:
+        root: Local directory
+        base_url: URL prefix the directory is served at
+    """
+
+    name = "filesystem"
+
+    def __init__(self, root: Path = UPLOAD_DIR, base_url: str = "/uploads"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    async def put_file(self, key, local_path, content_type=None) -> None:
+        destination = self.local_path(key)
+        await aiofiles.os.makedirs(destination.parent, exist_ok=True)
+        await aiofiles.os.replace(local_path, destination)
+
+    async def get_file(self, key, local_path) -> None:
+        await asyncio.to_thread(shutil.copyfile, self.local_path(key), local_path)
+
+    async def size(self, key) -> Optional[int]:
+        try:
+            return (await aiofiles.os.stat(self.local_path(key))).st_size
+        except FileNotFoundError:
+            return None
+
+    async def delete(self, key) -> None:
+        try:
+            await aiofiles.os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key) -> str:
+        return f"{self.base_url}/{key}"
+
+    async def presign_upload(self, key, content_type, size, sha256) -> Dict[str, Any]:
+        expires_at = datetime.utcnow() + timedelta(seconds=settings.PRESIGNED_UPLOAD_EXPIRE_SECONDS)
+        token = jwt.encode(
+            {
+                "purpose": "upload",
+                "key": key,
+                "size": size,
+                "sha256": sha256,
+                "content_type": content_type,
+                "exp": expires_at
+            },
+            settings.get_jwt_secret(),
+            algorithm=settings.JWT_ALGORITHM
+        )
+        return {
+            "method": "PUT",
+            "url": f"/api/v1/uploads/direct/{token}",
+            "headers": {"Content-Type": content_type},
+            "expires_at": expires_at
+        }
+
+    @staticmethod
+    def decode_upload_token(token: str) -> Dict[str, Any]:
+        """
+        Decode a direct upload token created by `presign_upload`
+
+        Raises:
+            ValueError: If the token is invalid, expired or not an upload token
+        """
+        try:
+            claims = jwt.decode(token, settings.get_jwt_secret(), algorithms=[settings.JWT_ALGORITHM])
+        except JWTError:
+            raise ValueError("Upload token không hợp lệ hoặc đã hết hạn")
+        if claims.get("purpose") != "upload":
+            raise ValueError("Upload token không hợp lệ hoặc đã hết hạn")
+        return claims
+
+
+class S3Storage(StorageBackend):
+    """
+    Stores objects in an S3-compatible bucket (AWS S3, MinIO, moto, ...)
+
+    Clients upload straight to the bucket with presigned PUT URLs signed
+    for the exact Content-Length and x-amz-checksum-sha256, so the bucket
+    rejects any body that does not match the content-addressed key. The
+    checksum is also stored with the object, so confirming an upload can
+    check it again on stand-ins that do not enforce it (moto).
+    Requires boto3 (optional dependency); the credentials also need
+    s3:GetObjectAttributes.
+
+    Args:
+        bucket: Bucket name
+        endpoint_url: Custom endpoint (MinIO/moto); None for AWS
+        region: Bucket region
+        access_key_id: Access key (None uses the default credential chain)
+        secret_access_key: Secret key
+        public_url: Base URL objects are served from (CDN or public bucket URL)
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region: str = "us-east-1",
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        public_url: Optional[str] = None
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path" if endpoint_url else "auto"})
+        )
+        if public_url:
+            self.public_url = public_url.rstrip("/")
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.{region}.amazonaws.com"
+
+    async def put_file(self, key, local_path, content_type=None) -> None:
+        extra = {"CacheControl": IMMUTABLE_CACHE_CONTROL}
+        if content_type:
+            extra["ContentType"] = content_type
+        await asyncio.to_thread(self.client.upload_file, str(local_path), self.bucket, key, ExtraArgs=extra)
+        await aiofiles.os.remove(local_path)
+
+    async def get_file(self, key, local_path) -> None:
+        await asyncio.to_thread(self.client.download_file, self.bucket, key, str(local_path))
+
+    async def size(self, key) -> Optional[int]:
+        from botocore.exceptions import ClientError
+
+        try:
+            head = await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return head["ContentLength"]
+
+    async def sha256(self, key) -> Optional[str]:
+        from botocore.exceptions import ClientError
+
+        try:
+            attributes = await asyncio.to_thread(
+                self.client.get_object_attributes,
+                Bucket=self.bucket,
+                Key=key,
+                ObjectAttributes=["Checksum"]
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        checksum = attributes.get("Checksum", {}).get("ChecksumSHA256")
+        return base64.b64decode(checksum).hex() if checksum else None
+
+    async def delete(self, key) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=key)
+
+    def url(self, key) -> str:
+        return f"{self.public_url}/{key}"
+
+    async def presign_upload(self, key, content_type, size, sha256) -> Dict[str, Any]:
+        expires_in = settings.PRESIGNED_UPLOAD_EXPIRE_SECONDS
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+        url = await asyncio.to_thread(
+            self.client.generate_presigned_url,
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "ChecksumSHA256": checksum,
+                "ChecksumAlgorithm": "SHA256",
+                "CacheControl": IMMUTABLE_CACHE_CONTROL
+            },
+            ExpiresIn=expires_in
+        )
+        return {
+            "method": "PUT",
+            "url": url,
+            "headers": {
+                "Content-Type": content_type,
+                "x-amz-checksum-sha256": checksum,
+                "x-amz-sdk-checksum-algorithm": "SHA256",
+                "Cache-Control": IMMUTABLE_CACHE_CONTROL
+            },
+            "expires_at": datetime.utcnow() + timedelta(seconds=expires_in)
+        }
+
+
+def create_storage() -> StorageBackend:
+    """
+    Build the backend selected by STORAGE_BACKEND
+
+    Returns:
+        StorageBackend instance
+    """
+    if settings.STORAGE_BACKEND == "filesystem":
+        return FilesystemStorage()
+    if settings.STORAGE_BACKEND == "s3":
+        if not settings.S3_BUCKET:
+            raise ValueError("STORAGE_BACKEND=s3 requires S3_BUCKET")
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_url=settings.S3_PUBLIC_URL
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+
+# Process-wide storage backend
+storage = create_storage()
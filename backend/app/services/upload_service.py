@@ -1,32 +1,78 @@
 """
 File upload service for handling images and documents
+
+Images are stored content-addressed: the object key is the SHA-256 of the
+bytes, under a two-level fan-out (blobs/ab/cd/abcd....jpg), in the
+configured storage backend, and the `blobs` collection counts the order
+references to each object.
 """
+import asyncio
+import hashlib
 import os
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import aiofiles
+import aiofiles.os
 from fastapi import UploadFile, HTTPException, status
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from pathlib import Path
+from app.db import models
+from app.services.image_service import variant_keys
+from app.services.storage import storage, FilesystemStorage, UPLOAD_DIR, LOCAL_TEMP_DIR
+from app.core.logging import get_logger
+
 
+logger = get_logger("uploads")
 
 # Configuration
-UPLOAD_DIR = Path("uploads")
+BLOBS_SUBDIR = "blobs"
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 MAX_FILES_PER_ORDER = 5
+UPLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read from the upload per iteration
+
+
+def ensure_upload_directory() -> Path:
+    """Create the local scratch directory for uploads if it doesn't exist"""
+    LOCAL_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    return LOCAL_TEMP_DIR
+
+
+def blob_relative_path(blob_key: str) -> str:
+    """
+    Sharded storage key of a blob
+    
+    Args:
+        blob_key: SHA-256 hex digest followed by the file extension
+        
+    Returns:
+        Path like "blobs/ab/cd/abcd....jpg"
+    """
+    return f"{BLOBS_SUBDIR}/{blob_key[:2]}/{blob_key[2:4]}/{blob_key}"
 
 
-def ensure_upload_directory():
-    """Create upload directory if it doesn't exist"""
-    orders_dir = UPLOAD_DIR / "orders"
-    orders_dir.mkdir(parents=True, exist_ok=True)
-    return orders_dir
+def blob_key_from_path(path: str) -> Optional[str]:
+    """
+    Extract the blob key from an image URL
+    
+    Returns:
+        Blob key, or None for images stored before content addressing
+    """
+    key = storage.key_from_url(path)
+    parts = key.split("/") if key else []
+    if len(parts) == 4 and parts[0] == BLOBS_SUBDIR:
+        return parts[3]
+    return None
 
 
 def validate_image_file(file: UploadFile) -> None:
     """
     Validate uploaded image file
     
+    Only the extension is checked here; the size limit is enforced while
+    the file is streamed to disk.
+    
     Args:
         file: Uploaded file
         
@@ -40,26 +86,118 @@ def validate_image_file(file: UploadFile) -> None:
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Định dạng file không được hỗ trợ. Chỉ chấp nhận: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
         )
+
+
+async def stream_to_file(
+    chunks: AsyncIterator[bytes],
+    file_path: Path,
+    max_size: int = MAX_FILE_SIZE
+) -> Tuple[int, str]:
+    """
+    Write a stream of chunks to disk, hashing it on the way
     
-    # Check file size (requires reading file, reset position after)
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
+    Args:
+        chunks: Async iterator of byte chunks
+        file_path: Destination (removed again if the stream fails)
+        max_size: Maximum accepted size in bytes
+        
+    Returns:
+        Tuple (number of bytes written, SHA-256 hex digest)
+        
+    Raises:
+        HTTPException: If the stream exceeds max_size
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(file_path, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"File quá lớn. Kích thước tối đa: {MAX_FILE_SIZE / 1024 / 1024}MB"
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(file_path)
+        except OSError:
+            pass
+        raise
+    return size, digest.hexdigest()
+
+
+async def _read_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def stream_upload_to_file(file: UploadFile, file_path: Path) -> Tuple[int, str]:
+    """
+    Stream an upload to disk in fixed-size chunks, hashing it on the way
     
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File quá lớn. Kích thước tối đa: {MAX_FILE_SIZE / 1024 / 1024}MB"
-        )
+    Args:
+        file: Uploaded file
+        file_path: Destination (removed again if the upload fails)
+        
+    Returns:
+        Tuple (number of bytes written, SHA-256 hex digest)
+        
+    Raises:
+        HTTPException: If the file exceeds MAX_FILE_SIZE
+    """
+    return await stream_to_file(_read_chunks(file), file_path)
 
 
-async def save_order_images(files: List[UploadFile], order_id: str) -> List[str]:
+async def store_blob(db: AsyncIOMotorDatabase, file: UploadFile) -> str:
+    """
+    Store an upload as a content-addressed blob and take a reference on it
+    
+    The upload is streamed to a local temporary file while hashing. If the
+    blob already exists the temporary file is dropped; otherwise it is
+    moved into the storage backend. The reference is taken before the
+    move: a release that has not yet claimed the deletion then sees the
+    new reference and keeps the file, and one that has claimed it makes
+    add_blob_reference wait until the old file is gone, after which the
+    blob counts as new (refcount 1) and this file is stored again.
+    
+    Args:
+        db: Database instance
+        file: Uploaded file
+        
+    Returns:
+        URL of the blob
+    """
+    temp_path = ensure_upload_directory() / f"upload-{uuid.uuid4().hex}.part"
+    size, sha256 = await stream_upload_to_file(file, temp_path)
+    
+    blob_key = f"{sha256}{Path(file.filename).suffix.lower()}"
+    key = blob_relative_path(blob_key)
+    try:
+        refcount = await models.add_blob_reference(db, blob_key, sha256, size)
+        if refcount > 1 and await storage.exists(key):
+            await aiofiles.os.remove(temp_path)
+        else:
+            await storage.put_file(key, temp_path, file.content_type)
+    except BaseException:
+        try:
+            await aiofiles.os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+        
+    return storage.url(key)
+
+
+async def save_order_images(db: AsyncIOMotorDatabase, files: List[UploadFile]) -> List[str]:
     """
     Save uploaded images for an order
     
     Args:
+        db: Database instance
         files: List of uploaded files
-        order_id: Order ID to associate images with
         
     Returns:
         List of saved file paths/URLs
@@ -72,61 +210,217 @@ async def save_order_images(files: List[UploadFile], order_id: str) -> List[str]
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Tối đa {MAX_FILES_PER_ORDER} ảnh cho mỗi đơn hàng"
         )
-    
-    # Ensure upload directory exists
-    upload_dir = ensure_upload_directory()
-    saved_paths = []
-    
+        
+    # Validate every file before writing any
     for file in files:
-        # Validate file
         validate_image_file(file)
         
-        # Generate unique filename
-        file_ext = Path(file.filename).suffix.lower()
-        unique_filename = f"{order_id}_{uuid.uuid4().hex[:8]}{file_ext}"
-        file_path = upload_dir / unique_filename
-        
-        # Save file
-        try:
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
-            
-            # Store relative path (in production, this would be a CDN URL)
-            relative_path = f"/uploads/orders/{unique_filename}"
-            saved_paths.append(relative_path)
-            
-        except Exception as e:
-            # Clean up any successfully saved files
-            for saved_path in saved_paths:
-                try:
-                    os.remove(UPLOAD_DIR / saved_path.lstrip("/"))
-                except:
-                    pass
-            
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Lỗi khi lưu file: {str(e)}"
-            )
+    # Save files concurrently
+    results = await asyncio.gather(
+        *[store_blob(db, file) for file in files],
+        return_exceptions=True
+    )
     
-    return saved_paths
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        # Release the blobs that were saved
+        await delete_order_images(db, [r for r in results if not isinstance(r, BaseException)])
+        
+        if isinstance(errors[0], HTTPException):
+            raise errors[0]
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Lỗi khi lưu file: {str(errors[0])}"
+        )
+        
+    # Relative paths (in production, these would be CDN URLs)
+    return results
 
 
-async def delete_order_images(image_paths: List[str]) -> None:
+async def delete_order_images(db: AsyncIOMotorDatabase, image_paths: List[str]) -> None:
     """
-    Delete order images from storage
+    Drop an order's references to its images
+    
+    A blob (and its generated variants) is only removed from storage once
+    no order references it any more. Images stored before content
+    addressing are removed directly.
     
     Args:
+        db: Database instance
         image_paths: List of image paths to delete
     """
     for path in image_paths:
         try:
-            file_path = UPLOAD_DIR / path.lstrip("/")
-            if file_path.exists():
-                os.remove(file_path)
-        except Exception as e:
+            key = storage.key_from_url(path)
+            if key is None:
+                continue
+                
+            blob_key = blob_key_from_path(path)
+            if blob_key is None:
+                await storage.delete(key)
+                continue
+                
+            if await models.release_blob_reference(db, blob_key):
+                try:
+                    for object_key in [key, *variant_keys(key)]:
+                        await storage.delete(object_key)
+                finally:
+                    # Lets uploads of the same content waiting on the deletion go ahead
+                    await models.remove_blob(db, blob_key)
+        except Exception:
             # Log error but don't raise exception
-            print(f"Error deleting file {path}: {e}")
+            logger.warning("Error deleting file", exc_info=True, extra={"fields": {"path": path}})
+
+
+# ==================== DIRECT (PRESIGNED) UPLOADS ====================
+
+def _validate_direct_upload(filename: str, size: int) -> None:
+    file_ext = Path(filename).suffix.lower()
+    if file_ext not in ALLOWED_IMAGE_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Định dạng file không được hỗ trợ. Chỉ chấp nhận: {', '.join(ALLOWED_IMAGE_EXTENSIONS)}"
+        )
+    if size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File quá lớn. Kích thước tối đa: {MAX_FILE_SIZE / 1024 / 1024}MB"
+        )
+
+
+async def presign_image_upload(
+    db: AsyncIOMotorDatabase,
+    filename: str,
+    content_type: str,
+    size: int,
+    sha256: str
+) -> Dict[str, Any]:
+    """
+    Prepare a direct-to-storage upload of an image
+    
+    If the blob is already stored no upload is needed and the client can
+    confirm right away.
+    
+    Args:
+        db: Database instance
+        filename: Original file name (for the extension)
+        content_type: MIME type
+        size: Exact size in bytes
+        sha256: SHA-256 hex digest computed by the client
+        
+    Returns:
+        Dict with upload_required, key and (if required) method, url, headers, expires_at
+        
+    Raises:
+        HTTPException: If the file is not an allowed image or too large
+    """
+    _validate_direct_upload(filename, size)
+    
+    blob_key = f"{sha256}{Path(filename).suffix.lower()}"
+    key = blob_relative_path(blob_key)
+    blob = await models.find_blob(db, blob_key)
+    if blob and "deleting_at" not in blob and await storage.exists(key):
+        return {"upload_required": False, "key": key}
+        
+    upload = await storage.presign_upload(key, content_type, size, sha256)
+    return {"upload_required": True, "key": key, **upload}
+
+
+async def confirm_image_upload(
+    db: AsyncIOMotorDatabase,
+    filename: str,
+    sha256: str
+) -> str:
+    """
+    Take a reference on a directly uploaded image
+    
+    Args:
+        db: Database instance
+        filename: Original file name (for the extension)
+        sha256: SHA-256 hex digest sent to presign_image_upload
+        
+    Returns:
+        URL of the blob
+        
+    Raises:
+        HTTPException: If the object was not uploaded, is too large or its
+            recorded SHA-256 does not match
+    """
+    blob_key = f"{sha256}{Path(filename).suffix.lower()}"
+    key = blob_relative_path(blob_key)
+    size = await storage.size(key)
+    if size is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ảnh chưa được tải lên"
+        )
+    _validate_direct_upload(filename, size)
+    
+    stored_sha256 = await storage.sha256(key)
+    if stored_sha256 is not None and stored_sha256 != sha256:
+        # Not the content its key names; drop it unless a blob already uses the key
+        if not await models.find_blob(db, blob_key):
+            await storage.delete(key)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nội dung ảnh không khớp với SHA-256"
+        )
+    
+    await models.add_blob_reference(db, blob_key, sha256, size)
+    if not await storage.exists(key):
+        # Removed by a deletion that was in progress: upload it again
+        await delete_order_images(db, [storage.url(key)])
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ảnh chưa được tải lên"
+        )
+    return storage.url(key)
+
+
+async def receive_direct_upload(token: str, chunks: AsyncIterator[bytes]) -> str:
+    """
+    Receive a direct upload for the filesystem backend
+    
+    The body must match the size and SHA-256 digest the token was issued
+    for, which keeps the content-addressed key honest.
+    
+    Args:
+        token: Upload token from FilesystemStorage.presign_upload
+        chunks: Request body chunks
+        
+    Returns:
+        Storage key of the uploaded object
+        
+    Raises:
+        HTTPException: If the token is invalid or the body does not match it
+    """
+    if not isinstance(storage, FilesystemStorage):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload trực tiếp không khả dụng với storage hiện tại"
+        )
+    try:
+        claims = storage.decode_upload_token(token)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+        
+    temp_path = ensure_upload_directory() / f"upload-{uuid.uuid4().hex}.part"
+    size, sha256 = await stream_to_file(chunks, temp_path, max_size=claims["size"])
+    try:
+        if size != claims["size"] or sha256 != claims["sha256"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Nội dung file không khớp với upload token"
+            )
+        await storage.put_file(claims["key"], temp_path, claims.get("content_type"))
+    finally:
+        # put_file moves the file on success; otherwise it is still here
+        try:
+            await aiofiles.os.remove(temp_path)
+        except OSError:
+            pass
+        
+    return claims["key"]
 
 
 def get_full_image_url(path: str, base_url: str = "http://localhost:8000") -> str:
@@ -143,3 +437,24 @@ def get_full_image_url(path: str, base_url: str = "http://localhost:8000") -> st
     if path.startswith("http"):
         return path
     return f"{base_url}{path}"
+
+
+async def _print_blob_stats() -> None:
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.core.config import settings
+    
+    client = AsyncIOMotorClient(settings.get_mongodb_url())
+    try:
+        stats = await models.get_blob_stats(client[settings.get_db_name()])
+        print(f"blobs:          {stats['blobs']}")
+        print(f"references:     {stats['references']}")
+        print(f"stored bytes:   {stats['stored_bytes']}")
+        print(f"logical bytes:  {stats['logical_bytes']}")
+        print(f"dedup ratio:    {stats['dedup_ratio']}x")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    # Report upload deduplication: python -m app.services.upload_service
+    asyncio.run(_print_blob_stats())
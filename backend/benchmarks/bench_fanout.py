@@ -0,0 +1,118 @@
+"""
+Benchmark: live order stream fan-out with many idle subscribers
+
+Opens N idle subscribers (one asyncio task per stream, as an SSE
+connection holds) and reports memory per subscriber, the cost of
+publishing to one order while all others stay idle, and the time until
+every subscriber of a single hot order has encoded the SSE message.
+Run from backend/: python -m benchmarks.bench_fanout [--subscribers 10000]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from bson import ObjectId
+
+from app.api.v1.orders import ORDER_EVENT_SERIALIZER
+from app.services.order_stream import OrderEventBus, format_sse
+
+
+def make_event(order_id: str) -> dict:
+    return {
+        "_id": ObjectId(),
+        "order_id": order_id,
+        "ts": datetime.utcnow(),
+        "status": "delivering",
+        "note": "Tài xế đang giao hàng",
+        "updated_by": str(ObjectId())
+    }
+
+
+async def consumer(subscription, received: asyncio.Event, remaining: list) -> None:
+    """What an SSE stream does per event: wait, serialize, encode"""
+    with subscription:
+        while True:
+            event = await subscription.get()
+            format_sse("status", ORDER_EVENT_SERIALIZER.dump(event), event_id=str(event["_id"]))
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                received.set()
+
+
+async def spawn(bus: OrderEventBus, order_ids: list, received: asyncio.Event, remaining: list) -> list:
+    tasks = [
+        asyncio.create_task(consumer(bus.subscribe(order_id), received, remaining))
+        for order_id in order_ids
+    ]
+    await asyncio.sleep(0)  # Let every task reach its first await
+    return tasks
+
+
+async def stop(tasks: list) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def fan_out(bus: OrderEventBus, order_id: str, expected: int, received: asyncio.Event, remaining: list) -> float:
+    """Seconds from publish until `expected` subscribers have encoded the event"""
+    remaining[0] = expected
+    received.clear()
+    started = time.perf_counter()
+    bus.publish([make_event(order_id)])
+    await received.wait()
+    return time.perf_counter() - started
+
+
+async def run(subscribers: int, publishes: int) -> None:
+    bus = OrderEventBus(max_subscribers=subscribers * 2)
+    received = asyncio.Event()
+    remaining = [0]
+
+    # Idle subscribers, one order each
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    idle = await spawn(bus, [str(ObjectId()) for _ in range(subscribers)], received, remaining)
+    per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+    print(f"{subscribers} idle subscribers: {per_subscriber / 1024:.1f} KiB each (queue + task)")
+
+    # Publishing to one order while the rest stay idle
+    hot = await spawn(bus, ["hot-1"], received, remaining)
+    latencies = [await fan_out(bus, "hot-1", 1, received, remaining) for _ in range(publishes)]
+    latencies.sort()
+    print(
+        f"publish to 1 of {bus.subscriber_count} subscribers: "
+        f"p50 {latencies[len(latencies) // 2] * 1e6:.1f} us, max {latencies[-1] * 1e6:.1f} us"
+    )
+    await stop(hot)
+
+    # One hot order watched by everyone (worst case fan-out)
+    hot = await spawn(bus, ["hot-all"] * subscribers, received, remaining)
+    elapsed = await fan_out(bus, "hot-all", subscribers, received, remaining)
+    print(
+        f"publish to {subscribers} subscribers of one order: {elapsed * 1000:.1f} ms "
+        f"({elapsed / subscribers * 1e6:.2f} us per subscriber)"
+    )
+    await stop(hot)
+    await stop(idle)
+    print(f"subscribers left after close: {bus.subscriber_count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--publishes", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.subscribers, args.publishes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: OTP sends and verifies per second for each OTP store backend
+
+Every phone gets one save, one wrong-code verify and one correct verify.
+The mongo backend needs a reachable MongoDB (MONGO_URI); it uses a
+throwaway database that is dropped afterwards.
+Run from backend/: python -m benchmarks.bench_otp_store [--backend memory|mongo|all]
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.db.indexes import ensure_indexes
+from app.services.otp_store import OTP_INVALID, OTP_OK, InMemoryOTPStore, MongoOTPStore
+
+
+async def timed(label: str, coros, concurrency: int) -> list:
+    """Run coroutines with bounded concurrency and print the rate"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(coro):
+        async with semaphore:
+            return await coro
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[one(c) for c in coros])
+    elapsed = time.perf_counter() - started
+    print(f"  {label:16} {len(results):7} ops  {len(results) / elapsed:10.0f} ops/s")
+    return results
+
+
+async def bench(store, db, phones: int, concurrency: int) -> bool:
+    print(f"{store.name}:")
+    expires_at = datetime.utcnow() + timedelta(minutes=5)
+    numbers = [f"+849{i:08d}" for i in range(phones)]
+    max_attempts = settings.OTP_MAX_ATTEMPTS
+
+    await timed("send", [
+        store.save(db, phone, "register", "123456", expires_at) for phone in numbers
+    ], concurrency)
+    wrong = await timed("verify (wrong)", [
+        store.verify(db, phone, "register", "000000", max_attempts) for phone in numbers
+    ], concurrency)
+    right = await timed("verify (right)", [
+        store.verify(db, phone, "register", "123456", max_attempts) for phone in numbers
+    ], concurrency)
+
+    return (
+        all(r.status == OTP_INVALID for r in wrong)
+        and all(r.status == OTP_OK for r in right)
+    )
+
+
+async def run(backend: str, phones: int, concurrency: int) -> bool:
+    ok = True
+    if backend in ("memory", "all"):
+        ok &= await bench(InMemoryOTPStore(max_size=phones), None, phones, concurrency)
+
+    if backend in ("mongo", "all"):
+        client = AsyncIOMotorClient(settings.get_mongodb_url(), maxPoolSize=concurrency)
+        db = client["shipway_bench_otp"]
+        try:
+            await ensure_indexes(db)
+            ok &= await bench(MongoOTPStore(), db, phones, concurrency)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    print("OK" if ok else "FAIL")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=["memory", "mongo", "all"], default="all")
+    parser.add_argument("--phones", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    raise SystemExit(0 if asyncio.run(run(args.backend, args.phones, args.concurrency)) else 1)
+
+
+if __name__ == "__main__":
+    main()
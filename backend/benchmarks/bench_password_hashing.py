@@ -0,0 +1,84 @@
+"""
+Benchmark: latency of an unrelated handler while logins are hammered
+
+Compares the old inline bcrypt call with the pooled async facade.
+Run from backend/: python -m benchmarks.bench_password_hashing
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.core.security import hash_password, verify_password, verify_password_async
+
+
+async def ping() -> str:
+    """Stand-in for an unrelated endpoint (e.g. /health)"""
+    return "pong"
+
+
+async def probe(latencies: list, stop: asyncio.Event, interval: float) -> None:
+    """Call ping() every `interval` seconds and record its end-to-end latency"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.create_task(ping())
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def login_sync(password: str, hashed: str) -> bool:
+    return verify_password(password, hashed)
+
+
+async def login_async(password: str, hashed: str) -> bool:
+    return await verify_password_async(password, hashed)
+
+
+async def run(mode: str, logins: int, concurrency: int, interval: float) -> list:
+    hashed = hash_password("matkhau123")
+    login = login_sync if mode == "sync" else login_async
+    latencies: list = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(latencies, stop, interval))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_login():
+        async with semaphore:
+            await login("matkhau123", hashed)
+            # Yield like a real handler would between awaits
+            await asyncio.sleep(0)
+
+    await asyncio.gather(*[one_login() for _ in range(logins)])
+    stop.set()
+    await probe_task
+    return latencies
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=0.005)
+    args = parser.parse_args()
+
+    print(f"{'mode':6} {'samples':>8} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for mode in ("sync", "async"):
+        latencies = asyncio.run(run(mode, args.logins, args.concurrency, args.interval))
+        ms = [v * 1000 for v in latencies]
+        print(
+            f"{mode:6} {len(ms):8d} {statistics.median(ms):9.2f} "
+            f"{percentile(ms, 99):9.2f} {max(ms):9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
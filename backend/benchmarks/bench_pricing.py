@@ -0,0 +1,105 @@
+"""
+Benchmark: scalar vs NumPy batch shipping fee calculation
+
+Also checks that every batch column is bit-identical to the scalar path.
+Run from backend/: python -m benchmarks.bench_pricing [--rows 10000]
+"""
+import argparse
+import random
+import time
+
+from app.schemas.order import VehicleType
+from app.services.pricing_service import (
+    PRICING_CONFIG, calculate_distance, calculate_shipping_fee, calculate_shipping_fees_batch
+)
+
+
+def make_rows(count: int, seed: int = 42) -> list:
+    """Random rows around Ho Chi Minh City / Hanoi, some of them overweight"""
+    rng = random.Random(seed)
+    vehicles = list(VehicleType)
+    rows = []
+    for _ in range(count):
+        vehicle = rng.choice(vehicles)
+        base_lat, base_lng = rng.choice([(10.77, 106.70), (21.03, 105.85)])
+        rows.append({
+            "pickup_lat": base_lat + rng.uniform(-0.3, 0.3),
+            "pickup_lng": base_lng + rng.uniform(-0.3, 0.3),
+            "dropoff_lat": base_lat + rng.uniform(-0.3, 0.3),
+            "dropoff_lng": base_lng + rng.uniform(-0.3, 0.3),
+            "weight": round(rng.uniform(0.1, PRICING_CONFIG[vehicle]["max_weight"] * 1.05), 1),
+            "vehicle_type": vehicle,
+            "cod_amount": rng.choice([0, 0, 150000, 500000, 8000000]),
+        })
+    return rows
+
+
+def price_scalar(rows: list) -> list:
+    results = []
+    for row in rows:
+        distance = calculate_distance(
+            row["pickup_lat"], row["pickup_lng"], row["dropoff_lat"], row["dropoff_lng"]
+        )
+        try:
+            fee = calculate_shipping_fee(distance, row["weight"], row["vehicle_type"], row["cod_amount"])
+        except ValueError:
+            fee = None
+        results.append((distance, fee))
+    return results
+
+
+def price_batch(rows: list) -> dict:
+    return calculate_shipping_fees_batch(
+        pickup_lat=[r["pickup_lat"] for r in rows],
+        pickup_lng=[r["pickup_lng"] for r in rows],
+        dropoff_lat=[r["dropoff_lat"] for r in rows],
+        dropoff_lng=[r["dropoff_lng"] for r in rows],
+        weight=[r["weight"] for r in rows],
+        vehicle_type=[r["vehicle_type"] for r in rows],
+        cod_amount=[r["cod_amount"] for r in rows],
+    )
+
+
+def check_identical(scalar: list, batch: dict) -> int:
+    """Return the number of rows whose fields differ"""
+    fields = ["base_fee", "distance_fee", "weight_surcharge", "cod_fee", "shipping_fee", "total_amount"]
+    mismatches = 0
+    for i, (distance, fee) in enumerate(scalar):
+        if distance != batch["distance_km"][i]:
+            mismatches += 1
+        elif fee is None:
+            mismatches += batch["error"][i] is None
+        elif batch["error"][i] is not None or any(fee[f] != batch[f][i] for f in fields):
+            mismatches += 1
+    return mismatches
+
+
+def best_of(func, rows, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(rows)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    mismatches = check_identical(price_scalar(rows), price_batch(rows))
+
+    scalar = best_of(price_scalar, rows, args.repeat)
+    batch = best_of(price_batch, rows, args.repeat)
+    print(f"rows:       {args.rows}")
+    print(f"scalar:     {scalar * 1000:8.2f} ms")
+    print(f"batch:      {batch * 1000:8.2f} ms  ({scalar / batch:.1f}x)")
+    print(f"mismatches: {mismatches}")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
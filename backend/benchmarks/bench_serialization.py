@@ -0,0 +1,167 @@
+"""
+Benchmark: CPU per list response, Pydantic + response_model vs precompiled serializer + orjson
+
+The legacy path builds a model per row, lets FastAPI validate the result
+against response_model again and renders it with json; the fast path
+converts the Mongo documents once and renders them with orjson. Also
+checks that both produce the same JSON.
+Run from backend/: python -m benchmarks.bench_serialization [--rows 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.serialization import ModelSerializer
+from app.schemas.order import OrderListResponse, OrderResponse
+from app.schemas.wallet import TransactionListResponse, TransactionResponse
+
+
+def make_orders(count: int, seed: int = 42) -> list:
+    """Order documents as stored by models.create_order (with a few history entries)"""
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(microsecond=123000)
+    orders = []
+    for i in range(count):
+        created = now - timedelta(minutes=i)
+        orders.append({
+            "_id": ObjectId(),
+            "tracking_code": f"SW20240115{i:04d}",
+            "user_id": str(ObjectId()),
+            "driver_id": str(ObjectId()) if i % 2 else None,
+            "pickup_info": {
+                "address": "123 Nguyễn Văn Linh, Q.7, TP.HCM",
+                "lat": 10.73 + rng.random() / 100, "lng": 106.71 + rng.random() / 100,
+                "contact_name": "Nguyễn Văn A", "contact_phone": "0912345678", "note": None
+            },
+            "dropoff_info": {
+                "address": "456 Lê Văn Việt, Q.9, TP.HCM",
+                "lat": 10.82 + rng.random() / 100, "lng": 106.75 + rng.random() / 100,
+                "contact_name": "Trần Thị B", "contact_phone": "0987654321", "note": "Giao tận tay"
+            },
+            "pickup_location": {"type": "Point", "coordinates": [106.71, 10.73]},
+            "product_name": "Quần áo thời trang",
+            "images": [f"/uploads/blobs/ab/cd/{ObjectId()}.jpg"],
+            "image_variants": [],
+            "weight": rng.choice([1, 2.5, 5]),
+            "length": None, "width": None, "height": None,
+            "vehicle_type": "bike",
+            "note": "Hàng dễ vỡ",
+            "distance_km": round(rng.uniform(1, 20), 2),
+            "shipping_fee": 45000,
+            "cod_amount": 0,
+            "total_amount": 45000,
+            "payment_method": "wallet",
+            "is_paid": True,
+            "status": "picking_up",
+            "history": [
+                {"status": "pending", "timestamp": created, "note": "Đơn hàng được tạo", "updated_by": "user"},
+                {"status": "picking_up", "timestamp": created + timedelta(minutes=3), "note": "Tài xế đang đến lấy hàng", "updated_by": "driver"},
+            ],
+            "is_reviewed": False,
+            "created_at": created,
+            "updated_at": created + timedelta(minutes=3)
+        })
+    return orders
+
+
+def make_transactions(count: int) -> list:
+    now = datetime.utcnow().replace(microsecond=456000)
+    return [{
+        "_id": ObjectId(),
+        "user_id": str(ObjectId()),
+        "amount": 100000,
+        "type": "topup",
+        "description": "Nạp tiền qua bank_transfer",
+        "status": "completed",
+        "payment_id": f"PAY{i:08d}",
+        "payment_method": "bank_transfer",
+        "payment_details": {"transaction_code": f"FT{i}", "payment_time": None},
+        "created_at": now - timedelta(hours=i),
+        "updated_at": now - timedelta(hours=i),
+        "completed_at": now - timedelta(hours=i)
+    } for i in range(count)]
+
+
+async def legacy_orders(field, orders: list) -> bytes:
+    rows = [OrderResponse(**{**order, "_id": str(order["_id"])}) for order in orders]
+    content = OrderListResponse(total=len(rows), page=1, limit=len(rows), orders=rows, next_cursor=None)
+    data = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(data).body
+
+
+async def legacy_transactions(field, transactions: list) -> bytes:
+    rows = [TransactionResponse(**{**tx, "_id": str(tx["_id"])}) for tx in transactions]
+    content = TransactionListResponse(total=len(rows), transactions=rows, next_cursor=None)
+    data = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(data).body
+
+
+def fast_orders(serializer: ModelSerializer, orders: list) -> bytes:
+    return serializer.response({
+        "total": len(orders), "page": 1, "limit": len(orders), "orders": orders, "next_cursor": None
+    }).body
+
+
+def fast_transactions(serializer: ModelSerializer, transactions: list) -> bytes:
+    return serializer.response({
+        "total": len(transactions), "transactions": transactions, "next_cursor": None
+    }).body
+
+
+async def cpu_per_call(func, *args, requests: int) -> float:
+    """CPU seconds per call (process time, so waiting never counts)"""
+    started = time.process_time()
+    for _ in range(requests):
+        result = func(*args)
+        if asyncio.iscoroutine(result):
+            await result
+    return (time.process_time() - started) / requests
+
+
+async def run(rows: int, requests: int) -> int:
+    orders = make_orders(rows)
+    transactions = make_transactions(rows)
+    order_field = create_response_field(name="orders", type_=OrderListResponse)
+    tx_field = create_response_field(name="transactions", type_=TransactionListResponse)
+    order_serializer = ModelSerializer(OrderListResponse)
+    tx_serializer = ModelSerializer(TransactionListResponse)
+
+    cases = [
+        ("orders", legacy_orders, order_field, fast_orders, order_serializer, orders),
+        ("transactions", legacy_transactions, tx_field, fast_transactions, tx_serializer, transactions),
+    ]
+    mismatches = 0
+    print(f"rows per response: {rows}, requests: {requests}")
+    for name, legacy, field, fast, serializer, documents in cases:
+        same = json.loads(await legacy(field, documents)) == json.loads(fast(serializer, documents))
+        mismatches += not same
+        legacy_cpu = await cpu_per_call(legacy, field, documents, requests=requests)
+        fast_cpu = await cpu_per_call(fast, serializer, documents, requests=requests)
+        print(
+            f"{name:13} legacy {legacy_cpu * 1e6:9.1f} us/request   fast {fast_cpu * 1e6:9.1f} us/request"
+            f"   ({legacy_cpu / fast_cpu:.1f}x)   same JSON: {same}"
+        )
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    raise SystemExit(1 if asyncio.run(run(args.rows, args.requests)) else 0)
+
+
+if __name__ == "__main__":
+    main()
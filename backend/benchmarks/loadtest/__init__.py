@@ -0,0 +1,5 @@
+"""
+Load test: asyncio HTTP load generator and API scenarios
+
+Run from backend/: python -m benchmarks.loadtest --help
+"""
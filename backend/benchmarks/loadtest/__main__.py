@@ -0,0 +1,181 @@
+"""
+Load test: throughput and p50/p95/p99 per API scenario, with baselines
+
+Drives the FastAPI app in-process through httpx (no network, no uvicorn)
+with N concurrent virtual users per scenario. Database:
+  --mongo uri     MONGO_URI (local mongod); throwaway database, dropped after
+  --mongo memory  mongomock-motor; no server needed, but the mock is
+                  synchronous, so numbers show app CPU cost, not DB latency
+Baselines are JSON files in benchmarks/baselines/; --compare exits 1 if a
+step's p95 or throughput regressed by more than --threshold.
+Bcrypt dominates the auth scenario; set BCRYPT_ROUNDS=4 to focus on I/O.
+Needs benchmarks/requirements.txt.
+Run from backend/: python -m benchmarks.loadtest [--scenarios orders,wallet] [--mongo memory]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("NODE_ENV", "development")  # send-otp returns the code
+os.environ.setdefault("SMS_PROVIDER", "fake")
+os.environ.setdefault("SMS_RATE_PER_SECOND", "0")
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+import httpx
+
+from app.core.config import settings
+from app.db.indexes import ensure_indexes
+from app.db.session import mongodb
+from app.services.sms_service import sms_queue
+from benchmarks.loadtest.generator import run_scenario
+from benchmarks.loadtest.scenarios import SCENARIOS
+
+
+BASELINE_DIR = Path(__file__).resolve().parent.parent / "baselines"
+DB_NAME = "shipway_loadtest"
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def connect(mode: str):
+    if mode == "memory":
+        from mongomock_motor import AsyncMongoMockClient
+
+        client = AsyncMongoMockClient()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(settings.get_mongodb_url())
+    return client, client[DB_NAME]
+
+
+async def run(args) -> Dict[str, Any]:
+    from app.main import app
+
+    results = {}
+    for name in args.scenarios:
+        # Fresh database per scenario so earlier runs do not skew later ones
+        client, db = connect(args.mongo)
+        mongodb.client, mongodb.db = client, db
+        if args.mongo != "memory":
+            await ensure_indexes(db)
+        await sms_queue.start()
+        try:
+            transport = httpx.ASGITransport(app=app)
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=limits) as http:
+                print(f"running {name} ({SCENARIOS[name].description}) ...", flush=True)
+                results[name] = await run_scenario(
+                    SCENARIOS[name], http, db, args.concurrency, args.duration, args.warmup
+                )
+        finally:
+            await sms_queue.stop()
+            await client.drop_database(DB_NAME)
+            client.close()
+    return results
+
+
+def print_report(results: Dict[str, Any]) -> None:
+    print(f"\n{'scenario / step':32} {'count':>7} {'err':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:32} {result['iterations']:>7} {result['failed_iterations']:>5} "
+            f"{result['iterations_per_s']:>9} (iterations/s, {result['requests_per_s']} req/s)"
+        )
+        for step, stats in result["steps"].items():
+            print(
+                f"  {step:30} {stats['count']:>7} {stats['errors']:>5} {stats['rps']:>9} "
+                f"{stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+            )
+        for error in result["sample_errors"]:
+            print(f"  ! {error}")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Diff per-step p95 and throughput against a baseline
+
+    Returns:
+        Regression descriptions (empty if none exceeds the threshold)
+    """
+    regressions = []
+    print(f"\n{'scenario / step':32} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'rps base':>9} {'rps now':>9} {'change':>8}")
+    for name, result in results.items():
+        base_steps = baseline["results"].get(name, {}).get("steps", {})
+        for step, stats in result["steps"].items():
+            base = base_steps.get(step)
+            if not base:
+                continue
+            p95_change = stats["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+            rps_change = stats["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+            flag = ""
+            if p95_change > threshold or rps_change < -threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{name}/{step}: p95 {p95_change:+.0%}, rps {rps_change:+.0%}")
+            print(
+                f"{name + '/' + step:32} {base['p95_ms']:>9} {stats['p95_ms']:>9} {p95_change:>+8.0%} "
+                f"{base['rps']:>9} {stats['rps']:>9} {rps_change:>+8.0%}{flag}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated: {', '.join(SCENARIOS)}")
+    parser.add_argument("--mongo", choices=["uri", "memory"], default="uri")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per scenario")
+    parser.add_argument("--save", metavar="NAME", help="Save results as baseline NAME")
+    parser.add_argument("--compare", metavar="NAME", help="Diff results against baseline NAME")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    if args.save:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save}.json"
+        path.write_text(json.dumps({
+            "created_at": datetime.utcnow().isoformat(),
+            "revision": git_revision(),
+            "config": {
+                "mongo": args.mongo,
+                "concurrency": args.concurrency,
+                "duration": args.duration,
+                "bcrypt_rounds": settings.BCRYPT_ROUNDS
+            },
+            "results": results
+        }, indent=2))
+        print(f"\nbaseline saved: {path}")
+
+    if args.compare:
+        baseline = json.loads((BASELINE_DIR / f"{args.compare}.json").read_text())
+        print(f"\ncompared with baseline {args.compare} (revision {baseline['revision']}, {baseline['config']})")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nregressions:\n  " + "\n  ".join(regressions))
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
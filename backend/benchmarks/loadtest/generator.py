@@ -0,0 +1,195 @@
+"""
+Closed-loop asyncio load generator
+
+Each virtual user runs scenario iterations back to back until the
+deadline; every HTTP call of an iteration is timed under its step name.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+import httpx
+import numpy as np
+
+
+class StepFailed(Exception):
+    """An HTTP step returned an unexpected status (the iteration is abandoned)"""
+
+
+@dataclass
+class StepStats:
+    """Latencies (seconds) and failures of one step"""
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+
+class Recorder:
+    """
+    Collects step timings of requests started after the warmup
+
+    Args:
+        measure_from: perf_counter() value where the warmup ends
+    """
+
+    def __init__(self, measure_from: float = 0.0):
+        self.measure_from = measure_from
+        self.steps: Dict[str, StepStats] = {}
+        self.iterations = 0
+        self.failed_iterations = 0
+
+    def measuring(self, started: float) -> bool:
+        return started >= self.measure_from
+
+    def record(self, step: str, started: float, ok: bool) -> None:
+        if not self.measuring(started):
+            return
+        stats = self.steps.setdefault(step, StepStats())
+        stats.latencies.append(time.perf_counter() - started)
+        stats.errors += not ok
+
+
+class ScenarioContext:
+    """
+    What a scenario sees: the HTTP client, the database (for seeding) and shared data
+
+    Args:
+        client: HTTP client bound to the app
+        db: Database instance
+        recorder: Timing recorder
+    """
+
+    def __init__(self, client: httpx.AsyncClient, db, recorder: Recorder):
+        self.client = client
+        self.db = db
+        self.recorder = recorder
+        self.data: Dict[str, Any] = {}
+
+    async def request(
+        self,
+        step: str,
+        method: str,
+        url: str,
+        expected: Iterable[int] = (200, 201),
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Send a timed request
+
+        Raises:
+            StepFailed: If the status is not in `expected`
+        """
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(step, started, False)
+            raise StepFailed(f"{step}: {e}")
+        ok = response.status_code in expected
+        self.recorder.record(step, started, ok)
+        if not ok:
+            raise StepFailed(f"{step}: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+
+@dataclass
+class Scenario:
+    """
+    A user journey
+
+    Args:
+        name: Scenario name (CLI and baseline key)
+        description: One line shown in the report
+        iteration: One journey, called as iteration(ctx, vu, n)
+        setup: Seeds shared data once before the run (optional)
+    """
+    name: str
+    description: str
+    iteration: Callable[[ScenarioContext, int, int], Awaitable[None]]
+    setup: Optional[Callable[[ScenarioContext], Awaitable[None]]] = None
+
+
+def percentile_ms(latencies: List[float], q: float) -> float:
+    return round(float(np.percentile(latencies, q)) * 1000, 2)
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Any]:
+    """
+    Throughput and latency percentiles of a run
+
+    Returns:
+        Dict with iteration counts, throughput and per-step p50/p95/p99 (ms)
+    """
+    steps = {}
+    requests = 0
+    for name, stats in recorder.steps.items():
+        count = len(stats.latencies)
+        requests += count
+        steps[name] = {
+            "count": count,
+            "errors": stats.errors,
+            "rps": round(count / elapsed, 2),
+            "p50_ms": percentile_ms(stats.latencies, 50),
+            "p95_ms": percentile_ms(stats.latencies, 95),
+            "p99_ms": percentile_ms(stats.latencies, 99),
+            "max_ms": round(max(stats.latencies) * 1000, 2)
+        }
+    return {
+        "duration_s": round(elapsed, 2),
+        "iterations": recorder.iterations,
+        "failed_iterations": recorder.failed_iterations,
+        "iterations_per_s": round(recorder.iterations / elapsed, 2),
+        "requests_per_s": round(requests / elapsed, 2),
+        "steps": steps
+    }
+
+
+async def run_scenario(
+    scenario: Scenario,
+    client: httpx.AsyncClient,
+    db,
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0
+) -> Dict[str, Any]:
+    """
+    Run a scenario with `concurrency` virtual users for `duration` seconds
+
+    Args:
+        scenario: Scenario to run
+        client: HTTP client bound to the app
+        db: Database instance (seeding)
+        concurrency: Number of virtual users
+        duration: Measured seconds
+        warmup: Unmeasured seconds before the measurement
+
+    Returns:
+        Summary from `summarize`
+    """
+    recorder = Recorder()
+    ctx = ScenarioContext(client, db, recorder)
+    if scenario.setup:
+        await scenario.setup(ctx)
+
+    errors: List[str] = []
+    recorder.measure_from = time.perf_counter() + warmup
+    deadline = recorder.measure_from + duration
+
+    async def virtual_user(vu: int) -> None:
+        n = 0
+        while time.perf_counter() < deadline:
+            measured = recorder.measuring(time.perf_counter())
+            try:
+                await scenario.iteration(ctx, vu, n)
+                if measured:
+                    recorder.iterations += 1
+            except StepFailed as e:
+                if measured:
+                    recorder.failed_iterations += 1
+                    if len(errors) < 5:
+                        errors.append(str(e))
+            n += 1
+
+    await asyncio.gather(*[virtual_user(vu) for vu in range(concurrency)])
+    summary = summarize(recorder, duration)
+    summary["sample_errors"] = errors
+    return summary
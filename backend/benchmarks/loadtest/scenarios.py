@@ -0,0 +1,161 @@
+"""
+Load test scenarios (user journeys through the HTTP API)
+
+Users and balances are seeded directly in the database so each scenario
+measures its own endpoints; everything else goes through HTTP.
+"""
+import asyncio
+import random
+from typing import Dict, List, Tuple
+
+from app.core.security import create_access_token
+from app.db import models
+from benchmarks.loadtest.generator import Scenario, ScenarioContext, StepFailed
+
+
+API = "/api/v1"
+PASSWORD = "loadtest123"
+
+ORDER_FORM = {
+    "pickup_address": "1 Nguyễn Huệ, Quận 1, TP.HCM",
+    "pickup_lat": "10.7769",
+    "pickup_lng": "106.7009",
+    "pickup_contact_name": "Người gửi",
+    "pickup_contact_phone": "0901000001",
+    "dropoff_address": "2 Võ Văn Tần, Quận 3, TP.HCM",
+    "dropoff_lat": "10.7797",
+    "dropoff_lng": "106.6909",
+    "dropoff_contact_name": "Người nhận",
+    "dropoff_contact_phone": "0901000002",
+    "product_name": "Tài liệu",
+    "weight": "1",
+    "vehicle_type": "bike",
+}
+
+
+def phone_for(vu: int, n: int) -> str:
+    """Unique phone number per virtual user and iteration"""
+    return f"+84{vu:04d}{n:07d}"
+
+
+async def seed_users(
+    ctx: ScenarioContext,
+    count: int,
+    role: str = "user",
+    balance: int = 0
+) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Create users directly in the database (tokens are issued without logging in)
+
+    Returns:
+        List of (user_id, auth headers)
+    """
+    tag = f"{random.randrange(10**6):06d}"
+
+    async def create(i: int) -> Tuple[str, Dict[str, str]]:
+        user = await models.create_user(ctx.db, {
+            "phone": f"+8499{tag}{i:04d}",
+            "name": f"Load {role} {i}",
+            "password": PASSWORD,
+            "role": role,
+            "is_active": True,
+            "wallet_info": {"balance": balance, "total_topup": balance, "total_usage": 0}
+        })
+        user_id = str(user["_id"])
+        token = create_access_token({"user_id": user_id, "role": role})
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return await asyncio.gather(*[create(i) for i in range(count)])
+
+
+# ==================== AUTH ====================
+
+async def auth_iteration(ctx: ScenarioContext, vu: int, n: int) -> None:
+    phone = phone_for(vu, n)
+    response = await ctx.request(
+        "send_otp", "POST", f"{API}/auth/send-otp",
+        json={"phone": phone, "purpose": "register"}
+    )
+    otp = response.json()["otp"]  # Returned in development mode
+    await ctx.request(
+        "register", "POST", f"{API}/auth/register",
+        json={"phone": phone, "name": "Load Test", "password": PASSWORD, "otp": otp}
+    )
+    await ctx.request(
+        "login", "POST", f"{API}/auth/login",
+        json={"phone": phone, "password": PASSWORD}
+    )
+
+
+# ==================== ORDERS ====================
+
+async def orders_setup(ctx: ScenarioContext) -> None:
+    ctx.data["customers"] = await seed_users(ctx, 20, balance=10**12)
+
+
+async def orders_iteration(ctx: ScenarioContext, vu: int, n: int) -> None:
+    customers = ctx.data["customers"]
+    _, headers = customers[vu % len(customers)]
+    response = await ctx.request(
+        "create_order", "POST", f"{API}/orders", data=ORDER_FORM, headers=headers
+    )
+    tracking_code = response.json()["tracking_code"]
+    await ctx.request("list_orders", "GET", f"{API}/orders", params={"limit": 20}, headers=headers)
+    response = await ctx.request("track_order", "GET", f"{API}/orders/tracking/{tracking_code}")
+    await ctx.request(
+        "track_order_304", "GET", f"{API}/orders/tracking/{tracking_code}",
+        expected=(304,), headers={"If-None-Match": response.headers["etag"]}
+    )
+
+
+# ==================== WALLET ====================
+
+async def wallet_setup(ctx: ScenarioContext) -> None:
+    ctx.data["customers"] = await seed_users(ctx, 20)
+
+
+async def wallet_iteration(ctx: ScenarioContext, vu: int, n: int) -> None:
+    customers = ctx.data["customers"]
+    _, headers = customers[vu % len(customers)]
+    response = await ctx.request(
+        "topup", "POST", f"{API}/wallet/topup",
+        json={"amount": 100000, "payment_method": "bank_transfer"}, headers=headers
+    )
+    payment_id = response.json()["payment_id"]
+    response = await ctx.request(
+        "verify_payment", "POST", f"{API}/wallet/verify-payment",
+        json={"payment_id": payment_id, "status": "success", "transaction_code": f"LT{vu}-{n}"}
+    )
+    if not response.json().get("success"):
+        raise StepFailed(f"verify_payment: {response.json().get('message')}")
+
+
+# ==================== DRIVER ACCEPT ====================
+
+async def accept_setup(ctx: ScenarioContext) -> None:
+    ctx.data["customers"] = await seed_users(ctx, 20, balance=10**12)
+    ctx.data["drivers"] = await seed_users(ctx, 20, role="driver")
+
+
+async def accept_iteration(ctx: ScenarioContext, vu: int, n: int) -> None:
+    customers = ctx.data["customers"]
+    drivers = ctx.data["drivers"]
+    _, customer_headers = customers[vu % len(customers)]
+    _, driver_headers = drivers[vu % len(drivers)]
+    response = await ctx.request(
+        "create_order", "POST", f"{API}/orders", data=ORDER_FORM, headers=customer_headers
+    )
+    order_id = response.json()["order_id"]
+    await ctx.request("available_orders", "GET", f"{API}/orders/available/list", headers=driver_headers)
+    await ctx.request("accept_order", "POST", f"{API}/orders/{order_id}/accept", headers=driver_headers)
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in [
+        Scenario("auth", "send OTP -> register -> login", auth_iteration),
+        Scenario("orders", "create order -> list orders -> track by code -> revalidate", orders_iteration, orders_setup),
+        Scenario("wallet", "top-up -> payment webhook", wallet_iteration, wallet_setup),
+        Scenario("driver_accept", "create order -> driver lists available -> accept", accept_iteration, accept_setup),
+    ]
+}
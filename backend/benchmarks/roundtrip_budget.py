@@ -0,0 +1,102 @@
+"""
+Round-trip budget: count Mongo commands per data-layer write
+
+Every mutator must return its post-image in the number of round trips
+listed in BUDGETS. Needs a reachable MongoDB (MONGO_URI); uses a throwaway
+database that is dropped afterwards.
+Run from backend/: python -m benchmarks.roundtrip_budget
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from pymongo import monitoring
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.db import models
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent to the server"""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Maximum round trips per call
+BUDGETS = {
+    "create_user": 1,
+    "update_user": 1,
+    "update_user_password": 1,
+    "create_otp": 1,
+    "consume_otp": 1,
+    "create_transaction": 1,
+    "update_transaction_status": 1,
+    "add_to_wallet": 1,
+    "use_from_wallet": 1,
+    # First order of the day on this worker: existing-code lookup + tracking
+    # code counter + order insert + order_events insert (3 afterwards; one
+    # more to seed the counter when the day already has codes)
+    "create_order": 4,
+}
+
+
+async def run() -> int:
+    counter = CommandCounter()
+    client = AsyncIOMotorClient(settings.get_mongodb_url(), event_listeners=[counter])
+    db = client["shipway_roundtrip_budget"]
+    failures = 0
+
+    async def measure(name, coro):
+        nonlocal failures
+        before = counter.count
+        result = await coro
+        used = counter.count - before
+        ok = used <= BUDGETS[name]
+        failures += not ok
+        print(f"{name:28} {used} / {BUDGETS[name]} {'OK' if ok else 'OVER BUDGET'}")
+        return result
+
+    try:
+        await db.command("ping")
+        user = await measure("create_user", models.create_user(db, {
+            "phone": "+84900000000", "name": "Budget", "password": "secret1", "role": "user"
+        }))
+        user_id = str(user["_id"])
+        await measure("update_user", models.update_user(db, user_id, {"name": "Budget 2"}))
+        await measure("update_user_password", models.update_user_password(db, "+84900000000", "secret2"))
+        await measure("create_otp", models.create_otp(db, {
+            "phone": "+84900000000", "otp": "123456", "purpose": "register",
+            "expires_at": datetime.utcnow() + timedelta(minutes=5)
+        }))
+        await measure("consume_otp", models.consume_otp(db, "+84900000000", "register", "123456", 5))
+        tx = await measure("create_transaction", models.create_transaction(db, {
+            "user_id": user_id, "amount": 10000, "type": "topup", "status": "pending"
+        }))
+        await measure("update_transaction_status", models.update_transaction_status(db, str(tx["_id"]), "completed"))
+        await measure("add_to_wallet", models.add_to_wallet(db, user_id, 10000))
+        await measure("use_from_wallet", models.use_from_wallet(db, user_id, 5000))
+        await measure("create_order", models.create_order(db, {
+            "user_id": user_id, "driver_id": None, "pickup_info": {"lat": 10.77, "lng": 106.70}
+        }))
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+    return failures
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if asyncio.run(run()) else 0)
@@ -0,0 +1,67 @@
+"""
+Stress: N drivers race to accept the same order
+
+Exactly one claim_order call must win and the order history must contain a
+single acceptance entry. Needs a reachable MongoDB (MONGO_URI); uses a
+throwaway database that is dropped afterwards.
+Run from backend/: python -m benchmarks.stress_accept_order [--drivers 100]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.db import models
+
+
+async def run(drivers: int, rounds: int) -> int:
+    client = AsyncIOMotorClient(settings.get_mongodb_url(), maxPoolSize=drivers)
+    db = client["shipway_stress_accept"]
+    failures = 0
+    try:
+        for round_no in range(rounds):
+            order = await models.create_order(db, {
+                "user_id": "stress-user",
+                "driver_id": None,
+                "pickup_info": {"lat": 10.77, "lng": 106.70},
+                "status": "pending"
+            })
+            order_id = str(order["_id"])
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*[
+                models.claim_order(db, order_id, f"driver-{i}", "picking_up", "stress")
+                for i in range(drivers)
+            ])
+            elapsed = time.perf_counter() - started
+
+            winners = [r for r in results if r is not None]
+            stored = await db.orders.find_one({"_id": order["_id"]})
+            accepted = [h for h in stored["history"] if h["status"] == "picking_up"]
+            ok = len(winners) == 1 and len(accepted) == 1 and stored["driver_id"] == winners[0]["driver_id"]
+            failures += not ok
+            print(
+                f"round {round_no + 1}: winners={len(winners)} history_entries={len(accepted)} "
+                f"driver={stored['driver_id']} {elapsed * 1000:.1f} ms {'OK' if ok else 'FAIL'}"
+            )
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--drivers", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    raise SystemExit(1 if asyncio.run(run(args.drivers, args.rounds)) else 0)
+
+
+if __name__ == "__main__":
+    main()
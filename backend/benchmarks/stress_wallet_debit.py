@@ -0,0 +1,115 @@
+"""
+Stress: concurrent wallet debits never overdraw the balance
+
+Fires N concurrent payments at a wallet that can only afford some of
+them, then checks that the balance never went negative, that exactly
+balance // amount payments succeeded and that the ledger has one usage
+entry per successful payment.
+  --path debit  calls debit_wallet directly
+  --path order  creates orders with create_order_with_wallet_payment, the
+                POST /orders path (on a replica set: one transaction per
+                order, so racing debits hit WriteConflicts and are retried;
+                every order must still be created, none may fail)
+Needs a reachable MongoDB (MONGO_URI); uses a throwaway database that is
+dropped afterwards.
+Run from backend/: python -m benchmarks.stress_wallet_debit [--debits 500] [--path order]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import mongodb, detect_transactions_support
+
+
+def order_data(user_id: str, i: int) -> dict:
+    return {
+        "user_id": user_id,
+        "pickup_info": {"address": "1 Nguyễn Huệ", "lat": 10.7769, "lng": 106.7009},
+        "dropoff_info": {"address": "2 Võ Văn Tần", "lat": 10.7797, "lng": 106.6909},
+        "product_name": f"stress {i}",
+        "vehicle_type": "bike",
+        "payment_method": "wallet"
+    }
+
+
+async def pay(db, path: str, user_id: str, amount: int, i: int):
+    """One payment; returns the user document after a successful debit, else None"""
+    if path == "debit":
+        return await models.debit_wallet(db, user_id, amount, "stress", f"order-{i}")
+    order, paid = await models.create_order_with_wallet_payment(db, order_data(user_id, i), amount, "stress")
+    if not paid:
+        return None
+    entry = await db.transactions.find_one({"order_id": str(order["_id"]), "type": "usage"})
+    return {"wallet_info": {"balance": entry["balance_after"]}}
+
+
+async def run(debits: int, balance: int, amount: int, path: str) -> bool:
+    client = AsyncIOMotorClient(settings.get_mongodb_url(), maxPoolSize=100)
+    db = client["shipway_stress_wallet"]
+    mongodb.supports_transactions = await detect_transactions_support(db)
+    try:
+        result = await db.users.insert_one({
+            "phone": "+84900000000",
+            "wallet_info": {"balance": balance, "total_topup": balance, "total_usage": 0}
+        })
+        user_id = str(result.inserted_id)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[pay(db, path, user_id, amount, i) for i in range(debits)],
+            return_exceptions=True
+        )
+        elapsed = time.perf_counter() - started
+
+        errors = [r for r in results if isinstance(r, Exception)]
+        succeeded = [r for r in results if isinstance(r, dict)]
+        min_seen = min((r["wallet_info"]["balance"] for r in succeeded), default=balance)
+        user = await db.users.find_one({"_id": result.inserted_id})
+        ledger = await db.transactions.count_documents({"user_id": user_id, "type": "usage"})
+
+        expected = min(debits, balance // amount)
+        ok = (
+            not errors
+            and len(succeeded) == expected
+            and min_seen >= 0
+            and user["wallet_info"]["balance"] == balance - expected * amount
+            and ledger == expected
+        )
+        print(f"path:            {path} (transactions: {mongodb.supports_transactions})")
+        print(f"payments:        {debits} in {elapsed * 1000:.1f} ms")
+        print(f"succeeded:       {len(succeeded)} (expected {expected})")
+        print(f"errors:          {len(errors)}{f' (first: {errors[0]!r})' if errors else ''}")
+        print(f"lowest balance:  {min_seen}")
+        print(f"final balance:   {user['wallet_info']['balance']}")
+        print(f"ledger entries:  {ledger}")
+        if path == "order":
+            paid_orders = await db.orders.count_documents({"user_id": user_id, "is_paid": True})
+            orders = await db.orders.count_documents({"user_id": user_id})
+            ok = ok and paid_orders == expected and orders == debits
+            print(f"orders:          {orders} ({paid_orders} paid)")
+        print("OK" if ok else "FAIL")
+        return ok
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--debits", type=int, default=500)
+    parser.add_argument("--balance", type=int, default=1_000_000)
+    parser.add_argument("--amount", type=int, default=7_000)
+    parser.add_argument("--path", choices=["debit", "order"], default="order")
+    args = parser.parse_args()
+    raise SystemExit(0 if asyncio.run(run(args.debits, args.balance, args.amount, args.path)) else 1)
+
+
+if __name__ == "__main__":
+    main()
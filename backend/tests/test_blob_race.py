@@ -0,0 +1,88 @@
+"""
+Blob uploads: deletion vs. re-upload of the same content, temp file cleanup
+
+Needs pytest, plus mongomock-motor from benchmarks/requirements.txt.
+Run from backend/: python -m pytest tests
+"""
+import asyncio
+import io
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+import pytest
+from starlette.datastructures import Headers, UploadFile
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from app.services import upload_service
+from app.services.storage import FilesystemStorage
+
+
+CONTENT = b"\xff\xd8\xff same image bytes"
+
+
+def make_upload() -> UploadFile:
+    return UploadFile(
+        file=io.BytesIO(CONTENT),
+        filename="photo.jpg",
+        headers=Headers({"content-type": "image/jpeg"})
+    )
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = FilesystemStorage(root=tmp_path, base_url="/uploads")
+    monkeypatch.setattr(upload_service, "storage", storage)
+    return storage
+
+
+def test_reupload_during_delete_keeps_file(storage):
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        url = await upload_service.store_blob(db, make_upload())
+        key = storage.key_from_url(url)
+        blob_key = upload_service.blob_key_from_path(url)
+
+        # Re-upload the same content right after the deleter claimed the
+        # blob, while it is still deleting the file
+        delete = storage.delete
+        reupload = None
+
+        async def interleaved_delete(object_key):
+            nonlocal reupload
+            if reupload is None:
+                reupload = asyncio.create_task(upload_service.store_blob(db, make_upload()))
+                await asyncio.sleep(0.2)  # Let the upload run as far as it can
+            await delete(object_key)
+
+        storage.delete = interleaved_delete
+        await upload_service.delete_order_images(db, [url])
+        assert await reupload == url
+
+        blob = await db.blobs.find_one({"_id": blob_key})
+        assert blob["refcount"] == 1
+        assert "deleting_at" not in blob
+        assert await storage.exists(key)
+
+    asyncio.run(run())
+
+
+def test_direct_upload_removes_temp_file_when_store_fails(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_service, "LOCAL_TEMP_DIR", tmp_path / "tmp")
+
+    async def failing_put_file(key, local_path, content_type=None):
+        raise OSError("storage unavailable")
+
+    async def body():
+        yield CONTENT
+
+    async def run():
+        sha256 = upload_service.hashlib.sha256(CONTENT).hexdigest()
+        upload = await storage.presign_upload("blobs/x/photo.jpg", "image/jpeg", len(CONTENT), sha256)
+        monkeypatch.setattr(storage, "put_file", failing_put_file)
+        with pytest.raises(OSError):
+            await upload_service.receive_direct_upload(upload["url"].rsplit("/", 1)[-1], body())
+
+    asyncio.run(run())
+    assert list((tmp_path / "tmp").iterdir()) == []
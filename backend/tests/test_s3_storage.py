@@ -0,0 +1,105 @@
+"""
+S3 storage backend against moto: presigned direct uploads, put/size/delete
+
+Needs pytest and moto, plus mongomock-motor from benchmarks/requirements.txt.
+Run from backend/: python -m pytest tests
+"""
+import asyncio
+import base64
+import hashlib
+import os
+
+os.environ.setdefault("SECRET_KEY", "test")
+
+import pytest
+from fastapi import HTTPException
+
+moto = pytest.importorskip("moto")
+mongomock_motor = pytest.importorskip("mongomock_motor")
+requests = pytest.importorskip("requests")
+
+from app.services import upload_service
+from app.services.storage import S3Storage
+
+
+BUCKET = "shipway-test"
+CONTENT = b"\xff\xd8\xff direct upload bytes"
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    with moto.mock_aws():
+        storage = S3Storage(BUCKET, access_key_id="test", secret_access_key="test")
+        storage.client.create_bucket(Bucket=BUCKET)
+        monkeypatch.setattr(upload_service, "storage", storage)
+        yield storage
+
+
+def test_presign_then_confirm(storage):
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        upload = await upload_service.presign_image_upload(db, "photo.jpg", "image/jpeg", len(CONTENT), SHA256)
+        assert upload["upload_required"]
+        # Size and checksum are part of the signature
+        signed_headers = upload["url"].split("X-Amz-SignedHeaders=")[1].split("&")[0]
+        assert "content-length" in signed_headers
+        assert "x-amz-checksum-sha256" in signed_headers
+
+        response = await asyncio.to_thread(requests.put, upload["url"], data=CONTENT, headers=upload["headers"])
+        assert response.status_code == 200
+
+        url = await upload_service.confirm_image_upload(db, "photo.jpg", SHA256)
+        assert url == storage.url(upload["key"])
+        assert await storage.size(upload["key"]) == len(CONTENT)
+        assert await storage.sha256(upload["key"]) == SHA256
+        blob = await db.blobs.find_one({"_id": f"{SHA256}.jpg"})
+        assert blob["refcount"] == 1
+
+        # Stored now: a second presign needs no upload
+        again = await upload_service.presign_image_upload(db, "photo.jpg", "image/jpeg", len(CONTENT), SHA256)
+        assert not again["upload_required"]
+
+    asyncio.run(run())
+
+
+def test_confirm_rejects_checksum_mismatch(storage):
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        upload = await upload_service.presign_image_upload(db, "photo.jpg", "image/jpeg", len(CONTENT), SHA256)
+
+        # Same size, other bytes, sent with their own checksum (AWS rejects
+        # this at the PUT; moto stores it, so confirm must catch it)
+        other = CONTENT[:-1] + b"!"
+        headers = {**upload["headers"], "x-amz-checksum-sha256": base64.b64encode(hashlib.sha256(other).digest()).decode()}
+        await asyncio.to_thread(requests.put, upload["url"], data=other, headers=headers)
+
+        with pytest.raises(HTTPException) as error:
+            await upload_service.confirm_image_upload(db, "photo.jpg", SHA256)
+        assert error.value.status_code == 400
+        assert not await storage.exists(upload["key"])
+        assert await db.blobs.find_one({"_id": f"{SHA256}.jpg"}) is None
+
+    asyncio.run(run())
+
+
+def test_put_file_size_delete(storage, tmp_path):
+    async def run():
+        local_path = tmp_path / "upload.part"
+        local_path.write_bytes(CONTENT)
+        key = "blobs/ab/cd/photo.jpg"
+
+        await storage.put_file(key, local_path, "image/jpeg")
+        assert not local_path.exists()
+        assert await storage.size(key) == len(CONTENT)
+        assert storage.key_from_url(storage.url(key)) == key
+
+        head = storage.client.head_object(Bucket=BUCKET, Key=key)
+        assert head["ContentType"] == "image/jpeg"
+        assert "immutable" in head["CacheControl"]
+
+        await storage.delete(key)
+        assert await storage.size(key) is None
+        await storage.delete(key)  # Missing objects are ignored
+
+    asyncio.run(run())
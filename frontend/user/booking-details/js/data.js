@@ -68,8 +68,14 @@ export async function fetchOrderData(orderId) {
             driverPhone: order.driver_id ? "**********" : "Chưa có",
             cost: `${order.total_amount.toLocaleString('vi-VN')} VNĐ`,
             date: new Date(order.created_at).toLocaleString('vi-VN'),
+            // Prefer the 800px WebP variant when it has been generated
             confirm_images: order.images && order.images.length > 0 
-                ? order.images.map(img => img.startsWith('http') ? img : `${API_BASE_URL}/${img}`)
+                ? order.images
+                    .map(img => {
+                        const variant = (order.image_variants || []).find(v => v.original === img);
+                        return (variant && variant.medium) || img;
+                    })
+                    .map(img => img.startsWith('http') ? img : `${API_BASE_URL}/${img}`)
                 : []
         };
     } catch (error) {
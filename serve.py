@@ -2,7 +2,7 @@
 Main server file - Serves both API and Frontend
 Run this file from project root: python serve.py
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
@@ -24,8 +24,17 @@ else:
     print(f"[INFO] Please copy backend/.env.example to backend/.env", flush=True)
 
 from app.core.config import settings
-from app.db.session import connect_to_mongo, close_mongo_connection
+from app.db.session import connect_to_mongo, close_mongo_connection, mongodb
 from app.api.v1.router import api_router
+from app.core.request_context import RequestContextMiddleware
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.logging import setup_logging, shutdown_logging
+from app.core.serialization import FastJSONResponse
+from app.db.cache import user_cache, tracking_cache
+from app.services.sms_service import sms_queue
+from app.services.scheduler import scheduler
+from app.services.order_stream import order_event_bus
+from app.services.image_service import shutdown_image_executor
 from contextlib import asynccontextmanager
 
 
@@ -34,6 +43,7 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     print("[START] Starting application...")
+    setup_logging()
     await connect_to_mongo()
     
     # Ensure upload directory exists
@@ -41,11 +51,22 @@ async def lifespan(app: FastAPI):
     upload_dir.mkdir(exist_ok=True)
     (upload_dir / "orders").mkdir(exist_ok=True)
     
+    await sms_queue.start()
+    if settings.SCHEDULER_ENABLED:
+        await scheduler.start(mongodb.db)
+    # Change streams (other workers' order updates) need a replica set, like transactions
+    await order_event_bus.start(mongodb.db, change_stream=mongodb.supports_transactions)
+    
     yield
     
     # Shutdown
     print("[SHUTDOWN] Shutting down application...")
+    await order_event_bus.stop()
+    await scheduler.stop()
+    await sms_queue.stop()
+    shutdown_image_executor()
     await close_mongo_connection()
+    shutdown_logging()
 
 
 # Create FastAPI app
@@ -56,6 +77,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    default_response_class=FastJSONResponse,
     lifespan=lifespan
 )
 
@@ -68,6 +90,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request-scoped context (memo of users loaded during the request)
+app.add_middleware(RequestContextMiddleware)
+
+# Per-route latency / in-flight metrics (added last = outermost, times the whole stack)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Mount frontend static files FIRST (html=True enables index.html auto-serving)
 frontend_dir = Path("frontend")
 if frontend_dir.exists():
@@ -111,9 +140,25 @@ async def health_check():
     return {
         "status": "healthy",
         "app": settings.APP_NAME,
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "caches": {
+            "users": user_cache.stats(),
+            "tracking": tracking_cache.stats()
+        },
+        "sms_queue": sms_queue.stats(),
+        "scheduler": scheduler.stats(),
+        "order_stream": order_event_bus.stats()
     }
 
+# Prometheus metrics
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics (HTTP routes, MongoDB commands and connection pool)"""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 
 if __name__ == "__main__":
     import uvicorn